@@ -0,0 +1,102 @@
+"""
+指标导出基准：N 个流的状态，测量响应体全量渲染、增量刷新（计数器每次变化、其余字段不变）与 HTTP 抓取耗时
+抓取只返回预渲染的字节串，与流数量无关的部分只有网络传输
+
+用法:
+    python -m benchmark.bench_exporter --streams 5000
+"""
+import argparse
+import http.client
+import json
+import statistics
+import time
+
+from config.MetricsExporter import MetricsExporter
+
+
+def make_status(count):
+    status = {}
+    for i in range(count):
+        status[f"s{i}"] = {
+            'running': True, 'stream_name': f"demo{i % 50}", 'stream_url': f"http://127.0.0.1/live/s{i}.flv",
+            'metrics': {
+                'total_packets': 0, 'video_packets': 0, 'audio_packets': 0, 'keyframes': 0,
+                'start_time': 1.7e9, 'last_packet_time': 1.7e9, 'last_keyframe_time': 1.7e9,
+                'current_bitrate': 1.5e6, 'average_bitrate': 1.48e6, 'frame_rate': 25.0, 'gop_size': 50,
+                'gop_duration': 2.0, 'jitter': 1.2, 'packet_loss': 0.0, 'buffer_health': 100, 'width': 1280,
+                'height': 720, 'bit_depth': 8, 'decode_count': 0, 'decode_cpu': 0.0, 'brightness': 96.5,
+                'contrast': 40.1, 'black_ratio': 0.01, 'black_frame': False, 'frame_diff': 3.2,
+                'frozen_frame': False, 'blockiness': 1.1, 'codec': 'h264', 'profile': 'High', 'color_space': 'bt709'
+            }
+        }
+    return status
+
+
+def advance(status, step):
+    """模拟一个检查周期：计数器与时间戳变化，码率小幅变化"""
+    for i, info in enumerate(status.values()):
+        metrics = info['metrics']
+        metrics['total_packets'] += 375
+        metrics['video_packets'] += 250
+        metrics['audio_packets'] += 125
+        metrics['keyframes'] += 5
+        metrics['last_packet_time'] += 10
+        metrics['last_keyframe_time'] += 10
+        metrics['current_bitrate'] = 1.5e6 + (i + step) % 7 * 1000
+
+
+def timed(func, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    status = make_status(args.streams)
+    exporter = MetricsExporter(lambda: status, refresh_interval=3600)
+    full = timed(lambda: MetricsExporter(lambda: status).refresh(), args.repeat)
+    exporter.refresh()
+    step = [0]
+
+    def incremental():
+        step[0] += 1
+        advance(status, step[0])
+        exporter.refresh()
+
+    advance_only = timed(lambda: advance(status, 0), args.repeat)
+    refresh = timed(incremental, args.repeat) - advance_only
+    unchanged = timed(exporter.refresh, args.repeat)
+
+    exporter.start('127.0.0.1', 0)
+    port = exporter.server.server_address[1]
+
+    def scrape():
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        conn.request('GET', '/metrics')
+        body = conn.getresponse().read()
+        conn.close()
+        return body
+
+    body = scrape()
+    scrape_time = timed(scrape, args.repeat)
+    exporter.stop()
+
+    results = {'streams': args.streams, 'body_bytes': len(body), 'full_render_ms': round(full * 1000, 2),
+               'incremental_refresh_ms': round(refresh * 1000, 2), 'unchanged_refresh_ms': round(unchanged * 1000, 2),
+               'scrape_ms': round(scrape_time * 1000, 2)}
+    print(f"{'streams':>8} {'bytes':>10} {'full ms':>9} {'incr ms':>9} {'same ms':>9} {'scrape ms':>10}")
+    print(f"{results['streams']:>8} {results['body_bytes']:>10} {results['full_render_ms']:>9} "
+          f"{results['incremental_refresh_ms']:>9} {results['unchanged_refresh_ms']:>9} {results['scrape_ms']:>10}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""
+起播耗时报告：对每个流分别用协议 profile（完整探测）与 fast_start profile 连接，
+测量 av.open、首个数据包、首个关键帧的耗时（StreamMonitor.startup），用于调整 open_options
+
+默认把本地生成的 FLV 以实时速率通过 HTTP 发送（模拟直播源）；--url 指定地址，--config 测量 config.yaml 中的全部流
+
+用法:
+    python -m benchmark.bench_first_packet
+    python -m benchmark.bench_first_packet --url rtmp://host/live/a --url http://host/live/b.flv
+    python -m benchmark.bench_first_packet --config
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+
+from benchmark.media import generate_h264
+from benchmark.stub_http import PacedMediaServer
+from config.ConfigLoader import get_config
+from config.log4py import logger
+from monitor.StreamMonitor import StreamMonitor
+
+
+def measure(stream_id, url, fast_start, timeout, **options):
+    monitor = StreamMonitor(stream_id, stream_id, url, webhook_sender=object(), health_check=False,
+                            picture_detection={'enabled': False}, fast_start=fast_start, **options)
+    thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while monitor.startup['first_keyframe'] is None and thread.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    startup = dict(monitor.startup)
+    monitor.stop()
+    thread.join(timeout=5)
+
+    def ms(seconds):
+        return None if seconds is None else round(seconds * 1000, 1)
+
+    return {'stream': stream_id, 'profile': startup['profile'], 'fast_start': fast_start,
+            'open_ms': ms(startup['open']), 'first_packet_ms': ms(startup['first_packet']),
+            'first_keyframe_ms': ms(startup['first_keyframe'])}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--url', action='append', default=[])
+    parser.add_argument('--config', action='store_true', help='测量 config.yaml 中的全部流')
+    parser.add_argument('--timeout', type=float, default=20, help='单次测量最长秒数')
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    targets = [(url, url, {}) for url in args.url]
+    if args.config:
+        for stream in get_config().get('streams') or []:
+            targets.append((stream['id'], stream['url'], {'open_profile': stream.get('open_profile'),
+                                                          'open_options': stream.get('open_options')}))
+
+    server = None
+    if not targets:
+        # 2 秒 GOP 的 720p FLV，以实时速率发送
+        path = generate_h264(seconds=30, gop=50, fmt='flv')
+        server = PacedMediaServer(path, media_seconds=30)
+        server.__enter__()
+        targets.append(('local-flv', server.url, {}))
+
+    results = []
+    try:
+        for stream_id, url, options in targets:
+            for fast_start in (False, True):
+                results.append(measure(stream_id, url, fast_start, args.timeout, **options))
+    finally:
+        if server is not None:
+            server.__exit__()
+
+    print(f"{'stream':<20} {'profile':<8} {'fast':>5} {'open ms':>9} {'packet ms':>10} {'keyframe ms':>12}")
+    for r in results:
+        print(f"{r['stream'][:20]:<20} {r['profile']:<8} {str(r['fast_start']):>5} {str(r['open_ms']):>9} "
+              f"{str(r['first_packet_ms']):>10} {str(r['first_keyframe_ms']):>12}")
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
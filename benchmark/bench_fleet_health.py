@@ -0,0 +1,64 @@
+"""
+健康评估基准：逐流 assess_stream_health 与 MonitorManager 批量向量化评估的耗时对比
+
+用法:
+    python -m benchmark.bench_fleet_health --streams 10000
+"""
+import argparse
+import json
+import random
+import time
+
+from monitor.FleetHealth import FleetHealthEvaluator
+from monitor.StreamMonitor import StreamMonitor
+
+
+def make_monitors(count, now):
+    rng = random.Random(0)
+    monitors = []
+    for i in range(count):
+        monitor = StreamMonitor(f"s{i}", f"s{i}", f"http://127.0.0.1/live/s{i}.flv")
+        # 约 5% 的流存在问题
+        unhealthy = rng.random() < 0.05
+        monitor.stats.last_packet_time = now - rng.uniform(0, 12 if unhealthy else 1)
+        monitor.stats.last_keyframe_time = now - rng.uniform(0, 35 if unhealthy else 2)
+        monitor.deep_stats.frame_rate = rng.choice([12.0, 20.0, 25.0]) if unhealthy else 25.0
+        monitor.deep_stats.gop_size = rng.choice([5, 50, 350]) if unhealthy else 50
+        for _ in range(60):
+            monitor.deep_stats.bitrate_history.append(rng.uniform(1e6, 3e6))
+        monitors.append(monitor)
+    return monitors
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    now = time.time()
+    monitors = make_monitors(args.streams, now)
+    evaluator = FleetHealthEvaluator()
+    engines = {
+        'per_stream': lambda: [m.assess_stream_health(now) for m in monitors],
+        'fleet': lambda: evaluator.evaluate(monitors, now),
+    }
+    assert engines['per_stream']() == engines['fleet']()
+
+    results = []
+    for name, func in engines.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            func()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        results.append({'engine': name, 'streams': args.streams, 'ms_per_pass': round(elapsed * 1000, 2),
+                        'us_per_stream': round(elapsed * 1e6 / args.streams, 3)})
+
+    print(f"{'engine':<12} {'streams':>8} {'ms/pass':>10} {'us/stream':>10}")
+    for r in results:
+        print(f"{r['engine']:<12} {r['streams']:>8} {r['ms_per_pass']:>10} {r['us_per_stream']:>10}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
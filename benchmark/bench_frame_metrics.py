@@ -0,0 +1,70 @@
+"""
+帧质量指标微基准：全分辨率 bgr24 转换 + mean/std（旧实现）与亮度平面快速指标对比
+
+用法:
+    python -m benchmark.bench_frame_metrics --repeat 20
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+import av
+import numpy as np
+
+from monitor.FrameAnalyzer import FrameAnalyzer
+
+RESOLUTIONS = {'720p': (1280, 720), '1080p': (1920, 1080), '2160p': (3840, 2160)}
+
+
+def legacy_metrics(frame):
+    np_frame = frame.to_ndarray(format='bgr24')
+    return {'brightness': np.mean(np_frame), 'contrast': np.std(np_frame)}
+
+
+def make_frame(width, height):
+    rng = np.random.default_rng(0)
+    yuv = rng.integers(16, 235, size=(height * 3 // 2, width), dtype=np.uint8)
+    return av.VideoFrame.from_ndarray(yuv, format='yuv420p')
+
+
+def measure(func, frame, repeat):
+    func(frame)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(frame)
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round(elapsed * 1000, 3), round(peak / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    engines = {
+        'legacy_bgr24': legacy_metrics,
+        'luma_stride1': FrameAnalyzer(stride=1).analyze,
+        'luma_stride4': FrameAnalyzer(stride=4).analyze,
+        'luma_thumb160x90': FrameAnalyzer(thumbnail=(160, 90)).analyze,
+    }
+    results = []
+    for label, (width, height) in RESOLUTIONS.items():
+        frame = make_frame(width, height)
+        for name, func in engines.items():
+            ms, peak_kb = measure(func, frame, args.repeat)
+            results.append({'resolution': label, 'engine': name, 'ms_per_frame': ms, 'peak_alloc_kb': peak_kb})
+
+    print(f"{'resolution':<10} {'engine':<18} {'ms/frame':>10} {'peak KB':>10}")
+    for r in results:
+        print(f"{r['resolution']:<10} {r['engine']:<18} {r['ms_per_frame']:>10} {r['peak_alloc_kb']:>10}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""
+HLS 监控开销对比：av（FFmpeg hls 解复用，拉取并解析每个分片）与 hls 引擎（条件轮询播放列表，按间隔采样分片）
+
+子进程中运行合成 HLS 直播（滑动窗口播放列表，支持 304），同时监控 --streams 路同一直播 --duration 秒，
+统计本进程 CPU 占用、下载字节数、请求数与 TCP 连接数
+
+用法:
+    python -m benchmark.bench_hls --streams 10 --duration 30
+    python -m benchmark.bench_hls --streams 50 --segment-seconds 2 --sample-interval 30
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+
+from benchmark.synthetic import SyntheticHlsServer, generate_stream, serve_in_process
+from config.log4py import logger
+from monitor.StreamMonitor import ENGINE_AV, ENGINE_HLS, StreamMonitor
+
+ENGINES = (ENGINE_AV, ENGINE_HLS)
+
+
+class NullSender:
+    """丢弃告警"""
+
+    def send_alert(self, data):
+        pass
+
+
+def run(media, engine, args):
+    factory = lambda: SyntheticHlsServer(media, segment_seconds=args.segment_seconds, window=args.window)  # noqa: E731
+    with serve_in_process(factory) as (base_url, counters):
+        monitors = [StreamMonitor(f"{engine}{i}", 'bench', f"{base_url}/live.m3u8", check_interval=args.check_interval,
+                                  webhook_sender=NullSender(), engine=engine,
+                                  hls_sample_interval=args.sample_interval)
+                    for i in range(args.streams)]
+        threads = [threading.Thread(target=monitor.start_monitoring, daemon=True) for monitor in monitors]
+        started = time.process_time()
+        wall = time.monotonic()
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        cpu = time.process_time() - started
+        elapsed = time.monotonic() - wall
+        for monitor in monitors:
+            monitor.stop()
+        for thread in threads:
+            thread.join(timeout=15)
+    alive = sum(monitor.stats.last_packet_time is not None for monitor in monitors)
+    return {
+        'engine': engine, 'streams': args.streams, 'alive': alive,
+        'cpu_percent': round(cpu / elapsed * 100, 2),
+        'cpu_percent_per_stream': round(cpu / elapsed * 100 / args.streams, 3),
+        'mb_downloaded': round(counters['bytes_sent'] / 1e6, 2),
+        'kbps_per_stream': round(counters['bytes_sent'] * 8 / elapsed / args.streams / 1000, 1),
+        **{key: counters[key] for key in ('connections', 'playlist_requests', 'not_modified', 'segment_requests')},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--segment-seconds', type=float, default=2)
+    parser.add_argument('--window', type=int, default=5, help='播放列表中的分片数')
+    parser.add_argument('--sample-interval', type=float, default=30, help='hls 引擎分片采样间隔')
+    parser.add_argument('--check-interval', type=float, default=5)
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--fps', type=int, default=25)
+    args = parser.parse_args()
+    logger.setLevel(logging.CRITICAL)
+
+    # 每个分片以关键帧开始
+    gop = int(args.fps * args.segment_seconds)
+    media = generate_stream(seconds=int(args.segment_seconds * 15), fps=args.fps, gop=gop, width=args.width,
+                            height=args.height, fmt='mpegts')
+    results = [run(media, engine, args) for engine in ENGINES]
+
+    print(f"{'engine':<6} {'alive':>6} {'cpu %':>7} {'cpu %/stream':>13} {'MB':>8} {'kbps/stream':>12} "
+          f"{'conns':>6} {'playlist':>9} {'304':>6} {'segments':>9}")
+    for result in results:
+        print(f"{result['engine']:<6} {result['alive']:>6} {result['cpu_percent']:>7} "
+              f"{result['cpu_percent_per_stream']:>13} {result['mb_downloaded']:>8} {result['kbps_per_stream']:>12} "
+              f"{result['connections']:>6} {result['playlist_requests']:>9} {result['not_modified']:>6} "
+              f"{result['segment_requests']:>9}")
+    print(json.dumps({'resolution': f"{args.width}x{args.height}", 'segment_seconds': args.segment_seconds,
+                      'duration_s': args.duration, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+监控引擎对比：av（FFmpeg 解复用 + 关键帧采样解码）与 light（只解析 HTTP-FLV 标签头）
+
+HTTP 服务运行在子进程中，不计入本进程的 CPU 与 RSS
+CPU：整段突发发送合成 FLV，单个监控回放到流结束，多轮取最小值，
+     换算为每包 CPU 与实时播放时每路流的 CPU 占用（单核百分比）
+内存：同时保持 --connections 个连接（只连接不读取），统计每个连接增加的 RSS
+
+用法:
+    python -m benchmark.bench_light_engine --seconds 60 --connections 100
+    python -m benchmark.bench_light_engine --width 1280 --height 720 --bitrate 2000000
+"""
+import argparse
+import gc
+import json
+import logging
+import time
+
+from benchmark.synthetic import SyntheticHttpServer, generate_stream, serve_in_process
+from benchmark.sysstats import current_rss_kb
+from config.log4py import logger
+from monitor.StreamMonitor import ENGINE_AV, ENGINE_LIGHT, StreamMonitor
+
+ENGINES = (ENGINE_AV, ENGINE_LIGHT)
+
+
+class NullSender:
+    """丢弃告警"""
+
+    def send_alert(self, data):
+        pass
+
+
+def replay_cpu(base_url, engine, media_seconds, rounds):
+    """
+    回放整段流，返回 (每包 CPU 微秒, 每路流实时 CPU 占用 %, 包数)
+    """
+    best = None
+    packets = 0
+    for i in range(rounds):
+        monitor = StreamMonitor(f"{engine}{i}", 'bench', f"{base_url}/live/{engine}{i}.flv", check_interval=1,
+                                webhook_sender=NullSender(), engine=engine)
+        started = time.process_time()
+        monitor.start_monitoring()
+        cpu = time.process_time() - started
+        packets = monitor.stats.total_packets
+        best = cpu if best is None else min(best, cpu)
+    return best / max(packets, 1) * 1e6, best / media_seconds * 100, packets
+
+
+def connection_rss(base_url, engine, connections):
+    """
+    同时保持 connections 个连接，返回每个连接增加的 RSS (KB)
+    """
+    gc.collect()
+    before = current_rss_kb()
+    monitors = []
+    for i in range(connections):
+        monitor = StreamMonitor(f"{engine}-rss{i}", 'bench', f"{base_url}/live/{engine}-rss{i}.flv",
+                                webhook_sender=NullSender(), engine=engine)
+        if monitor.connect():
+            monitors.append(monitor)
+    after = current_rss_kb()
+    for monitor in monitors:
+        monitor.container.close()
+        monitor.container = None
+    return (after - before) / max(len(monitors), 1)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=60, help='合成流时长')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--bitrate', type=int, default=None, help='目标码率 bps，默认不限码率')
+    parser.add_argument('--rounds', type=int, default=3)
+    parser.add_argument('--connections', type=int, default=100, help='内存测试同时保持的连接数')
+    args = parser.parse_args()
+    logger.setLevel(logging.CRITICAL)
+
+    media = generate_stream(seconds=args.seconds, fps=args.fps, gop=args.fps * 2, width=args.width,
+                            height=args.height, bitrate=args.bitrate)
+    results = []
+    with serve_in_process(lambda: SyntheticHttpServer(media, args.seconds + 1)) as (base_url, _):
+        for engine in ENGINES:
+            per_packet, percent, packets = replay_cpu(base_url, engine, args.seconds, args.rounds)
+            results.append({'engine': engine, 'packets': packets, 'cpu_us_per_packet': round(per_packet, 2),
+                            'cpu_percent_per_stream': round(percent, 3)})
+    # 内存测试的连接只发送首秒，之后保持空闲
+    with serve_in_process(lambda: SyntheticHttpServer(media, 1)) as (base_url, _):
+        for result in results:
+            result['rss_kb_per_connection'] = round(connection_rss(base_url, result['engine'], args.connections), 1)
+
+    print(f"{'engine':<8} {'packets':>8} {'cpu us/pkt':>11} {'cpu %/stream':>13} {'rss KB/conn':>12}")
+    for result in results:
+        print(f"{result['engine']:<8} {result['packets']:>8} {result['cpu_us_per_packet']:>11} "
+              f"{result['cpu_percent_per_stream']:>13} {result['rss_kb_per_connection']:>12}")
+    print(json.dumps({'resolution': f"{args.width}x{args.height}", 'fps': args.fps, 'media_seconds': args.seconds,
+                      'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""
+日志开销基准：N 个流各检查 K 次，测量健康检查线程（调用方）在日志上花费的时间
+sync 为旧实现：每次检查同步写文件和终端，INFO 输出指标 dict 与 f-string 状态块；
+queued 为队列 handler + 后台线程 + 按流采样状态日志 + JSON lines 指标日志
+终端输出重定向到 os.devnull，文件写入临时目录
+
+用法:
+    python -m benchmark.bench_logging --streams 1000 --checks 10
+"""
+import argparse
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import tempfile
+import time
+
+from config.log4py import LOG_DATEFMT, LOG_FMT, DropQueueHandler, JsonLinesFormatter, LogSampler
+
+
+def sample_status(i, check):
+    health = {'playable': True, 'quality': 'good', 'bitrate_stability': 'stable', 'issues': []}
+    data = {"streamId": f"s{i}", "streamName": f"s{i}", "streamUrl": f"http://127.0.0.1/live/s{i}.flv",
+            "playable": True, "quality": "good", "delay": "35", "videoPackets": 250 * check, "keyframes": 5 * check,
+            "count": check, "timestamp": "01/01/26 00:00:00", "bitrate": 1500.0, "avgBitrate": 1480.2,
+            "frameRate": 25.0, "resolution": "1280x720", "codec": "h264", "gopSize": 50, "jitter": 1.2,
+            "packetLoss": 0.0, "bitrateStability": "stable", "blackSeconds": 0, "frozenSeconds": 0}
+    return health, data
+
+
+def file_handler(directory, name, formatter):
+    handler = logging.handlers.TimedRotatingFileHandler(os.path.join(directory, name), encoding="utf8", when='D',
+                                                        interval=1, backupCount=3)
+    handler.setFormatter(formatter)
+    return handler
+
+
+def run_sync(streams, checks, directory, devnull):
+    log = logging.getLogger('bench.sync')
+    log.propagate = False
+    log.setLevel(logging.INFO)
+    formatter = logging.Formatter(LOG_FMT, LOG_DATEFMT)
+    console = logging.StreamHandler(devnull)
+    console.setFormatter(formatter)
+    handlers = [file_handler(directory, 'sync.log', formatter), console]
+    for handler in handlers:
+        log.addHandler(handler)
+
+    start = time.perf_counter()
+    for check in range(1, checks + 1):
+        for i in range(streams):
+            health, data = sample_status(i, check)
+            log.info(data)
+            log.info(f"\n 检查 #{check:03d} {data['streamId']} {data['streamName']} ({data['streamUrl']})"
+                     f"\n 可播放: {health['playable']} | 质量: {health['quality']:6}"
+                     f"\n 视频包: {data['videoPackets']} | 关键帧: {data['keyframes']}"
+                     f"\n 码率: {data['bitrate']:.1f}kbps (平均: {data['avgBitrate']:.1f}kbps) | 稳定性: "
+                     f"{health['bitrate_stability']}"
+                     f"\n 帧率: {data['frameRate']:.1f}fps | 分辨率: {data['resolution']}"
+                     f"\n 编码: {data['codec']} | GOP: {data['gopSize']}帧")
+            for issue in health['issues']:
+                log.info(f" {issue}")
+    caller = time.perf_counter() - start
+    for handler in handlers:
+        log.removeHandler(handler)
+        handler.close()
+    return caller, caller, 0
+
+
+def run_queued(streams, checks, directory, devnull, interval):
+    log = logging.getLogger('bench.queued')
+    metrics = logging.getLogger('bench.queued.metrics')
+    log.propagate = metrics.propagate = False
+    log.setLevel(logging.INFO)
+    metrics.setLevel(logging.INFO)
+    formatter = logging.Formatter(LOG_FMT, LOG_DATEFMT)
+    console = logging.StreamHandler(devnull)
+    console.setFormatter(formatter)
+    text_file = file_handler(directory, 'queued.log', formatter)
+    metrics_file = file_handler(directory, 'metrics.jsonl', JsonLinesFormatter())
+    for handler in (text_file, console):
+        handler.addFilter(lambda record: record.name != metrics.name)
+    metrics_file.addFilter(logging.Filter(metrics.name))
+    handler = DropQueueHandler(queue.Queue(10000))
+    listener = logging.handlers.QueueListener(handler.queue, text_file, console, metrics_file)
+    log.addHandler(handler)
+    metrics.addHandler(handler)
+    sampler = LogSampler(interval)
+    listener.start()
+
+    start = time.perf_counter()
+    for check in range(1, checks + 1):
+        for i in range(streams):
+            health, data = sample_status(i, check)
+            if metrics.isEnabledFor(logging.INFO):
+                metrics.info(data)
+            if log.isEnabledFor(logging.INFO) and sampler.allow(data['streamId'], (health['playable'], 'info'),
+                                                                now=check * 10.0):
+                log.info("\n 检查 #%03d %s %s (%s)"
+                         "\n 可播放: %s | 质量: %-6s"
+                         "\n 视频包: %s | 关键帧: %s"
+                         "\n 码率: %.1fkbps (平均: %.1fkbps) | 稳定性: %s"
+                         "\n 帧率: %.1ffps | 分辨率: %s"
+                         "\n 编码: %s | GOP: %s帧%s",
+                         check, data['streamId'], data['streamName'], data['streamUrl'],
+                         health['playable'], health['quality'], data['videoPackets'], data['keyframes'],
+                         data['bitrate'], data['avgBitrate'], health['bitrate_stability'],
+                         data['frameRate'], data['resolution'], data['codec'], data['gopSize'],
+                         ''.join(f"\n {issue}" for issue in health['issues']))
+    caller = time.perf_counter() - start
+    listener.stop()
+    total = time.perf_counter() - start
+    for handler_ in (text_file, console, metrics_file):
+        handler_.close()
+    return caller, total, handler.dropped
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=1000)
+    parser.add_argument('--checks', type=int, default=10)
+    parser.add_argument('--status-interval', type=float, default=60, help='状态日志采样间隔(秒)，检查间隔按 10 秒模拟')
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as directory, open(os.devnull, 'w') as devnull:
+        for name in ('sync', 'queued'):
+            if name == 'sync':
+                caller, total, dropped = run_sync(args.streams, args.checks, directory, devnull)
+            else:
+                caller, total, dropped = run_queued(args.streams, args.checks, directory, devnull,
+                                                    args.status_interval)
+            calls = args.streams * args.checks
+            results.append({'engine': name, 'streams': args.streams, 'checks': args.checks,
+                            'caller_seconds': round(caller, 4), 'us_per_check': round(caller * 1e6 / calls, 2),
+                            'drain_seconds': round(total, 4), 'dropped': dropped})
+
+    print(f"{'engine':<8} {'streams':>8} {'checks':>7} {'caller s':>9} {'us/check':>9} {'drain s':>8} {'dropped':>8}")
+    for r in results:
+        print(f"{r['engine']:<8} {r['streams']:>8} {r['checks']:>7} {r['caller_seconds']:>9} {r['us_per_check']:>9} "
+              f"{r['drain_seconds']:>8} {r['dropped']:>8}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""
+指标存储基准：10k 个流的每流内存与码率稳定性检查耗时
+legacy 为 dict + deque(float/str) 与 list(...)[-10:] + np.std/np.mean（旧实现）；
+store 为 __slots__ 记录 + 进程共享的列式环形缓冲，滚动均值/方差 O(1)
+
+用法:
+    python -m benchmark.bench_metrics_store --streams 10000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+from collections import deque
+
+import numpy as np
+
+from monitor.MetricsStore import DeepStats, MetricsStore, PacketStats
+
+
+class Owner:
+    pass
+
+
+def legacy_state(samples):
+    stats = {'total_packets': 0, 'video_packets': 0, 'audio_packets': 0, 'keyframes': 0, 'start_time': None,
+             'last_packet_time': None, 'last_keyframe_time': None}
+    deep_stats = {key: 0 for key in DeepStats.__slots__}
+    deep_stats['bitrate_history'] = deque((float(v) for v in samples), maxlen=60)
+    quality_history = deque(['good'] * 100, maxlen=100)
+    return stats, deep_stats, quality_history
+
+
+def legacy_check(state):
+    history = state[1]['bitrate_history']
+    if len(history) > 10:
+        recent = list(history)[-10:]
+        return np.std(recent) / np.mean(recent) if np.mean(recent) > 0 else 0
+    return 0
+
+
+def store_state(store, samples):
+    owner = Owner()
+    row = store.allocate(owner=owner)
+    history = store.bitrate_history(row)
+    for value in samples:
+        history.append(float(value))
+    quality = store.quality_history(row)
+    for _ in range(100):
+        quality.append('good')
+    return owner, PacketStats(), DeepStats(history), quality
+
+
+def store_check(state):
+    history = state[2].bitrate_history
+    if len(history) > 10:
+        mean, std = history.window_stats()
+        return std / mean if mean > 0 else 0
+    return 0
+
+
+def build(factory, count):
+    tracemalloc.start()
+    states = factory(count)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return states, current
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=10000)
+    args = parser.parse_args()
+    samples = np.random.default_rng(0).uniform(1e5, 5e6, size=60)
+
+    legacy, legacy_bytes = build(lambda n: [legacy_state(samples) for _ in range(n)], args.streams)
+    store = None
+
+    def make_store(n):
+        nonlocal store
+        store = MetricsStore()
+        return [store_state(store, samples) for _ in range(n)]
+
+    states, store_bytes = build(make_store, args.streams)
+
+    results = []
+    for name, check, items, size in (('legacy', legacy_check, legacy, legacy_bytes),
+                                     ('store', store_check, states, store_bytes)):
+        start = time.perf_counter()
+        cvs = [check(state) for state in items]
+        elapsed = time.perf_counter() - start
+        results.append({'engine': name, 'streams': args.streams, 'bytes_per_stream': size // args.streams,
+                        'check_ms_total': round(elapsed * 1000, 2),
+                        'check_us_per_stream': round(elapsed * 1e6 / args.streams, 3),
+                        'mean_cv': round(float(np.mean(cvs)), 4)})
+    assert np.allclose([legacy_check(s) for s in legacy[:100]], [store_check(s) for s in states[:100]])
+
+    # 列式整块计算所有流的变异系数
+    start = time.perf_counter()
+    column = store.bitrate
+    n = np.minimum(column.count, column.window)
+    mean = np.divide(column.win_sum, n, out=np.zeros_like(column.win_sum), where=n > 0)
+    variance = np.maximum(np.divide(column.win_sq, n, out=np.zeros_like(column.win_sq), where=n > 0) - mean * mean, 0)
+    np.divide(np.sqrt(variance), mean, out=np.zeros_like(mean), where=mean > 0)
+    elapsed = time.perf_counter() - start
+    results.append({'engine': 'store_vectorized', 'streams': args.streams, 'bytes_per_stream': store_bytes // args.streams,
+                    'check_ms_total': round(elapsed * 1000, 2),
+                    'check_us_per_stream': round(elapsed * 1e6 / args.streams, 3)})
+
+    print(f"{'engine':<18} {'streams':>8} {'B/stream':>9} {'check ms':>9} {'us/stream':>10}")
+    for r in results:
+        print(f"{r['engine']:<18} {r['streams']:>8} {r['bytes_per_stream']:>9} {r['check_ms_total']:>9} "
+              f"{r['check_us_per_stream']:>10}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
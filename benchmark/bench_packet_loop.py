@@ -0,0 +1,120 @@
+"""
+解复用循环吞吐：每核每秒可处理的包数（pps/core）
+
+回放本地生成的 FLV 文件，单线程运行 packet_loop 到文件结束，按进程 CPU 时间换算，多轮取最小值：
+    demux      只迭代 container.demux()，为 FFmpeg 解复用的下限
+    unbatched  每个包发布一次计数（batch_packets=1），近似逐包更新共享状态
+    batched    本地累计，每 --batch-packets 个包或 --batch-seconds 秒发布一次
+不解码（帧质量与画面检测关闭），只测解复用、计数与时间戳分析路径
+
+用法:
+    python -m benchmark.bench_packet_loop --seconds 120 --fps 50
+    python -m benchmark.bench_packet_loop --width 1280 --height 720 --bitrate 4000000 --rounds 5
+"""
+import argparse
+import json
+import logging
+import time
+
+import av
+
+from benchmark.synthetic import generate_stream
+from config.log4py import logger
+from monitor.StreamMonitor import BATCH_PACKETS, BATCH_SECONDS, StreamMonitor
+
+VARIANTS = ('demux', 'unbatched', 'batched')
+
+
+class NullSender:
+    """丢弃告警"""
+
+    def send_alert(self, data):
+        pass
+
+
+def demux_cpu(path):
+    """
+    只迭代 demux()，返回 (CPU 秒, 包数)
+    """
+    container = av.open(path)
+    packets = 0
+    started = time.process_time()
+    for _ in container.demux():
+        packets += 1
+    cpu = time.process_time() - started
+    container.close()
+    return cpu, packets
+
+
+def loop_cpu(path, batch_packets, batch_seconds):
+    """
+    在当前线程运行一次 packet_loop，返回 (CPU 秒, 包数)
+    """
+    monitor = StreamMonitor('bench', 'bench', path, webhook_sender=NullSender(), picture_detection={'enabled': False},
+                            batch_packets=batch_packets, batch_seconds=batch_seconds)
+    monitor.container = av.open(path)
+    monitor.running = True
+    monitor.deep_stats.last_frame_analysis = float('inf')  # 不触发帧质量采样解码
+    monitor._stall_deadline = monitor.watchdog.register('bench', 3600, lambda: None)
+    try:
+        started = time.process_time()
+        monitor.packet_loop()
+        cpu = time.process_time() - started
+    finally:
+        monitor.watchdog.unregister(monitor._stall_deadline)
+    return cpu, monitor.stats.total_packets
+
+
+def measure(path, variant, args):
+    best = None
+    packets = 0
+    for _ in range(args.rounds):
+        if variant == 'demux':
+            cpu, packets = demux_cpu(path)
+        elif variant == 'unbatched':
+            cpu, packets = loop_cpu(path, 1, 0.0)
+        else:
+            cpu, packets = loop_cpu(path, args.batch_packets, args.batch_seconds)
+        best = cpu if best is None else min(best, cpu)
+    pps = packets / best if best > 0 else 0.0
+    return {
+        'variant': variant, 'packets': packets,
+        'us_per_packet': round(best / max(packets, 1) * 1e6, 2),
+        'pps_per_core': round(pps),
+        # 每路流每秒 fps 个视频包，单核可承载的流数
+        'streams_per_core': round(pps / args.fps, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=120, help='合成流时长')
+    parser.add_argument('--fps', type=int, default=50)
+    parser.add_argument('--width', type=int, default=320)
+    parser.add_argument('--height', type=int, default=180)
+    parser.add_argument('--bitrate', type=int, default=None, help='目标码率 bps，默认不限码率')
+    parser.add_argument('--batch-packets', type=int, default=BATCH_PACKETS)
+    parser.add_argument('--batch-seconds', type=float, default=BATCH_SECONDS)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    logger.setLevel(logging.CRITICAL)
+
+    media = generate_stream(seconds=args.seconds, fps=args.fps, gop=args.fps * 2, width=args.width,
+                            height=args.height, bitrate=args.bitrate)
+    results = [measure(media.path, variant, args) for variant in VARIANTS]
+    floor = results[0]['us_per_packet']
+    for result in results:
+        # 解复用之外的 Python 逐包开销
+        result['overhead_us_per_packet'] = round(result['us_per_packet'] - floor, 2)
+
+    print(f"{'variant':<10} {'packets':>8} {'us/pkt':>8} {'overhead us':>12} {'pps/core':>10} {'streams/core':>13}")
+    for result in results:
+        print(f"{result['variant']:<10} {result['packets']:>8} {result['us_per_packet']:>8} "
+              f"{result['overhead_us_per_packet']:>12} {result['pps_per_core']:>10} {result['streams_per_core']:>13}")
+    print(json.dumps({'resolution': f"{args.width}x{args.height}", 'fps': args.fps, 'media_seconds': args.seconds,
+                      'batch_packets': args.batch_packets, 'batch_seconds': args.batch_seconds,
+                      'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+分阶段计时与采样分析的开销：同一合成文件分别以 关闭计时 / 开启计时 / 开启计时且后台采样调用栈 回放，
+统计每个数据包的进程 CPU 时间；多轮交替运行取最小值，并输出开启计时时各阶段的耗时占比
+
+用法:
+    python -m benchmark.bench_profiling --seconds 60 --rounds 5
+    python -m benchmark.bench_profiling --width 1280 --height 720 --interval 0.01
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+
+from benchmark.synthetic import generate_stream
+from config.log4py import logger
+from monitor.Profiler import sample_stacks
+from monitor.StreamMonitor import StreamMonitor
+
+MODES = ('off', 'timers', 'timers+sampler')
+
+
+class NullSender:
+    """丢弃告警"""
+
+    def send_alert(self, data):
+        pass
+
+
+def replay(path, mode, interval):
+    """
+    回放一次文件，返回 (每包 CPU 纳秒, 包数, 阶段计时)
+    """
+    monitor = StreamMonitor('bench', 'bench', path, check_interval=0.5, webhook_sender=NullSender(),
+                            profiling=mode != 'off')
+    stop = threading.Event()
+    samples = []
+
+    def run_sampler():
+        while not stop.is_set():
+            stacks = sample_stacks(lambda: monitor.session_threads, seconds=0.5, interval=interval)
+            samples.append(sum(stacks.values()))
+
+    sampler = threading.Thread(target=run_sampler, daemon=True) if mode == 'timers+sampler' else None
+    started = time.process_time_ns()
+    if sampler is not None:
+        sampler.start()
+    monitor.start_monitoring()
+    stop.set()
+    if sampler is not None:
+        sampler.join()
+    cpu_ns = time.process_time_ns() - started
+    packets = monitor.stats.total_packets
+    return cpu_ns / max(packets, 1), packets, monitor.timers.snapshot() if monitor.timers else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seconds', type=int, default=60, help='合成流时长')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--rounds', type=int, default=5, help='每种模式的回放轮数，取最小值')
+    parser.add_argument('--interval', type=float, default=0.005, help='采样间隔(秒)')
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    path = generate_stream(seconds=args.seconds, fps=args.fps, gop=args.fps * 2, width=args.width,
+                           height=args.height).path
+    best = {mode: None for mode in MODES}
+    packets = 0
+    phases = None
+    for _ in range(args.rounds):
+        for mode in MODES:
+            per_packet, packets, snapshot = replay(path, mode, args.interval)
+            if best[mode] is None or per_packet < best[mode]:
+                best[mode] = per_packet
+                if mode == 'timers':
+                    phases = snapshot
+
+    baseline = best['off']
+    results = [{'mode': mode, 'cpu_ns_per_packet': round(best[mode]),
+                'overhead_ns_per_packet': round(best[mode] - baseline),
+                'overhead_percent': round((best[mode] - baseline) / baseline * 100, 2)} for mode in MODES]
+    print(f"{'mode':<16} {'cpu ns/pkt':>11} {'overhead ns':>12} {'overhead %':>11}")
+    for result in results:
+        print(f"{result['mode']:<16} {result['cpu_ns_per_packet']:>11} {result['overhead_ns_per_packet']:>12} "
+              f"{result['overhead_percent']:>11}")
+
+    total_wall = sum(phase['wall_ns'] for name, phase in phases.items() if name in ('demux', 'packet'))
+    print(f"{'phase':<14} {'calls':>7} {'wall ms':>9} {'cpu ms':>9} {'share %':>8}")
+    for name, phase in phases.items():
+        cpu = '-' if phase['cpu_ns'] is None else round(phase['cpu_ns'] / 1e6, 2)
+        print(f"{name:<14} {phase['calls']:>7} {round(phase['wall_ns'] / 1e6, 2):>9} {cpu:>9} "
+              f"{round(phase['wall_ns'] / max(total_wall, 1) * 100, 1):>8}")
+    print(json.dumps({'packets': packets, 'resolution': f"{args.width}x{args.height}", 'results': results,
+                      'phases': phases}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
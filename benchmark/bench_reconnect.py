@@ -0,0 +1,91 @@
+"""
+重连风暴模拟：N 个流的源站同时中断 outage 秒后恢复，比较 固定 0.1 秒重试 与 退避+抖动+熔断 两种策略
+统计中断期间打到源站的连接次数、每秒峰值连接数，以及源站恢复后各流恢复的耗时
+每次 av.open 占用 open_seconds，同时进行的 av.open 受并发上限约束（离散事件模拟，使用真实的 ReconnectPolicy）
+
+用法:
+    python -m benchmark.bench_reconnect --streams 1000 --outage 120
+"""
+import argparse
+import heapq
+import json
+import random
+from collections import Counter
+
+from monitor.ReconnectPolicy import ReconnectPolicy
+
+
+class FixedRetry:
+    """旧实现：连接失败后固定间隔重试"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def next_delay(self):
+        return self.delay
+
+    def record(self, connected, duration=0.0):
+        pass
+
+
+def simulate(count, outage, open_seconds, limit, make_policy):
+    policies = [make_policy(i) for i in range(count)]
+    # (可以开始连接的时间, 流序号)
+    pending = [(policies[i].next_delay(), i) for i in range(count)]
+    heapq.heapify(pending)
+    slots = [0.0] * limit  # 各并发名额空闲的时间
+    attempts = Counter()
+    recovered = []
+    while pending:
+        ready, i = heapq.heappop(pending)
+        free = heapq.heappop(slots)
+        start = max(ready, free)
+        end = start + open_seconds
+        heapq.heappush(slots, end)
+        attempts[int(start)] += 1
+        policy = policies[i]
+        if start >= outage:
+            recovered.append(end - outage)
+            continue
+        policy.record(False)
+        heapq.heappush(pending, (end + policy.next_delay(), i))
+
+    recovered.sort()
+    during = sum(n for second, n in attempts.items() if second < outage)
+    return {
+        'attempts_during_outage': during,
+        'peak_attempts_per_second': max(attempts.values()),
+        'recovery_p50': round(recovered[len(recovered) // 2], 2),
+        'recovery_p99': round(recovered[int(len(recovered) * 0.99) - 1], 2),
+        'recovery_max': round(recovered[-1], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=1000)
+    parser.add_argument('--outage', type=float, default=120, help='源站中断秒数')
+    parser.add_argument('--open-seconds', type=float, default=0.2, help='单次 av.open 耗时')
+    parser.add_argument('--limit', type=int, default=8, help='av.open 并发上限（fixed 不限制时取流数）')
+    args = parser.parse_args()
+
+    engines = (
+        ('fixed', args.streams, lambda i: FixedRetry(0.1)),
+        ('backoff', args.limit, lambda i: ReconnectPolicy(rng=random.Random(i))),
+    )
+    results = []
+    for name, limit, make_policy in engines:
+        result = simulate(args.streams, args.outage, args.open_seconds, limit, make_policy)
+        results.append({'engine': name, 'streams': args.streams, 'outage': args.outage, 'open_limit': limit,
+                        **result})
+
+    print(f"{'engine':<8} {'streams':>8} {'limit':>6} {'attempts':>9} {'peak/s':>7} {'p50 s':>7} {'p99 s':>7} "
+          f"{'max s':>7}")
+    for r in results:
+        print(f"{r['engine']:<8} {r['streams']:>8} {r['open_limit']:>6} {r['attempts_during_outage']:>9} "
+              f"{r['peak_attempts_per_second']:>7} {r['recovery_p50']:>7} {r['recovery_p99']:>7} {r['recovery_max']:>7}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
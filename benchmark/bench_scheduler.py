@@ -0,0 +1,92 @@
+"""
+线程模式与共享调度模式对比：在 100/500/1000 个模拟流下统计线程数、RSS 与 CPU
+
+用法:
+    python -m benchmark.bench_scheduler                      # 全部组合，每个组合独立子进程
+    python -m benchmark.bench_scheduler --mode scheduler --streams 500 --duration 10
+"""
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import time
+
+MODES = ("thread", "scheduler")
+STREAM_COUNTS = (100, 500, 1000)
+
+
+def run_once(mode, streams, duration, fps):
+    from benchmark.fake_stream import install_fake_connect
+    from benchmark.sysstats import ResourceSampler
+    from config.log4py import logger
+    from job.monitor_manager import MonitorManager
+    from monitor.StreamMonitor import StreamMonitor
+
+    logger.setLevel(logging.WARNING)
+    install_fake_connect(StreamMonitor, fps=fps)
+
+    manager = MonitorManager(mode=mode)
+    for i in range(streams):
+        manager.add_stream(f"sim-{i}", f"sim-{i}", f"sim://{i}", check_interval=2)
+    manager.start_all()
+
+    # 等待所有流建立后再开始计量
+    time.sleep(2)
+    sampler = ResourceSampler()
+    sampler.start()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        sampler.sample()
+    result = sampler.result()
+    result.update({'mode': mode, 'streams': streams})
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--mode', choices=MODES)
+    parser.add_argument('--streams', type=int)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--fps', type=int, default=25)
+    args = parser.parse_args()
+
+    if args.mode and args.streams:
+        print(json.dumps(run_once(args.mode, args.streams, args.duration, args.fps)), flush=True)
+        # 线程模式下逐个 join 上千个线程非常慢，测量结束直接退出子进程
+        os._exit(0)
+
+    results = []
+    for mode in MODES:
+        for streams in STREAM_COUNTS:
+            try:
+                out = subprocess.run(
+                    [sys.executable, '-m', 'benchmark.bench_scheduler', '--mode', mode, '--streams', str(streams),
+                     '--duration', str(args.duration), '--fps', str(args.fps)],
+                    capture_output=True, text=True, timeout=args.duration * 3 + 120)
+            except subprocess.TimeoutExpired:
+                print(f"{mode} x {streams} 超时", file=sys.stderr)
+                results.append({'mode': mode, 'streams': streams, 'threads': 'timeout', 'rss_mb': '-',
+                                'cpu_percent': '-'})
+                continue
+            lines = out.stdout.strip().splitlines()
+            if out.returncode != 0 or not lines:
+                print(f"{mode} x {streams} 失败: {out.stderr[-500:]}", file=sys.stderr)
+                continue
+            # 监控线程的日志可能与结果行交错，只解析结果 JSON
+            line = next((line for line in reversed(lines) if '{"threads"' in line), None)
+            if line is None:
+                print(f"{mode} x {streams} 无结果输出", file=sys.stderr)
+                continue
+            results.append(json.JSONDecoder().raw_decode(line[line.index('{"threads"'):])[0])
+
+    print(f"{'mode':<10} {'streams':>8} {'threads':>8} {'rss_mb':>8} {'cpu%':>8}")
+    for r in results:
+        print(f"{r['mode']:<10} {r['streams']:>8} {r['threads']:>8} {r['rss_mb']:>8} {r['cpu_percent']:>8}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+冷启动基准：为 N 个配置的流创建 StreamMonitor 的耗时
+legacy 每个流各自解析 config.yaml 并创建 WebhookSender/Session，且每次启动构造两次 StreamMonitor（旧实现）；
+shared 由 MonitorManager 注入进程共享的发送器和配置快照
+
+用法:
+    python -m benchmark.bench_startup --streams 1000
+"""
+import argparse
+import json
+import time
+
+from config.WebhookSender import WebhookSender, get_webhook_sender
+from monitor.StreamMonitor import StreamMonitor
+from settings import SYS_CONF
+
+
+def legacy_start(count):
+    monitors = []
+    for i in range(count):
+        for _ in range(2):
+            monitor = StreamMonitor(f"s{i}", f"s{i}", f"http://127.0.0.1/live/s{i}.flv",
+                                    webhook_sender=WebhookSender(SYS_CONF))
+        monitors.append(monitor)
+    return monitors
+
+
+def shared_start(count):
+    sender = get_webhook_sender()
+    return [StreamMonitor(f"s{i}", f"s{i}", f"http://127.0.0.1/live/s{i}.flv", webhook_sender=sender)
+            for i in range(count)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=1000)
+    args = parser.parse_args()
+
+    results = []
+    for name, func in (('legacy', legacy_start), ('shared', shared_start)):
+        start = time.perf_counter()
+        monitors = func(args.streams)
+        elapsed = time.perf_counter() - start
+        sessions = len({id(m.webhook_sender.session) for m in monitors})
+        results.append({'engine': name, 'streams': args.streams, 'seconds': round(elapsed, 4),
+                        'ms_per_stream': round(elapsed * 1000 / args.streams, 4), 'sessions': sessions})
+
+    print(f"{'engine':<8} {'streams':>8} {'seconds':>10} {'ms/stream':>10} {'sessions':>9}")
+    for r in results:
+        print(f"{r['engine']:<8} {r['streams']:>8} {r['seconds']:>10} {r['ms_per_stream']:>10} {r['sessions']:>9}")
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+Webhook 投递对比：同步逐条发送 与 异步队列（单条 / 批量）
+
+模拟 N 个流的健康检查线程各发送一轮告警，接收端为带人为延迟的本地桩服务，
+统计调用方阻塞时间、HTTP 请求数、送达记录数与全部送达耗时
+
+用法:
+    python -m benchmark.bench_webhook --streams 1000 --latency 0.05
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yaml
+
+import config.WebhookSender as webhook_module
+from benchmark.stub_http import StubAlertServer
+from config.WebhookSender import WebhookSender
+from config.log4py import logger
+
+
+def make_sender(url, **webhook):
+    path = os.path.join(tempfile.mkdtemp(), 'config.yaml')
+    with open(path, 'w', encoding='utf-8') as f:
+        yaml.safe_dump({'webhook': {'enabled': True, 'url': url, **webhook}}, f)
+    return WebhookSender(path)
+
+
+def run(label, streams, callers, latency, **webhook):
+    with StubAlertServer(latency=latency) as server:
+        sender = make_sender(server.url, **webhook)
+        blocked = []
+
+        def health_check(i):
+            start = time.perf_counter()
+            sender.send_alert({'streamId': f"video{i}", 'playable': True, 'alertLevel': 'info',
+                               'message': f"stream video{i} running OK."})
+            blocked.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=callers) as pool:
+            list(pool.map(health_check, range(streams)))
+        submit_done = time.perf_counter() - start
+        while server.records < streams and time.perf_counter() - start < 120:
+            time.sleep(0.01)
+        delivered = time.perf_counter() - start
+        webhook_module.shutdown_dispatcher()
+
+        blocked.sort()
+        return {
+            'mode': label,
+            'streams': streams,
+            'caller_p50_ms': round(blocked[len(blocked) // 2] * 1000, 3),
+            'caller_p99_ms': round(blocked[int(len(blocked) * 0.99)] * 1000, 3),
+            'all_submitted_s': round(submit_done, 3),
+            'all_delivered_s': round(delivered, 3),
+            'http_requests': server.requests,
+            'records_delivered': server.records,
+            'connections': len(server.connections),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=1000)
+    parser.add_argument('--callers', type=int, default=8, help='并发调用 send_alert 的健康检查线程数')
+    parser.add_argument('--latency', type=float, default=0.05, help='接收端人为延迟(秒)')
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+
+    logger.setLevel(logging.WARNING)
+    results = [
+        run('sync', args.streams, args.callers, args.latency, **{'async': False}),
+        run('async_single', args.streams, args.callers, args.latency, max_batch_size=1),
+        run(f'async_batch{args.batch}', args.streams, args.callers, args.latency, max_batch_size=args.batch,
+            linger_ms=50),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""
+模拟流 - 不依赖网络，按固定帧率产出伪造数据包，用于压测与基准测试
+"""
+import time
+from datetime import datetime
+from fractions import Fraction
+
+import av
+
+
+class FakeCodecContext:
+    """
+    模拟编码上下文：没有 extradata，常驻解码器按名称创建真实解码器，解码 FakePacket 不产出帧
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.profile = 'High'
+        self.extradata = None
+
+
+class FakeStream:
+    def __init__(self, stream_type, index, width=0, height=0, codec='h264'):
+        self.type = stream_type
+        self.index = index
+        self.width = width
+        self.height = height
+        self.time_base = Fraction(1, 1000)
+        self.codec_context = FakeCodecContext(codec)
+
+
+# 伪造包的负载：只有一个 H.264 访问单元分隔符（Annex B），支持缓冲协议，解码器接受但不产出帧
+FAKE_PAYLOAD = b'\x00\x00\x00\x01\x09\xf0'
+
+
+class FakePacket(av.Packet):
+    """
+    伪造数据包：真实的 av.Packet（负载为 FAKE_PAYLOAD），stream 与 size 为模拟值
+    """
+    __slots__ = ('stream', 'stream_index', 'size')
+
+    def __new__(cls, *args):
+        return super().__new__(cls)
+
+    def __init__(self, stream, size, is_keyframe, pts, duration):
+        super().__init__(FAKE_PAYLOAD)
+        self.stream = stream
+        self.stream_index = stream.index
+        self.size = size
+        self.is_keyframe = is_keyframe
+        self.pts = pts
+        self.dts = pts
+        self.duration = duration
+        self.time_base = stream.time_base
+
+    def decode(self):
+        return []
+
+
+class FakeContainer:
+    """
+    模拟容器：demux() 以 fps 的节奏产出视频包，每 gop 帧一个关键帧
+    """
+
+    def __init__(self, fps=25, gop=50, packet_size=4000, width=1280, height=720):
+        self.fps = fps
+        self.gop = gop
+        self.packet_size = packet_size
+        self.video = FakeStream('video', 0, width, height)
+        self.streams = [self.video]
+        self.closed = False
+
+    def demux(self):
+        interval = 1.0 / self.fps
+        duration = int(1000 / self.fps)
+        index = 0
+        next_time = time.monotonic()
+        while not self.closed:
+            next_time += interval
+            delay = next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if self.closed:
+                return
+            keyframe = index % self.gop == 0
+            size = self.packet_size * 5 if keyframe else self.packet_size
+            yield FakePacket(self.video, size, keyframe, index * duration, duration)
+            index += 1
+
+    def close(self):
+        self.closed = True
+
+
+def install_fake_connect(monitor_cls, **container_kwargs):
+    """
+    替换 StreamMonitor.connect，使其连接到模拟容器
+    """
+
+    def fake_connect(self):
+        self.container = FakeContainer(**container_kwargs)
+        self.stats['start_time'] = datetime.now()
+        self._analyze_stream_info()
+        return True
+
+    monitor_cls.connect = fake_connect
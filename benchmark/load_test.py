@@ -0,0 +1,168 @@
+"""
+离线压测：用合成流（benchmark.synthetic）驱动 MonitorManager 监控 N 路流，不依赖外网
+统计 CPU、RSS、线程数、解复用吞吐、Webhook 吞吐，以及注入事件（卡顿/静止/码率突增）到首条对应告警的检测延迟
+告警发送到本地桩服务；结果输出为 JSON，可用 --output 保存后对比回归
+
+事件格式 kind:at:duration（媒体秒），kind 为 stall|freeze|spike|silence|clip，未指定时使用默认的三个事件；
+stall 只对 http/pipe 源有效，file 源按文件读取速度解复用，不计算检测延迟
+
+用法:
+    python -m benchmark.load_test --streams 20 --duration 60
+    python -m benchmark.load_test --streams 100 --source pipe --fmt mpegts --mode scheduler --health fleet
+    python -m benchmark.load_test --streams 10 --event stall:15:8 --event spike:30:3 --output result.json
+"""
+import argparse
+import json
+import logging
+import statistics
+import time
+from contextlib import ExitStack
+
+import config.WebhookSender as webhook_module
+from benchmark.stub_http import StubAlertServer
+from benchmark.synthetic import (EVENT_CLIP, EVENT_FREEZE, EVENT_SILENCE, EVENT_SPIKE, EVENT_STALL, Event, FORMATS,
+                                 generate_stream, parse_event, stream_urls)
+from benchmark.sysstats import ResourceSampler
+from config.WebhookSender import WebhookSender
+from config.log4py import logger
+from job.monitor_manager import MonitorManager
+
+DEFAULT_EVENTS = (Event(EVENT_STALL, 15, 6), Event(EVENT_FREEZE, 28, 8), Event(EVENT_SPIKE, 50, 3))
+
+
+def detectors(args):
+    """
+    各事件类型的告警判定：记录满足条件即视为已检测到
+    """
+    return {
+        EVENT_STALL: lambda record: record.get('playable') is False,
+        EVENT_FREEZE: lambda record: record.get('frozenSeconds', 0) >= args.frozen_seconds,
+        EVENT_SPIKE: lambda record: record.get('bitrateStability') == 'unstable',
+        # 音频按采样窗口检测，首个静音窗口即开始计时
+        EVENT_SILENCE: lambda record: record.get('silentSeconds', 0) > 0,
+        EVENT_CLIP: lambda record: record.get('clipping') is True,
+    }
+
+
+def detection_latency(urls, events_for, received, detect):
+    """
+    每路流每个事件：从发送端到达事件的时间到收到首条满足条件的告警的秒数，未检测到为 None
+    """
+    by_stream = {}
+    for at, record in received:
+        by_stream.setdefault(record.get('streamId'), []).append((at, record))
+    latencies = {}
+    for i, url in enumerate(urls):
+        records = by_stream.get(f"s{i}", [])
+        for event, started in events_for(url).items():
+            hit = next((at for at, record in records if at >= started and detect[event.kind](record)), None)
+            latencies.setdefault(event.kind, []).append(None if hit is None else hit - started)
+    summary = {}
+    for kind, values in latencies.items():
+        detected = sorted(value for value in values if value is not None)
+        summary[kind] = {
+            'events': len(values),
+            'detected': len(detected),
+            'p50_s': round(statistics.median(detected), 2) if detected else None,
+            'p95_s': round(detected[max(0, int(len(detected) * 0.95) - 1)], 2) if detected else None,
+            'max_s': round(detected[-1], 2) if detected else None,
+        }
+    return summary
+
+
+def run(args):
+    events = [parse_event(text) for text in args.event] if args.event else list(DEFAULT_EVENTS)
+    media = generate_stream(seconds=args.media_seconds, fps=args.fps, gop=args.gop, width=args.width,
+                            height=args.height, bitrate=args.bitrate, fmt=args.fmt, events=events)
+    urls, sources, events_for = stream_urls(args.source, media, args.streams, args.burst_seconds)
+
+    with ExitStack() as stack:
+        for source in sources:
+            stack.enter_context(source)
+        alerts = stack.enter_context(StubAlertServer(keep_records=True))
+        sender = WebhookSender(webhook_config={'enabled': True, 'url': alerts.url, 'max_batch_size': args.batch,
+                                               'linger_ms': 50})
+        manager = MonitorManager(mode=args.mode, webhook_sender=sender, health_evaluation=args.health)
+        for i, url in enumerate(urls):
+            manager.add_stream(f"s{i}", f"synthetic{i}", url, args.check_interval, stall_timeout=args.stall_timeout,
+                               picture_detection={'frozen_seconds': args.frozen_seconds},
+                               health_rules={'thresholds': {'no_packet_seconds': args.no_packet_seconds}},
+                               fast_start=True)
+
+        sampler = ResourceSampler()
+        sampler.start()
+        started = time.monotonic()
+        manager.start_all()
+        while time.monotonic() - started < args.duration:
+            time.sleep(1)
+            sampler.sample()
+        resources = sampler.result()
+        status = manager.get_status()
+        manager.stop_all()
+        elapsed = time.monotonic() - started
+        dispatcher = sender.dispatcher
+        webhook_module.shutdown_dispatcher()
+        received = list(alerts.received)
+
+    packets = sum(info.get('total_packets', 0) for info in status.values())
+    result = {
+        'streams': args.streams, 'source': args.source, 'format': args.fmt, 'mode': args.mode,
+        'health': args.health, 'resolution': f"{args.width}x{args.height}", 'fps': args.fps, 'gop': args.gop,
+        'bitrate': args.bitrate, 'duration_s': round(elapsed, 1),
+        'events': [event._asdict() for event in events],
+        **resources,
+        'packets': packets,
+        'packets_per_second': round(packets / elapsed, 1),
+        'webhook': {
+            'records': alerts.records, 'requests': alerts.requests,
+            'records_per_second': round(alerts.records / elapsed, 1),
+            'dropped': dispatcher.stats['dropped'] if dispatcher else None,
+            'coalesced': dispatcher.stats['coalesced'] if dispatcher else None,
+        },
+        'detection': detection_latency(urls, events_for, received, detectors(args)),
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--streams', type=int, default=20)
+    parser.add_argument('--duration', type=float, default=60, help='压测时长(秒)')
+    parser.add_argument('--source', choices=('file', 'http', 'pipe'), default='http')
+    parser.add_argument('--fmt', choices=tuple(FORMATS), default='flv')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=360)
+    parser.add_argument('--fps', type=int, default=25)
+    parser.add_argument('--gop', type=int, default=50)
+    parser.add_argument('--bitrate', type=int, default=None, help='目标码率 bps，默认不限码率')
+    parser.add_argument('--media-seconds', type=int, default=60, help='合成流时长，重连后从头发送')
+    parser.add_argument('--burst-seconds', type=float, default=1.0, help='每个连接先突发发送的媒体秒数')
+    parser.add_argument('--event', action='append', default=[], help='注入事件 kind:at:duration，可重复')
+    parser.add_argument('--mode', choices=('thread', 'scheduler'), default='thread')
+    parser.add_argument('--health', choices=('stream', 'fleet'), default='stream')
+    parser.add_argument('--check-interval', type=float, default=1)
+    parser.add_argument('--stall-timeout', type=float, default=10)
+    parser.add_argument('--no-packet-seconds', type=float, default=3)
+    parser.add_argument('--frozen-seconds', type=float, default=3)
+    parser.add_argument('--batch', type=int, default=100, help='Webhook 批量大小')
+    parser.add_argument('--output', help='结果 JSON 保存路径')
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    result = run(args)
+    print(f"{'streams':>8} {'source':>7} {'cpu %':>7} {'rss MB':>8} {'threads':>8} {'pkt/s':>9} {'alerts/s':>9}")
+    print(f"{result['streams']:>8} {result['source']:>7} {result['cpu_percent']:>7} {result['rss_mb']:>8} "
+          f"{result['threads']:>8} {result['packets_per_second']:>9} {result['webhook']['records_per_second']:>9}")
+    print(f"{'event':<8} {'events':>7} {'detected':>9} {'p50 s':>7} {'p95 s':>7} {'max s':>7}")
+    for kind, detection in result['detection'].items():
+        print(f"{kind:<8} {detection['events']:>7} {detection['detected']:>9} {str(detection['p50_s']):>7} "
+              f"{str(detection['p95_s']):>7} {str(detection['max_s']):>7}")
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+
+if __name__ == '__main__':
+    main()
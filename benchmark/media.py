@@ -0,0 +1,40 @@
+"""
+用 PyAV 生成本地测试媒体文件
+"""
+import os
+import tempfile
+
+import av
+import numpy as np
+
+
+def generate_h264(path=None, seconds=30, fps=25, gop=50, width=1280, height=720, bframes=2, fmt='flv'):
+    """
+    生成 H.264 测试文件：画面为移动的渐变条纹，关键帧间隔为 gop，带 B 帧
+    :return: 文件路径
+    """
+    if path is None:
+        path = os.path.join(tempfile.gettempdir(), f"stream-monitor-{width}x{height}-{fps}fps-{seconds}s.{fmt}")
+    if os.path.exists(path):
+        return path
+
+    output = av.open(path, 'w', format=fmt)
+    stream = output.add_stream('libx264', rate=fps)
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = 'yuv420p'
+    stream.codec_context.gop_size = gop
+    stream.options = {'preset': 'ultrafast', 'bf': str(bframes), 'keyint_min': str(gop), 'sc_threshold': '0'}
+
+    ramp = np.linspace(0, 255, width, dtype=np.float32)
+    rows = np.arange(height, dtype=np.float32)[:, None]
+    for index in range(seconds * fps):
+        luma = ((ramp[None, :] + rows * 0.5 + index * 4) % 256).astype(np.uint8)
+        frame = av.VideoFrame.from_ndarray(np.repeat(luma[:, :, None], 3, axis=2), format='rgb24')
+        frame.pts = index
+        for packet in stream.encode(frame):
+            output.mux(packet)
+    for packet in stream.encode():
+        output.mux(packet)
+    output.close()
+    return path
@@ -0,0 +1,118 @@
+"""
+重启浸泡测试：对本地直播桩反复 连接 → 收到首个关键帧 → stop() → 重连，检查线程数与 RSS 不随重启次数增长，
+并统计 stop() 到 start_monitoring 返回（线程、容器、解码器全部释放）的耗时
+每隔 --every 次记录一次线程数与 RSS；任一采样点仍有会话线程存活，或预热之后线程数/RSS 增长超过阈值时以非零状态退出
+默认整段突发发送，每次重启只受解复用速度限制；--burst-seconds 较小时 stop() 需要等待下一个完整数据包
+
+用法:
+    python -m benchmark.soak_restart --restarts 10000
+    python -m benchmark.soak_restart --restarts 500 --every 50 --warmup 100
+"""
+import argparse
+import json
+import logging
+import statistics
+import sys
+import threading
+import time
+
+from benchmark.media import generate_h264
+from benchmark.stub_http import PacedMediaServer
+from benchmark.sysstats import current_rss_kb, os_thread_count
+from config.log4py import logger
+from monitor.StreamMonitor import StreamMonitor
+
+
+# StreamMonitor 每次会话启动的线程名前缀
+SESSION_THREADS = ('demux-', 'health-', 'bitrate-')
+
+
+class NullSender:
+    """丢弃告警"""
+
+    def send_alert(self, data):
+        pass
+
+
+def restart_once(monitor, timeout):
+    """
+    一次会话：等到首个关键帧（解码器已创建）后 stop()，返回 stop() 到会话结束的秒数，连接失败返回 None
+    """
+    result = []
+    thread = threading.Thread(target=lambda: result.append(monitor.start_monitoring()), daemon=True)
+    thread.start()
+    deadline = time.monotonic() + timeout
+    while monitor.startup['first_keyframe'] is None and thread.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.002)
+    stopped = time.monotonic()
+    monitor.stop()
+    thread.join(timeout=timeout)
+    if thread.is_alive():
+        raise RuntimeError("start_monitoring 未在超时内返回")
+    return time.monotonic() - stopped if result and result[0] else None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--restarts', type=int, default=10000)
+    parser.add_argument('--every', type=int, default=500, help='每隔多少次重启采样一次线程数与 RSS')
+    parser.add_argument('--warmup', type=int, default=2000, help='预热次数（内存分配器与解码器缓冲池稳定），之后的采样作为基线')
+    parser.add_argument('--max-rss-growth-mb', type=float, default=30, help='允许的 RSS 波动')
+    parser.add_argument('--max-thread-growth', type=int, default=4, help='允许的线程数波动（桩服务的连接线程）')
+    parser.add_argument('--burst-seconds', type=float, default=30, help='每个连接突发发送的媒体秒数')
+    parser.add_argument('--timeout', type=float, default=10, help='单次会话最长秒数')
+    args = parser.parse_args()
+    logger.setLevel(logging.WARNING)
+
+    # 1 秒 GOP 的小分辨率 FLV
+    path = generate_h264(seconds=30, gop=25, width=320, height=180, fmt='flv')
+    samples = []
+    stop_seconds = []
+    failures = 0
+    with PacedMediaServer(path, media_seconds=30, burst_seconds=args.burst_seconds) as server:
+        monitor = StreamMonitor('soak', 'soak', server.url, check_interval=0.05, webhook_sender=NullSender(),
+                                fast_start=True)
+        baseline = None
+        started = time.monotonic()
+        for i in range(1, args.restarts + 1):
+            seconds = restart_once(monitor, args.timeout)
+            if seconds is None:
+                failures += 1
+            else:
+                stop_seconds.append(seconds)
+            if i == args.warmup or i % args.every == 0 or i == args.restarts:
+                sessions = sum(thread.name.startswith(SESSION_THREADS) for thread in threading.enumerate())
+                sample = {'restarts': i, 'threads': os_thread_count(), 'session_threads': sessions,
+                          'rss_mb': round(current_rss_kb() / 1024, 1), 'elapsed_s': round(time.monotonic() - started, 1)}
+                samples.append(sample)
+                if i >= args.warmup and baseline is None:
+                    baseline = sample
+                print(f"{sample['restarts']:>8} {sample['threads']:>8} {sessions:>4} {sample['rss_mb']:>9} "
+                      f"{sample['elapsed_s']:>9}", file=sys.stderr)
+
+    baseline = baseline or samples[0]
+    last = samples[-1]
+    stop_seconds.sort()
+    result = {
+        'restarts': args.restarts, 'failures': failures,
+        'threads_baseline': baseline['threads'], 'threads_final': last['threads'],
+        'rss_baseline_mb': baseline['rss_mb'], 'rss_final_mb': last['rss_mb'],
+        'stop_p50_ms': round(statistics.median(stop_seconds) * 1000, 1) if stop_seconds else None,
+        'stop_max_ms': round(stop_seconds[-1] * 1000, 1) if stop_seconds else None,
+        'samples': samples,
+    }
+    leaked = (any(sample['session_threads'] for sample in samples)
+              or last['threads'] - baseline['threads'] > args.max_thread_growth
+              or last['rss_mb'] - baseline['rss_mb'] > args.max_rss_growth_mb)
+    result['leaked'] = leaked
+
+    print(f"{'restarts':>8} {'fail':>5} {'threads':>12} {'rss MB':>14} {'stop p50 ms':>12} {'stop max ms':>12}")
+    print(f"{result['restarts']:>8} {failures:>5} {baseline['threads']:>5} -> {last['threads']:<4} "
+          f"{baseline['rss_mb']:>6} -> {last['rss_mb']:<6} {str(result['stop_p50_ms']):>12} "
+          f"{str(result['stop_max_ms']):>12}")
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if leaked else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+本地告警接收桩服务：可配置人为延迟，统计请求数与记录数
+"""
+import json
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubAlertServer:
+    def __init__(self, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0, keep_records: bool = False):
+        """
+        :param keep_records: 保存收到的每条记录 (time.monotonic(), record)，用于计算检测延迟
+        """
+        self.latency = latency
+        self.requests = 0
+        self.records = 0
+        self.received = []
+        self.keep_records = keep_records
+        self.connections = set()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                if server.latency:
+                    time.sleep(server.latency)
+                payload = json.loads(body)
+                data = payload.get('data')
+                records = data if isinstance(data, list) else [data]
+                with server._lock:
+                    server.requests += 1
+                    server.records += len(records)
+                    if server.keep_records:
+                        now = time.monotonic()
+                        server.received.extend((now, record) for record in records)
+                    server.connections.add(self.client_address)
+                self.send_response(204)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/alert"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class PacedMediaServer:
+    """
+    本地媒体文件服务：每个连接从文件头开始，先突发发送 burst_seconds 的数据，之后按媒体实时速率发送，模拟直播源
+    silent_after 指定时，发送到该媒体时长后保持连接但不再发送数据（模拟卡住的源站）
+    """
+
+    def __init__(self, path: str, media_seconds: float, burst_seconds: float = 0.0, host: str = '127.0.0.1',
+                 port: int = 0, silent_after: float = None):
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.rate = len(self.data) / media_seconds  # 字节/秒
+        self.burst = int(self.rate * burst_seconds)
+        self.silent_at = None if silent_after is None else int(self.rate * silent_after)
+        self._closed = threading.Event()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                data = server.data[:server.silent_at]
+                self.send_response(200)
+                self.send_header('Content-Type', 'video/x-flv')
+                self.end_headers()
+                try:
+                    self.wfile.write(data[:server.burst])
+                    sent = server.burst
+                    start = time.monotonic()
+                    chunk = max(1, int(server.rate * 0.02))
+                    while sent < len(data):
+                        if self._client_closed():
+                            return
+                        self.wfile.write(data[sent:sent + chunk])
+                        sent += chunk
+                        delay = start + (sent - server.burst) / server.rate - time.monotonic()
+                        if delay > 0:
+                            time.sleep(delay)
+                    if server.silent_at is not None:
+                        self.wfile.flush()
+                        server._closed.wait()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _client_closed(self):
+                # 回环连接的发送缓冲区很大，客户端断开后写入仍会成功，需要主动检查
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                try:
+                    return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+                except OSError:
+                    return True
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}/live/stream.flv"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._closed.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,527 @@
+"""
+合成直播流：用 PyAV 生成带注入事件的 FLV/MPEG-TS，并按媒体时间实时发送到本地文件、HTTP 或管道，
+或切片为按实时推进的 HLS 直播
+
+事件在媒体时间轴上指定 (类型, 开始秒, 持续秒)：
+    freeze 画面静止（重复同一帧），spike 码率突增（叠加噪声），silence 音频静音，clip 音频削波，写入媒体文件；
+    stall 发送暂停（连接保持但没有数据），由发送端在投递时注入，本地文件源不支持
+发送端记录每个连接实际到达各事件的时间（time.monotonic()），用于计算检测延迟
+"""
+import math
+import multiprocessing
+import os
+import select
+import socket
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence
+
+import av
+import numpy as np
+
+EVENT_STALL = 'stall'
+EVENT_FREEZE = 'freeze'
+EVENT_SPIKE = 'spike'
+EVENT_SILENCE = 'silence'
+EVENT_CLIP = 'clip'
+EVENT_KINDS = (EVENT_STALL, EVENT_FREEZE, EVENT_SPIKE, EVENT_SILENCE, EVENT_CLIP)
+AUDIO_EVENTS = (EVENT_SILENCE, EVENT_CLIP)
+
+# 合成音频：48kHz 立体声 AAC，440Hz 正弦，幅度约 -12 dBFS；clip 期间放大 4 倍后截断到满幅
+AUDIO_RATE = 48000
+AUDIO_FRAME = 1024
+AUDIO_AMPLITUDE = 0.25
+
+# 各容器格式的文件扩展名与 HTTP Content-Type
+FORMATS = {'flv': ('flv', 'video/x-flv'), 'mpegts': ('ts', 'video/mp2t')}
+
+Event = namedtuple('Event', 'kind at duration')
+
+
+def parse_event(text: str) -> Event:
+    """
+    解析命令行事件 kind:at:duration，如 stall:10:5
+    """
+    kind, at, duration = text.split(':')
+    if kind not in EVENT_KINDS:
+        raise ValueError(f"未知的事件类型 {kind}，可选 {'|'.join(EVENT_KINDS)}")
+    return Event(kind, float(at), float(duration))
+
+
+def _tone(pts: int, events: Sequence[Event]) -> av.AudioFrame:
+    """
+    从采样位置 pts 开始的一帧立体声正弦（fltp），按事件静音或削波
+    """
+    now = pts / AUDIO_RATE
+    active = {e.kind for e in events if e.at <= now < e.at + e.duration}
+    t = (pts + np.arange(AUDIO_FRAME, dtype=np.float64)) / AUDIO_RATE
+    wave = AUDIO_AMPLITUDE * np.sin(2 * np.pi * 440 * t)
+    if EVENT_SILENCE in active:
+        wave[:] = 0
+    elif EVENT_CLIP in active:
+        wave = np.clip(wave * 4, -1, 1)
+    samples = np.repeat(wave.astype(np.float32)[None, :], 2, axis=0)
+    frame = av.AudioFrame.from_ndarray(samples, format='fltp', layout='stereo')
+    frame.sample_rate = AUDIO_RATE
+    frame.pts = pts
+    return frame
+
+
+class SyntheticMedia:
+    """
+    生成好的媒体文件：index 为按字节位置排序的 (媒体秒, 字节位置)，用于按媒体时间发送
+    """
+
+    def __init__(self, path: str, fmt: str, seconds: float, events: Sequence[Event]):
+        self.path = path
+        self.fmt = fmt
+        self.seconds = seconds
+        self.events = tuple(events)
+        with open(path, 'rb') as f:
+            self.data = f.read()
+        self.index = self._build_index()
+
+    def _build_index(self):
+        container = av.open(self.path)
+        try:
+            index = [(float(packet.dts * packet.time_base), packet.pos) for packet in container.demux()
+                     if packet.dts is not None and packet.pos is not None and packet.pos >= 0]
+        finally:
+            container.close()
+        index.sort(key=lambda item: item[1])
+        # 媒体时间单调不减，B 帧的 dts 偏移不影响发送节奏
+        elapsed = 0.0
+        for i, (seconds, pos) in enumerate(index):
+            elapsed = max(elapsed, seconds)
+            index[i] = (elapsed, pos)
+        index.append((self.seconds, len(self.data)))
+        return index
+
+    @property
+    def content_type(self) -> str:
+        return FORMATS[self.fmt][1]
+
+    def bytes_between(self, start: float, end: float) -> int:
+        """
+        媒体时间 [start, end) 内的字节数
+        """
+        positions = [pos for seconds, pos in self.index if start <= seconds < end]
+        if not positions:
+            return 0
+        later = [pos for seconds, pos in self.index if seconds >= end]
+        return (later[0] if later else len(self.data)) - positions[0]
+
+
+def generate_stream(path: str = None, seconds: int = 30, fps: int = 25, gop: int = 50, width: int = 640,
+                    height: int = 360, bitrate: int = None, fmt: str = 'flv', events: Sequence[Event] = (),
+                    spike_noise: int = 48, audio: bool = False) -> SyntheticMedia:
+    """
+    生成合成流：移动的渐变条纹，关键帧间隔为 gop；freeze 期间重复事件开始时的画面，spike 期间叠加随机噪声
+    :param bitrate: 目标码率 (bps)，默认不限码率（ultrafast 默认质量）
+    :param spike_noise: spike 噪声幅度，越大码率越高
+    :param audio: 是否包含音频轨，有 silence/clip 事件时自动包含
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"不支持的格式 {fmt}，可选 {'|'.join(FORMATS)}")
+    audio = audio or any(e.kind in AUDIO_EVENTS for e in events)
+    if path is None:
+        tag = '-'.join(f"{e.kind}{e.at:g}+{e.duration:g}" for e in events if e.kind != EVENT_STALL)
+        name = f"stream-monitor-synthetic-{width}x{height}-{fps}fps-g{gop}-{bitrate or 'crf'}-{seconds}s"
+        if audio:
+            name += '-audio'
+        path = os.path.join(tempfile.gettempdir(), f"{name}{'-' + tag if tag else ''}.{FORMATS[fmt][0]}")
+    if os.path.exists(path):
+        return SyntheticMedia(path, fmt, seconds, events)
+
+    output = av.open(path + '.tmp', 'w', format=fmt)
+    stream = output.add_stream('libx264', rate=fps)
+    stream.width = width
+    stream.height = height
+    stream.pix_fmt = 'yuv420p'
+    stream.codec_context.gop_size = gop
+    if bitrate:
+        stream.bit_rate = int(bitrate)
+    stream.options = {'preset': 'ultrafast', 'bf': '0', 'keyint_min': str(gop), 'sc_threshold': '0'}
+    audio_stream = None
+    audio_pts = 0
+    if audio:
+        audio_stream = output.add_stream('aac', rate=AUDIO_RATE)
+        audio_stream.layout = 'stereo'
+
+    rng = np.random.default_rng(0)
+    ramp = np.linspace(0, 255, width, dtype=np.float32)
+    rows = np.arange(height, dtype=np.float32)[:, None]
+    frozen_at = None
+    for index in range(int(seconds * fps)):
+        now = index / fps
+        active = {e.kind for e in events if e.at <= now < e.at + e.duration}
+        if EVENT_FREEZE in active:
+            frozen_at = index if frozen_at is None else frozen_at
+            position = frozen_at
+        else:
+            frozen_at = None
+            position = index
+        luma = (ramp[None, :] + rows * 0.5 + position * 4) % 256
+        if EVENT_SPIKE in active:
+            luma = np.clip(luma + rng.integers(-spike_noise, spike_noise, luma.shape), 0, 255)
+        luma = luma.astype(np.uint8)
+        frame = av.VideoFrame.from_ndarray(np.repeat(luma[:, :, None], 3, axis=2), format='rgb24')
+        frame.pts = index
+        for packet in stream.encode(frame):
+            output.mux(packet)
+        # 音频编码到与当前视频帧对齐
+        while audio_stream is not None and audio_pts < (index + 1) * AUDIO_RATE / fps:
+            for packet in audio_stream.encode(_tone(audio_pts, events)):
+                output.mux(packet)
+            audio_pts += AUDIO_FRAME
+    for packet in stream.encode():
+        output.mux(packet)
+    if audio_stream is not None:
+        for packet in audio_stream.encode():
+            output.mux(packet)
+    output.close()
+    os.replace(path + '.tmp', path)
+    return SyntheticMedia(path, fmt, seconds, events)
+
+
+class MediaFeeder:
+    """
+    按媒体时间实时写出一路流：先突发发送 burst_seconds，stall 事件期间暂停，记录各事件实际开始的时间
+    """
+
+    def __init__(self, media: SyntheticMedia, write, burst_seconds: float = 0.0, closed=None):
+        """
+        :param write: 写出字节的函数
+        :param closed: 返回对端是否已断开的函数，断开时停止发送
+        """
+        self.media = media
+        self.write = write
+        self.burst_seconds = burst_seconds
+        self.closed = closed or (lambda: False)
+        self.event_times: Dict[Event, float] = {}
+
+    def run(self, stop: threading.Event):
+        media = self.media
+        data = media.data
+        stalls = sorted((e for e in media.events if e.kind == EVENT_STALL), key=lambda e: e.at)
+        pending = sorted(media.events, key=lambda e: e.at)
+        start = time.monotonic() - self.burst_seconds
+        sent = 0
+        for seconds, pos in media.index:
+            delay = start + seconds - time.monotonic()
+            if delay > 0 and stop.wait(delay):
+                return
+            while pending and pending[0].at <= seconds:
+                self.event_times[pending.pop(0)] = time.monotonic()
+            while stalls and stalls[0].at <= seconds:
+                # 暂停发送，之后的媒体时间整体后移
+                stall = stalls.pop(0)
+                if stop.wait(stall.duration):
+                    return
+                start += stall.duration
+            if pos > sent:
+                if self.closed():
+                    return
+                self.write(data[sent:pos])
+                sent = pos
+
+
+class SyntheticHttpServer:
+    """
+    合成流 HTTP 服务：任意路径返回同一路流，每个连接从头开始按媒体时间发送；
+    event_log 按路径记录首个连接到达各事件的时间，重连不会覆盖
+    """
+
+    def __init__(self, media: SyntheticMedia, burst_seconds: float = 1.0, host: str = '127.0.0.1', port: int = 0):
+        self.media = media
+        self.burst_seconds = burst_seconds
+        self.event_log: Dict[str, Dict[Event, float]] = {}
+        self.connections = 0
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                with server._lock:
+                    server.connections += 1
+                    events = server.event_log.setdefault(self.path, {})
+                self.send_response(200)
+                self.send_header('Content-Type', server.media.content_type)
+                self.end_headers()
+                feeder = MediaFeeder(server.media, self.wfile.write, server.burst_seconds, self._client_closed)
+                try:
+                    feeder.run(server._stop)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    for event, at in feeder.event_times.items():
+                        events.setdefault(event, at)
+
+            def _client_closed(self):
+                # 回环连接的发送缓冲区很大，客户端断开后写入仍会成功，需要主动检查
+                readable, _, _ = select.select([self.connection], [], [], 0)
+                try:
+                    return bool(readable) and not self.connection.recv(1, socket.MSG_PEEK)
+                except OSError:
+                    return True
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, name: str) -> str:
+        return f"{self.base_url}/live/{name}.{FORMATS[self.media.fmt][0]}"
+
+    def events_for(self, url: str) -> Dict[Event, float]:
+        return self.event_log.get(url[len(self.base_url):], {})
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class SyntheticHlsServer:
+    """
+    合成 HLS 直播：MPEG-TS 合成流按 segment_seconds 切片（gop 需与分片时长对齐），滑动窗口媒体播放列表按实时推进；
+    支持 keep-alive、ETag/Last-Modified 条件请求（304），分片循环使用，回绕处标记 EXT-X-DISCONTINUITY；
+    /master.m3u8 为只有一个变体的主播放列表
+    """
+
+    def __init__(self, media: SyntheticMedia, segment_seconds: float = 1.0, window: int = 3,
+                 start_sequence: int = 100, end_after: int = None, host: str = '127.0.0.1', port: int = 0):
+        """
+        :param end_after: 发布该数量的分片后追加 EXT-X-ENDLIST
+        """
+        if media.fmt != 'mpegts':
+            raise ValueError("HLS 分片需要 mpegts 格式")
+        self.segment_seconds = segment_seconds
+        self.window = window
+        self.start_sequence = start_sequence
+        self.end_after = end_after
+        self.segments = self._cut(media, segment_seconds)
+        self.connections = 0
+        self.playlist_requests = 0
+        self.not_modified = 0
+        self.segment_requests = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._started = None
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                with server._lock:
+                    server.connections += 1
+
+            def handle(self):
+                try:
+                    super().handle()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # 客户端（如 FFmpeg 的 hls 解复用器）直接断开 keep-alive 连接
+
+            def do_GET(self):
+                path = self.path.split('?', 1)[0]
+                if path == '/master.m3u8':
+                    self._send(200, b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000\nlive.m3u8\n',
+                               'application/vnd.apple.mpegurl')
+                elif path.endswith('.m3u8'):
+                    body, etag, modified = server.playlist()
+                    with server._lock:
+                        server.playlist_requests += 1
+                    if self.headers.get('If-None-Match') == etag:
+                        with server._lock:
+                            server.not_modified += 1
+                        self._send(304, b'', None, etag, modified)
+                    else:
+                        self._send(200, body, 'application/vnd.apple.mpegurl', etag, modified)
+                elif path.startswith('/seg') and path.endswith('.ts'):
+                    sequence = int(path[4:-3])
+                    with server._lock:
+                        server.segment_requests += 1
+                    self._send(200, server.segments[(sequence - server.start_sequence) % len(server.segments)],
+                               'video/mp2t')
+                else:
+                    self._send(404, b'', None)
+
+            def _send(self, status, body, content_type, etag=None, modified=None):
+                self.send_response(status)
+                if content_type:
+                    self.send_header('Content-Type', content_type)
+                if etag:
+                    self.send_header('ETag', etag)
+                    self.send_header('Last-Modified', modified)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with server._lock:
+                    server.bytes_sent += len(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @staticmethod
+    def _cut(media: SyntheticMedia, segment_seconds: float) -> List[bytes]:
+        cuts = [0]
+        for seconds, pos in media.index[:-1]:
+            if seconds >= len(cuts) * segment_seconds - 1e-6 and pos > cuts[-1]:
+                cuts.append(pos)
+        cuts.append(len(media.data))
+        return [media.data[start:end] for start, end in zip(cuts, cuts[1:])]
+
+    def playlist(self):
+        """
+        当前的媒体播放列表，返回 (内容, ETag, Last-Modified)
+        """
+        published = int((time.monotonic() - self._started) / self.segment_seconds) + 1
+        ended = self.end_after is not None and published >= self.end_after
+        if ended:
+            published = self.end_after
+        latest = self.start_sequence + published - 1
+        first = max(self.start_sequence, latest - self.window + 1)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f"#EXT-X-TARGETDURATION:{math.ceil(self.segment_seconds)}",
+                 f"#EXT-X-MEDIA-SEQUENCE:{first}"]
+        for sequence in range(first, latest + 1):
+            if sequence > self.start_sequence and (sequence - self.start_sequence) % len(self.segments) == 0:
+                lines.append('#EXT-X-DISCONTINUITY')
+            lines.append(f"#EXTINF:{self.segment_seconds:.3f},")
+            lines.append(f"seg{sequence}.ts")
+        if ended:
+            lines.append('#EXT-X-ENDLIST')
+        modified = formatdate(time.time() - (time.monotonic() - self._started) % self.segment_seconds, usegmt=True)
+        return ('\n'.join(lines) + '\n').encode(), f'"{first}-{latest}"', modified
+
+    def url(self, name: str = 'live') -> str:
+        return f"{self.base_url}/{name}.m3u8"
+
+    def counters(self) -> Dict[str, int]:
+        return {'connections': self.connections, 'playlist_requests': self.playlist_requests,
+                'not_modified': self.not_modified, 'segment_requests': self.segment_requests,
+                'bytes_sent': self.bytes_sent}
+
+    def __enter__(self):
+        self._started = time.monotonic()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class PipeSource:
+    """
+    合成流管道源：后台线程把流写入 os.pipe()，发送完毕后关闭写端（读端收到 EOF），地址为 pipe:<fd>；
+    管道只能读一次，重连后从当前位置继续读取
+    """
+
+    def __init__(self, media: SyntheticMedia, burst_seconds: float = 1.0):
+        self.media = media
+        self._read_fd, self._write_fd = os.pipe()
+        self.url = f"pipe:{self._read_fd}"
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.feeder = MediaFeeder(media, self._write, burst_seconds)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _write(self, data: bytes):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(self._write_fd, view):]
+
+    def _run(self):
+        try:
+            self.feeder.run(self._stop)
+        except OSError:
+            pass
+        finally:
+            self._close('_write_fd')
+
+    def _close(self, name: str):
+        # 关闭后置为 None，避免重复关闭已被复用的描述符
+        with self._lock:
+            fd = getattr(self, name)
+            setattr(self, name, None)
+        if fd is not None:
+            os.close(fd)
+
+    @property
+    def event_times(self) -> Dict[Event, float]:
+        return self.feeder.event_times
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        # 先关闭读端，阻塞在写入上的发送线程会收到 EPIPE
+        self._close('_read_fd')
+        self._thread.join(timeout=1)
+        if not self._thread.is_alive():
+            self._close('_write_fd')
+
+
+@contextmanager
+def serve_in_process(factory):
+    """
+    在子进程中运行 factory() 创建的服务（SyntheticHttpServer/SyntheticHlsServer），服务端 CPU 与内存不计入当前进程；
+    产出 (服务对象的 base_url, 计数字典)，计数字典在退出时由服务的 counters() 填充
+    """
+    context = multiprocessing.get_context('fork')
+    parent, child = context.Pipe()
+
+    def serve():
+        with factory() as server:
+            child.send(server.base_url)
+            child.recv()
+            child.send(server.counters() if hasattr(server, 'counters') else {})
+
+    process = context.Process(target=serve, daemon=True)
+    process.start()
+    counters = {}
+    try:
+        yield parent.recv(), counters
+    finally:
+        parent.send(None)
+        counters.update(parent.recv())
+        process.join(timeout=5)
+
+
+def stream_urls(kind: str, media: SyntheticMedia, count: int, burst_seconds: float = 1.0) -> List:
+    """
+    准备 count 路流的地址，返回 (地址列表, 需要 __enter__/__exit__ 的源对象列表, 取事件时间的函数)
+    :param kind: file|http|pipe
+    """
+    if kind == 'file':
+        return [media.path] * count, [], lambda url: {}
+    if kind == 'http':
+        server = SyntheticHttpServer(media, burst_seconds)
+        return [server.url(f"s{i}") for i in range(count)], [server], server.events_for
+    if kind == 'pipe':
+        pipes = [PipeSource(media, burst_seconds) for _ in range(count)]
+        by_url = {pipe.url: pipe for pipe in pipes}
+        return [pipe.url for pipe in pipes], pipes, lambda url: by_url[url].event_times
+    raise ValueError(f"未知的源类型 {kind}，可选 file|http|pipe")
@@ -0,0 +1,63 @@
+"""
+进程资源采样：线程数、RSS、CPU 占用
+"""
+import os
+import resource
+import threading
+import time
+
+
+def current_rss_kb():
+    """
+    当前常驻内存 (KB)，优先读取 /proc，不可用时退化为峰值 RSS
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def os_thread_count():
+    """
+    操作系统层面的线程数
+    """
+    try:
+        return len(os.listdir('/proc/self/task'))
+    except OSError:
+        return threading.active_count()
+
+
+class ResourceSampler:
+    """
+    在一段时间窗口内统计 CPU 占用率与线程/内存峰值
+    """
+
+    def __init__(self):
+        self.wall_start = None
+        self.cpu_start = None
+        self.max_threads = 0
+        self.max_rss_kb = 0
+
+    def start(self):
+        self.wall_start = time.monotonic()
+        self.cpu_start = time.process_time()
+        self.sample()
+
+    def sample(self):
+        self.max_threads = max(self.max_threads, os_thread_count())
+        self.max_rss_kb = max(self.max_rss_kb, current_rss_kb())
+
+    def result(self):
+        self.sample()
+        wall = time.monotonic() - self.wall_start
+        cpu = time.process_time() - self.cpu_start
+        return {
+            'threads': self.max_threads,
+            'rss_mb': round(self.max_rss_kb / 1024, 1),
+            'cpu_percent': round(cpu / wall * 100, 1) if wall > 0 else 0,
+            'wall_seconds': round(wall, 2),
+        }
@@ -0,0 +1,144 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+# 告警级别顺序，info 即运行正常
+LEVEL_ORDER = {'info': 0, 'warning': 1, 'error': 2}
+# 状态名称，用于 transition 字段，如 ok->warning
+STATE_NAMES = {'info': 'ok', 'warning': 'warning', 'error': 'error'}
+
+# Webhook 发送模式：all 每次检查都发送；change 仅状态变化时发送，并周期发送汇总心跳
+MODE_ALL = 'all'
+MODE_CHANGE = 'change'
+
+
+class AlertState:
+    """
+    单个流的告警状态
+    """
+    __slots__ = ('level', 'candidate', 'count', 'changed_at', 'summary')
+
+    def __init__(self):
+        self.level = 'info'  # 已发出的状态
+        self.candidate = None  # 待确认的新状态
+        self.count = 0  # 新状态连续出现的次数
+        self.changed_at = float('-inf')  # 上次状态切换时间
+        self.summary = None  # 最近一次检查的紧凑摘要，用于汇总心跳
+
+
+class AlertFilter:
+    """
+    告警状态机 - 只在状态切换（ok→warning、warning→error、恢复等）时放行告警
+
+    hysteresis：新状态需连续出现 N 次检查才切换；min_hold：切换后至少保持的秒数。
+    所有流最近一次的摘要在 digest_interval 到期时合并为一条紧凑的汇总心跳。
+    """
+
+    def __init__(self, hysteresis: int = 2, min_hold: float = 30, digest_interval: float = 300):
+        self.hysteresis = max(1, int(hysteresis))
+        self.min_hold = min_hold
+        self.digest_interval = digest_interval
+        self._states: Dict[str, AlertState] = {}
+        self._lock = threading.Lock()
+        self._last_digest = time.monotonic()
+        self.stats = {'observed': 0, 'emitted': 0}
+
+    def observe(self, record: Dict, now: float = None) -> Optional[Dict]:
+        """
+        记录一次检查结果，状态切换时返回带 transition 字段的告警，否则返回 None
+        """
+        now = time.monotonic() if now is None else now
+        stream_id = record.get('streamId')
+        level = record.get('alertLevel', 'info')
+        if level not in LEVEL_ORDER:
+            level = 'info'
+
+        with self._lock:
+            self.stats['observed'] += 1
+            state = self._states.get(stream_id)
+            if state is None:
+                state = self._states[stream_id] = AlertState()
+            state.summary = (stream_id, level, record.get('playable'), record.get('bitrate'),
+                             record.get('frameRate'))
+
+            if level == state.level:
+                state.candidate = None
+                state.count = 0
+                return None
+
+            if state.candidate == level:
+                state.count += 1
+            else:
+                state.candidate = level
+                state.count = 1
+
+            if state.count < self.hysteresis or now - state.changed_at < self.min_hold:
+                return None
+
+            previous = state.level
+            state.level = level
+            state.candidate = None
+            state.count = 0
+            state.changed_at = now
+            self.stats['emitted'] += 1
+
+        return {
+            **record,
+            'previousLevel': previous,
+            'transition': f"{STATE_NAMES[previous]}->{STATE_NAMES[level]}"
+        }
+
+    def forget(self, stream_id: str):
+        """
+        移除流的状态（流被删除时）
+        """
+        with self._lock:
+            self._states.pop(stream_id, None)
+
+    def take_digest(self, now: float = None) -> Optional[Dict]:
+        """
+        汇总心跳到期时返回汇总报文并重新计时，否则返回 None
+        streams 中每项为 [streamId, alertLevel, playable, bitrate(kbps), frameRate]
+        """
+        if not self.digest_interval or self.digest_interval <= 0:
+            return None
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if now - self._last_digest < self.digest_interval:
+                return None
+            self._last_digest = now
+            summaries = [state.summary for state in self._states.values() if state.summary]
+
+        levels = {level: 0 for level in LEVEL_ORDER}
+        for summary in summaries:
+            levels[summary[1]] += 1
+        return {
+            "type": "stream_monitor_digest",
+            "timestamp": datetime.now().isoformat(),
+            "data": {
+                "total": len(summaries),
+                "levels": levels,
+                "streams": [list(summary) for summary in summaries]
+            }
+        }
+
+
+# 状态机单例（所有流共享）
+_filter_instance: Optional[AlertFilter] = None
+_filter_lock = threading.Lock()
+
+
+def get_alert_filter(webhook_config: Dict) -> AlertFilter:
+    """获取进程共享的告警状态机（单例模式）"""
+    global _filter_instance
+
+    with _filter_lock:
+        if _filter_instance is None:
+            _filter_instance = AlertFilter(
+                hysteresis=webhook_config.get('hysteresis', 2),
+                min_hold=webhook_config.get('min_hold', 30),
+                digest_interval=webhook_config.get('digest_interval', 300)
+            )
+
+    return _filter_instance
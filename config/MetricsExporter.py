@@ -0,0 +1,262 @@
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from config.log4py import logger
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PREFIX = 'stream_monitor_'
+# /profile 单次采样的最长秒数
+MAX_PROFILE_SECONDS = 300
+
+# 指标族：(名称, 类型, 说明, metrics 字段, 换算系数)，counter 的样本名追加 _total；up 取自 status 的 running
+FAMILIES = (
+    ('up', 'gauge', '监控任务是否运行', 'running', None),
+    ('packets', 'counter', '收到的数据包总数', 'total_packets', None),
+    ('video_packets', 'counter', '视频包总数', 'video_packets', None),
+    ('audio_packets', 'counter', '音频包总数', 'audio_packets', None),
+    ('keyframes', 'counter', '关键帧总数', 'keyframes', None),
+    ('start_time_seconds', 'gauge', '本次连接开始时间', 'start_time', None),
+    ('last_packet_time_seconds', 'gauge', '最后一个数据包的时间', 'last_packet_time', None),
+    ('last_keyframe_time_seconds', 'gauge', '最后一个关键帧的时间', 'last_keyframe_time', None),
+    ('bitrate_bps', 'gauge', '当前码率', 'current_bitrate', None),
+    ('average_bitrate_bps', 'gauge', '平均码率', 'average_bitrate', None),
+    ('frame_rate', 'gauge', '帧率', 'frame_rate', None),
+    ('gop_size_frames', 'gauge', 'GOP 帧数', 'gop_size', None),
+    ('gop_duration_seconds', 'gauge', 'GOP 媒体时长', 'gop_duration', None),
+    ('jitter_seconds', 'gauge', '到达抖动', 'jitter', 0.001),
+    ('packet_loss_ratio', 'gauge', '估算丢包率', 'packet_loss', 0.01),
+    ('buffer_health_ratio', 'gauge', '缓冲区健康度', 'buffer_health', 0.01),
+    ('width_pixels', 'gauge', '视频宽度', 'width', None),
+    ('height_pixels', 'gauge', '视频高度', 'height', None),
+    ('bit_depth', 'gauge', '位深', 'bit_depth', None),
+    ('decodes', 'counter', '帧质量分析解码次数', 'decode_count', None),
+    ('decode_cpu_seconds', 'counter', '解码累计 CPU 时间', 'decode_cpu', None),
+    ('brightness', 'gauge', '最近分析帧的平均亮度', 'brightness', None),
+    ('contrast', 'gauge', '最近分析帧的对比度', 'contrast', None),
+    ('black_ratio', 'gauge', '最近分析帧的黑色像素比例', 'black_ratio', None),
+    ('black_frame', 'gauge', '最近分析帧是否黑屏', 'black_frame', None),
+    ('frame_diff', 'gauge', '最近两次分析帧的差异', 'frame_diff', None),
+    ('frozen_frame', 'gauge', '最近分析帧是否静止', 'frozen_frame', None),
+    ('blockiness', 'gauge', '最近分析帧的块效应', 'blockiness', None),
+    ('open_duration_seconds', 'gauge', '最近一次 av.open 耗时', 'open_seconds', None),
+    ('first_packet_seconds', 'gauge', '最近一次连接到首个数据包的耗时', 'first_packet_seconds', None),
+    ('first_keyframe_seconds', 'gauge', '最近一次连接到首个关键帧的耗时', 'first_keyframe_seconds', None),
+    ('live_delay_seconds', 'gauge', '落后直播边缘的延迟（包时间戳相对到达时间）', 'live_delay', None),
+    ('delay_growth_ratio', 'gauge', '延迟增长率（秒/秒）', 'delay_growth', None),
+    ('end_to_end_delay_seconds', 'gauge', '端到端延迟（编码器墙上时间到到达）', 'end_to_end_delay', None),
+    ('audio_rms_dbfs', 'gauge', '最近音频采样窗口的 RMS 电平', 'audio_rms_dbfs', None),
+    ('audio_peak_dbfs', 'gauge', '最近音频采样窗口的峰值电平', 'audio_peak_dbfs', None),
+    ('audio_clip_ratio', 'gauge', '最近音频采样窗口的削波采样比例', 'audio_clip_ratio', None),
+    ('audio_windows', 'counter', '已分析的音频采样窗口数', 'audio_windows', None),
+    # hls 引擎
+    ('hls_media_sequence', 'gauge', 'HLS 最新分片的媒体序列号', 'hls_media_sequence', None),
+    ('hls_target_duration_seconds', 'gauge', 'HLS 目标时长', 'hls_target_duration', None),
+    ('hls_segments', 'counter', 'HLS 观察到的新分片数', 'hls_segments', None),
+    ('hls_sequence_gaps', 'counter', 'HLS 未观察到就被移出播放列表的分片数', 'hls_sequence_gaps', None),
+    ('hls_target_duration_violations', 'counter', 'HLS 超过目标时长的分片数', 'hls_target_duration_violations', None),
+    ('hls_playlist_not_modified', 'counter', 'HLS 播放列表条件请求返回 304 的次数', 'hls_playlist_not_modified', None),
+    ('hls_stale_polls', 'counter', 'HLS 播放列表过期时的轮询次数', 'hls_stale_polls', None),
+    ('hls_segment_throughput_bps', 'gauge', 'HLS 最近采样分片的下载吞吐', 'hls_throughput', None),
+)
+# info 指标的标签字段
+INFO_LABELS = ('codec', 'profile', 'color_space', 'open_profile')
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value, scale=None) -> Optional[bytes]:
+    """
+    样本值的 OpenMetrics 文本，None 表示不输出该样本
+    """
+    if value is None:
+        return None
+    if scale is not None:
+        value = value * scale
+    if value is True or value is False:
+        return b'1' if value else b'0'
+    if isinstance(value, int):
+        return str(value).encode()
+    value = float(value)
+    if math.isnan(value):
+        return b'NaN'
+    if math.isinf(value):
+        return b'+Inf' if value > 0 else b'-Inf'
+    return repr(value).encode()
+
+
+class _StreamEntry:
+    """
+    单个流预先渲染的样本行：标签只在流名变化时转义一次，数值未变的样本行直接复用
+    """
+    __slots__ = ('name', 'labels', 'values', 'lines', 'info_key', 'info_line')
+
+    def __init__(self, stream_id: str, stream_name: str):
+        self.name = stream_name
+        self.labels = f'stream_id="{_escape(stream_id)}",stream_name="{_escape(stream_name)}"'.encode()
+        self.values = [None] * len(FAMILIES)
+        self.lines = [b''] * len(FAMILIES)
+        self.info_key = None
+        self.info_line = b''
+
+
+class MetricsExporter:
+    """
+    OpenMetrics 指标导出 - 后台线程按 refresh_interval 从 source（manager.get_status）增量刷新预渲染的响应体，
+    抓取请求只返回最近一次生成的字节串，不读取流状态、不加锁；
+    刷新线程读取的包计数是解复用线程整体发布的不可变快照（StreamMonitor.packet_snapshot），不与解复用线程争用锁
+    """
+
+    def __init__(self, source: Callable[[], Dict[str, dict]], refresh_interval: float = 5,
+                 profiler: Callable[[str, float], Optional[str]] = None):
+        """
+        :param source: 返回 {stream_id: status} 的函数，status 中 metrics 为 StreamMonitor.metrics_snapshot()
+        :param profiler: 触发单流采样分析的函数（manager.profile_stream），返回折叠栈文件路径；为 None 时不提供 /profile
+        """
+        self.source = source
+        self.refresh_interval = refresh_interval
+        self.profiler = profiler
+        self.body = b'# EOF\n'
+        self._entries: Dict[str, _StreamEntry] = {}
+        self._fields = [(i, key, scale, self._sample_name(name, kind).encode())
+                        for i, (name, kind, _, key, scale) in enumerate(FAMILIES) if i]
+        self._up_prefix = self._sample_name(*FAMILIES[0][:2]).encode()
+        self._headers = [f'# TYPE {PREFIX}{name} {kind}\n# HELP {PREFIX}{name} {help_text}\n'.encode()
+                         for name, kind, help_text, _, _ in FAMILIES]
+        self._info_header = f'# TYPE {PREFIX}stream info\n# HELP {PREFIX}stream 流编码信息\n'.encode()
+        self._stop = threading.Event()
+        self._thread = None
+        self.server = None
+        self._server_thread = None
+
+    @staticmethod
+    def _sample_name(name: str, kind: str) -> str:
+        return f'{PREFIX}{name}_total' if kind == 'counter' else f'{PREFIX}{name}'
+
+    def refresh(self):
+        """
+        重新生成响应体：只重新渲染数值发生变化的样本行
+        """
+        status = self.source()
+        entries = self._entries
+        for stream_id in [stream_id for stream_id in entries if stream_id not in status]:
+            del entries[stream_id]
+
+        fields = self._fields
+        for stream_id, info in status.items():
+            metrics = info.get('metrics') or {}
+            name = info.get('stream_name', '')
+            entry = entries.get(stream_id)
+            if entry is None or entry.name != name:
+                entry = entries[stream_id] = _StreamEntry(stream_id, name)
+            values = entry.values
+            lines = entry.lines
+            labels = entry.labels
+            running = bool(info.get('running'))
+            if running is not values[0]:
+                values[0] = running
+                lines[0] = b'%s{%s} %s\n' % (self._up_prefix, labels, _number(running))
+            for i, key, scale, prefix in fields:
+                value = metrics.get(key)
+                if value is not values[i] and value != values[i]:
+                    values[i] = value
+                    number = _number(value, scale)
+                    lines[i] = b'' if number is None else b'%s{%s} %s\n' % (prefix, labels, number)
+            info_key = tuple(metrics.get(label) for label in INFO_LABELS)
+            if info_key != entry.info_key:
+                entry.info_key = info_key
+                info_labels = ''.join(f',{label}="{_escape(value)}"' for label, value in zip(INFO_LABELS, info_key)
+                                      if value is not None)
+                entry.info_line = b'%sstream_info{%s%s} 1\n' % (PREFIX.encode(), labels, info_labels.encode())
+
+        streams = list(entries.values())
+        parts = []
+        for i, header in enumerate(self._headers):
+            parts.append(header)
+            parts.extend(entry.lines[i] for entry in streams)
+        parts.append(self._info_header)
+        parts.extend(entry.info_line for entry in streams)
+        parts.append(b'# EOF\n')
+        self.body = b''.join(parts)
+        return self.body
+
+    def _refresh_loop(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error("刷新导出指标失败")
+                logger.error(e)
+            self._stop.wait(self.refresh_interval)
+
+    def start(self, host: str = '0.0.0.0', port: int = 9108):
+        """
+        启动刷新线程与 HTTP 服务，GET /metrics 返回预渲染的响应体
+        """
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                if url.path == '/profile' and exporter.profiler is not None:
+                    self._profile(parse_qs(url.query))
+                    return
+                if url.path not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = exporter.body
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _profile(self, query):
+                """
+                GET /profile?stream_id=xx&seconds=10 触发单流采样分析，立即返回 202 与折叠栈文件路径
+                """
+                stream_id = (query.get('stream_id') or [''])[0]
+                try:
+                    seconds = min(float((query.get('seconds') or ['10'])[0]), MAX_PROFILE_SECONDS)
+                except ValueError:
+                    self.send_error(400, 'invalid seconds')
+                    return
+                path = exporter.profiler(stream_id, seconds) if stream_id and seconds > 0 else None
+                if path is None:
+                    self.send_error(404, 'unknown stream_id')
+                    return
+                body = f"{path}\n".encode()
+                self.send_response(202)
+                self.send_header('Content-Type', 'text/plain; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("指标导出请求: %s - " + format, self.address_string(), *args)
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name="metrics-exporter", daemon=True)
+        self._thread.start()
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self._server_thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self._server_thread.start()
+        logger.info(f"指标导出已启动: http://{host}:{self.server.server_address[1]}/metrics")
+
+    def stop(self):
+        """
+        停止 HTTP 服务与刷新线程
+        """
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+            self._thread = None
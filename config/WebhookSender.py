@@ -1,27 +1,201 @@
+import itertools
 import json
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
 
+from config.AlertFilter import MODE_CHANGE, get_alert_filter
+from config.ConfigLoader import get_config
 from config.log4py import logger
 
 
+def _new_session(pool_size: int = 10) -> requests.Session:
+    """
+    创建带连接池的 keep-alive 会话
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update({
+        'Content-Type': 'application/json; charset=utf-8',
+        'User-Agent': 'StreamMonitor/1.0'
+    })
+    return session
+
+
+class WebhookDispatcher:
+    """
+    异步批量 Webhook 投递 - 进程共享的有界队列，由后台线程合并多个流的记录后批量 POST
+
+    队列按 streamId 合并：同一流尚未发出的旧记录直接被新记录覆盖（状态切换记录不合并）；
+    队列满时丢弃最早的记录，调用方永远不会被阻塞。
+    """
+
+    def __init__(self, url: str, max_batch_size: int = 1, linger_ms: float = 200, queue_size: int = 10000,
+                 timeout: float = 10):
+        """
+        :param max_batch_size: 单次 POST 的最大记录数，为 1 时保持单条报文格式，大于 1 时发送批量格式
+        :param linger_ms: 批次未满时最多等待的毫秒数
+        :param queue_size: 队列容量（按流去重后的记录数）
+        :param timeout: HTTP 请求超时(秒)
+        """
+        self.url = url
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.linger = max(0.0, linger_ms / 1000.0)
+        self.queue_size = max(1, int(queue_size))
+        self.timeout = timeout
+        self.session = _new_session(pool_size=1)
+        self.running = False
+        self._pending = OrderedDict()
+        self._first_enqueued = None
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.stats = {'submitted': 0, 'coalesced': 0, 'dropped': 0, 'sent': 0, 'failed': 0, 'requests': 0}
+
+    def start(self):
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        self._thread = threading.Thread(target=self._run, name="webhook-sender", daemon=True)
+        self._thread.start()
+
+    def submit(self, alert_data: Dict, coalesce: bool = True) -> bool:
+        """
+        非阻塞入队
+        :param coalesce: 是否与同一流尚未发出的记录合并；change 模式的状态切换记录必须逐条发出
+        """
+        data = alert_data.get('data') or {}
+        key = data.get('streamId') if coalesce and isinstance(data, dict) else None
+        if key is None:
+            key = f"__{next(self._seq)}"
+        with self._cond:
+            self.stats['submitted'] += 1
+            if key in self._pending:
+                self._pending[key] = alert_data
+                self.stats['coalesced'] += 1
+                return True
+            if len(self._pending) >= self.queue_size:
+                self._pending.popitem(last=False)
+                self.stats['dropped'] += 1
+            self._pending[key] = alert_data
+            if len(self._pending) == 1:
+                self._first_enqueued = time.monotonic()
+                self._cond.notify()
+            elif len(self._pending) >= self.max_batch_size:
+                self._cond.notify()
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """
+        停止后台线程，尽量发出剩余记录
+        """
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=timeout)
+        self.session.close()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _next_batch(self):
+        """
+        等待直到批次已满、等待超过 linger 或停止，取出一批记录
+        """
+        with self._cond:
+            while not self._pending:
+                if not self.running:
+                    return None
+                self._cond.wait()
+            while self.running and len(self._pending) < self.max_batch_size:
+                remaining = self._first_enqueued + self.linger - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = [self._pending.popitem(last=False)[1]
+                     for _ in range(min(self.max_batch_size, len(self._pending)))]
+            if self._pending:
+                self._first_enqueued = time.monotonic()
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._post(batch)
+
+    def _post(self, batch):
+        if self.max_batch_size > 1:
+            # 汇总心跳等非流记录单独发送，不混入批量报文
+            records = [alert for alert in batch if alert.get('type') == 'stream_monitor']
+            for alert in batch:
+                if alert.get('type') != 'stream_monitor':
+                    self._post_payload(alert, 1)
+            if records:
+                self._post_payload({
+                    "type": "stream_monitor_batch",
+                    "timestamp": datetime.now().isoformat(),
+                    "data": [alert['data'] for alert in records]
+                }, len(records))
+        else:
+            self._post_payload(batch[0], 1)
+
+    def _post_payload(self, payload, count):
+        try:
+            self.stats['requests'] += 1
+            response = self.session.post(self.url, data=json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                                         timeout=self.timeout)
+            if response.status_code in [200, 201, 204]:
+                self.stats['sent'] += count
+                logger.debug("Webhook 批量发送成功: %s 条", count)
+            else:
+                self.stats['failed'] += count
+                logger.warning(f"Webhook 发送失败: {response.status_code} - {response.text}")
+        except requests.exceptions.RequestException as e:
+            self.stats['failed'] += count
+            logger.error(f"Webhook 请求失败: {e}")
+        except Exception as e:
+            self.stats['failed'] += count
+            logger.error(f"发送 Webhook 时发生错误: {e}")
+
+
 class WebhookSender:
     """
     Webhook 发送器
     """
 
-    def __init__(self, config_path: str = "config.yaml"):
-        self.config = self._load_config(config_path)
-        self.enabled = self.config.get('webhook', {}).get('enabled', False)
-        self.url = self.config.get('webhook', {}).get('url', '')
-        self.session = requests.Session()
-        self.session.headers.update({
-            'Content-Type': 'application/json; charset=utf-8',
-            'User-Agent': 'StreamMonitor/1.0'
-        })
+    def __init__(self, config_path: str = "config.yaml", webhook_config: Dict = None):
+        """
+        :param webhook_config: 已解析的 webhook 配置段，传入时不再读取配置文件
+        """
+        if webhook_config is None:
+            webhook_config = self._load_config(config_path).get('webhook') or {}
+        webhook = webhook_config
+        self.enabled = webhook.get('enabled', False)
+        self.url = webhook.get('url', '')
+        self.timeout = webhook.get('timeout', 10)  # HTTP 请求超时(秒)，同步与异步投递共用
+        self.session = _new_session()
+        # 异步批量投递（默认开启），关闭时退化为同步逐条发送
+        self.dispatcher = None
+        if self.enabled and self.url and webhook.get('async', True):
+            self.dispatcher = get_dispatcher(self.url, webhook)
+        # change 模式：只在告警状态切换时发送，并周期发送所有流的汇总心跳
+        self.mode = webhook.get('mode', 'all')
+        self.alert_filter = get_alert_filter(webhook) if self.mode == MODE_CHANGE else None
+        self._digest_thread = None
+        self._digest_lock = threading.Lock()
 
     def _load_config(self, config_path: str) -> Dict:
         """
@@ -29,7 +203,7 @@ class WebhookSender:
         """
         try:
             with open(config_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+                return yaml.safe_load(f) or {}
         except FileNotFoundError:
             logger.warning(f"配置文件 {config_path} 未找到，使用默认配置")
             return {}
@@ -39,29 +213,79 @@ class WebhookSender:
 
     def send_alert(self, stream_data: Dict) -> bool:
         """
-        发送警报到 Webhook
+        发送警报到 Webhook；异步模式下只入队，立即返回
         """
         if not self.enabled or not self.url:
             return False
 
+        if self.alert_filter is not None:
+            self._start_digest()
+            stream_data = self.alert_filter.observe(stream_data)
+            if stream_data is None:
+                # 状态未变化，不发送
+                return False
+
+        # 准备报警数据
+        alert_data = {
+            "type": "stream_monitor",
+            "timestamp": datetime.now().isoformat(),
+            "data": stream_data
+        }
+        return self._deliver(alert_data, coalesce=self.alert_filter is None)
+
+    def forget_stream(self, stream_id: str):
+        """
+        流被移除时清除其告警状态，不再出现在汇总心跳中
+        """
+        if self.alert_filter is not None:
+            self.alert_filter.forget(stream_id)
+
+    def _start_digest(self):
+        """
+        首次发送告警时启动汇总心跳线程，按时发送，不依赖告警的到达
+        """
+        if self._digest_thread is not None:
+            return
+        with self._digest_lock:
+            if self._digest_thread is None:
+                self._digest_thread = threading.Thread(target=self._digest_loop, name="webhook-digest", daemon=True)
+                self._digest_thread.start()
+
+    def _digest_loop(self):
+        """
+        汇总心跳线程：每秒（间隔更短时按间隔）检查一次是否到期
+        """
+        interval = self.alert_filter.digest_interval
+        if not interval or interval <= 0:
+            return
+        while True:
+            time.sleep(min(interval, 1.0))
+            try:
+                digest = self.alert_filter.take_digest()
+                if digest is not None:
+                    self._deliver(digest)
+            except Exception as e:
+                logger.error("发送汇总心跳失败")
+                logger.error(f"发送汇总心跳失败: {e}")
+
+    def _deliver(self, alert_data: Dict, coalesce: bool = True) -> bool:
+        """
+        投递一条报文：异步模式入队，否则同步发送
+        """
         try:
-            # 准备报警数据
-            alert_data = {
-                "type": "stream_monitor",
-                "timestamp": datetime.now().isoformat(),
-                "data": stream_data
-            }
+            if self.dispatcher is not None:
+                return self.dispatcher.submit(alert_data, coalesce)
 
             data = json.dumps(alert_data, ensure_ascii=False)
-            logger.info("统计数据：\n %s", data)
+            logger.debug("统计数据：\n %s", data)
             response = self.session.post(
                 self.url,
-                data=data,
-                timeout=10
+                data=data.encode('utf-8'),
+                timeout=self.timeout
             )
 
             if response.status_code in [200, 201, 204]:
-                logger.debug(f"Webhook 发送成功: {stream_data.get('streamId')}")
+                logger.debug("Webhook 发送成功: %s", alert_data.get('type'))
                 return True
             else:
                 logger.warning(f"Webhook 发送失败: {response.status_code} - {response.text}")
@@ -73,3 +297,59 @@ class WebhookSender:
         except Exception as e:
             logger.error(f"发送 Webhook 时发生错误: {e}")
             return False
+
+
+# 发送器单例（所有流共享）
+_sender_instance: Optional[WebhookSender] = None
+_sender_lock = threading.Lock()
+
+
+def get_webhook_sender(webhook_config: Dict = None) -> WebhookSender:
+    """获取进程共享的 Webhook 发送器（单例模式），未传配置时取全局配置快照的 webhook 段"""
+    global _sender_instance
+
+    with _sender_lock:
+        if _sender_instance is None:
+            if webhook_config is None:
+                try:
+                    webhook_config = get_config().get('webhook') or {}
+                except Exception as e:
+                    logger.warning("加载 webhook 配置失败，Webhook 已禁用")
+                    logger.error(e)
+                    webhook_config = {}
+            _sender_instance = WebhookSender(webhook_config=webhook_config)
+
+    return _sender_instance
+
+
+# 投递器单例（所有流共享）
+_dispatcher_instance: Optional[WebhookDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def get_dispatcher(url: str, webhook_config: Dict) -> WebhookDispatcher:
+    """获取进程共享的异步投递器（单例模式）"""
+    global _dispatcher_instance
+
+    with _dispatcher_lock:
+        if _dispatcher_instance is None:
+            _dispatcher_instance = WebhookDispatcher(
+                url,
+                max_batch_size=webhook_config.get('max_batch_size', 1),
+                linger_ms=webhook_config.get('linger_ms', 200),
+                queue_size=webhook_config.get('queue_size', 10000),
+                timeout=webhook_config.get('timeout', 10)
+            )
+            _dispatcher_instance.start()
+
+    return _dispatcher_instance
+
+
+def shutdown_dispatcher(timeout: float = 5.0):
+    """停止共享投递器并尽量发出剩余记录"""
+    global _dispatcher_instance
+
+    with _dispatcher_lock:
+        if _dispatcher_instance is not None:
+            _dispatcher_instance.close(timeout)
+            _dispatcher_instance = None
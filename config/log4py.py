@@ -1,7 +1,13 @@
 # coding=utf-8
+import atexit
+import copy
+import json
 import logging
 import logging.handlers
+import queue
 import sys
+import threading
+import time
 
 # 默认的配置DEBUG
 
@@ -12,6 +18,79 @@ LOG_FMT = '%(asctime)s - %(levelname)s: %(message)s'
 LOG_DATEFMT = '%Y-%m-%d %H:%M:%S'
 # 默认日志文件名称
 LOG_FILENAME = 'log.log'
+# 日志队列容量，满时丢弃新日志，不阻塞监控线程
+LOG_QUEUE_SIZE = 10000
+# 指标日志（JSON lines）的 logger 名称
+METRICS_LOGGER = 'metrics'
+
+
+class DropQueueHandler(logging.handlers.QueueHandler):
+    """
+    非阻塞队列 handler：调用线程只入队，格式化与 I/O 在后台线程完成，队列满时丢弃并计数
+    同进程线程间传递，不预先格式化消息；因此 %-参数在入队后不应再被修改
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ForwardQueueHandler(logging.handlers.QueueHandler):
+    """
+    工作进程日志转发到父进程：消息在本进程格式化为字符串后跨进程传递，dict 指标消息保持原样
+    """
+
+    def prepare(self, record):
+        if isinstance(record.msg, dict):
+            record = copy.copy(record)
+            record.args = None
+            record.exc_info = None
+            record.exc_text = None
+            return record
+        return super().prepare(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """
+    每条记录输出为一行紧凑 JSON，dict 消息原样序列化
+    """
+
+    def format(self, record):
+        data = record.msg if isinstance(record.msg, dict) else {'message': record.getMessage()}
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str)
+
+
+class LogSampler:
+    """
+    按 key（如流 id）采样：每个 key 每 interval 秒最多放行一次，状态变化时立即放行
+    interval 为 0 时全部放行
+    """
+
+    def __init__(self, interval: float = 0.0):
+        self.interval = interval
+        self._last = {}  # key -> (放行时间, 状态)
+
+    def allow(self, key, state=None, now: float = None) -> bool:
+        if self.interval <= 0:
+            return True
+        now = time.monotonic() if now is None else now
+        last = self._last.get(key)
+        if last is not None and last[1] == state and now - last[0] < self.interval:
+            return False
+        self._last[key] = (now, state)
+        return True
+
+    def forget(self, key):
+        self._last.pop(key, None)
 
 
 class Logger(object):
@@ -20,18 +99,36 @@ class Logger(object):
         self._logger = logging.getLogger()
         # 2. 设置format对象
         self.formatter = logging.Formatter(fmt=LOG_FMT, datefmt=LOG_DATEFMT)
-        # 3. 设置日志输出
-        self._logger.addHandler(self._get_file_handler(LOG_FILENAME))
-        self._logger.addHandler(self._get_console_handler())
+        # 3. 设置日志输出：监控线程只入队，后台线程写文件和终端
+        self.queue = queue.Queue(LOG_QUEUE_SIZE)
+        self.handler = DropQueueHandler(self.queue)
+        self.file_handler = self._get_file_handler(LOG_FILENAME)
+        self.console_handler = self._get_console_handler()
+        self.metrics_handler = None
+        self.forwarding = False  # 工作进程日志转发到父进程，不自行写文件
+        self.listener = logging.handlers.QueueListener(self.queue, self.file_handler, self.console_handler,
+                                                       respect_handler_level=True)
+        self._logger.addHandler(self.handler)
         self._logger.setLevel(LOG_LEVEL)
+        # 指标日志默认关闭，配置 metrics_file 后开启
+        self.metrics = logging.getLogger(METRICS_LOGGER)
+        self.metrics.propagate = False
+        self.metrics.addHandler(self.handler)
+        self.metrics.setLevel(logging.CRITICAL + 1)
+        self.sampler = LogSampler()
+        self._lock = threading.Lock()
+        self.listener.start()
+        atexit.register(self.stop)
 
     def _get_file_handler(self, filename):
         '''返回一个文件日志handler'''
         # 1. 获取一个文件日志handler
+        # 首次写入时才打开文件，转发日志的工作进程不会打开
         filehandler = logging.handlers.TimedRotatingFileHandler(filename=filename, encoding="utf8", when='D',
-                                                                interval=1, backupCount=3)
+                                                                interval=1, backupCount=3, delay=True)
         # 2. 设置日志格式
         filehandler.setFormatter(self.formatter)
+        filehandler.addFilter(_not_metrics)
         # 3. 返回
         return filehandler
 
@@ -41,15 +138,88 @@ class Logger(object):
         console_handler = logging.StreamHandler(sys.stdout)
         # 2. 设置日志格式
         console_handler.setFormatter(self.formatter)
+        console_handler.addFilter(_not_metrics)
         # 3. 返回handler
         return console_handler
 
+    def _get_metrics_handler(self, filename):
+        '''返回一个 JSON lines 指标日志handler'''
+        metrics_handler = logging.handlers.TimedRotatingFileHandler(filename=filename, encoding="utf8", when='D',
+                                                                    interval=1, backupCount=3)
+        metrics_handler.setFormatter(JsonLinesFormatter())
+        metrics_handler.addFilter(logging.Filter(METRICS_LOGGER))
+        return metrics_handler
+
+    def configure(self, config: dict):
+        '''按 logging 配置段调整日志等级、状态日志采样间隔与指标日志'''
+        config = config or {}
+        with self._lock:
+            level = str(config.get('level', logging.getLevelName(LOG_LEVEL))).upper()
+            self._logger.setLevel(getattr(logging, level, LOG_LEVEL))
+            self.sampler.interval = float(config.get('status_interval', 0) or 0)
+
+            metrics_file = config.get('metrics_file')
+            if metrics_file and self.forwarding:
+                # 指标文件由父进程写
+                self.metrics.setLevel(logging.INFO)
+            elif metrics_file and self.metrics_handler is None:
+                self.metrics_handler = self._get_metrics_handler(metrics_file)
+                self.listener.handlers += (self.metrics_handler,)
+                self.metrics.setLevel(logging.INFO)
+
+    def forward(self, log_queue):
+        '''改为把日志转发到 log_queue（多进程队列），由父进程统一写文件与终端'''
+        with self._lock:
+            if self.listener._thread is not None:
+                self.listener.stop()
+            self.file_handler.close()
+            self.forwarding = True
+            self.listener = logging.handlers.QueueListener(self.queue, ForwardQueueHandler(log_queue))
+            self.listener.start()
+
+    def stop(self):
+        '''停止后台线程，写出队列中剩余的日志'''
+        with self._lock:
+            if self.listener._thread is not None:
+                self.listener.stop()
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
     @property
     def logger(self):
         return self._logger
 
 
-logger = Logger().logger
+def _not_metrics(record):
+    return record.name != METRICS_LOGGER
+
+
+_log = Logger()
+logger = _log.logger
+# 指标日志：每次检查一行 JSON，未配置 metrics_file 时 isEnabledFor 为 False
+metrics_logger = _log.metrics
+# 状态日志采样器：按流限制详细状态日志的频率
+status_sampler = _log.sampler
+
+
+def configure_logging(config: dict):
+    """按配置文件的 logging 段配置日志"""
+    _log.configure(config)
+
+
+def forward_logging(log_queue):
+    """工作进程：日志经 log_queue 转发到父进程（多个进程各自轮转同一个日志文件会互相覆盖）"""
+    _log.forward(log_queue)
+
+
+def receive_logging(log_queue) -> logging.handlers.QueueListener:
+    """父进程：接收工作进程转发的日志，与本进程的日志一起写出；返回已启动的监听器，由调用方停止"""
+    listener = logging.handlers.QueueListener(log_queue, _log.handler)
+    listener.start()
+    return listener
+
 
 if __name__ == '__main__':
     logger.debug("调试信息")
@@ -2,19 +2,34 @@ import threading
 import time
 
 from config.log4py import logger
+from monitor.ReconnectPolicy import OPEN, ReconnectPolicy, get_open_limiter
 from monitor.StreamMonitor import StreamMonitor
 
+# 重连策略参数（monitoring.reconnect 中的其余项）
+POLICY_OPTIONS = ('base_delay', 'max_delay', 'multiplier', 'stable_seconds', 'failure_threshold', 'open_seconds')
+
 
 class MonitorJob:
     """
     监控任务 - 多线程版本
     """
 
-    def __init__(self, stream_id, stream_name, stream_url, check_interval):
+    def __init__(self, stream_id, stream_name, stream_url, check_interval, scheduler=None, webhook_sender=None,
+                 reconnect=None, **monitor_options):
+        """
+        :param reconnect: monitoring.reconnect 配置：退避、熔断、av.open 并发上限与快速探测
+        """
+        reconnect = reconnect or {}
         self.stream_id = stream_id
         self.stream_name = stream_name
         self.stream_url = stream_url
         self.check_interval = check_interval
+        self.monitor_options = monitor_options  # 透传给 StreamMonitor 的单流参数
+        self.monitor_options.setdefault('fast_probe', reconnect.get('fast_probe', True))
+        self.reconnect_policy = ReconnectPolicy(**{key: reconnect[key] for key in POLICY_OPTIONS if key in reconnect})
+        get_open_limiter(reconnect.get('max_concurrent_opens'))
+        self.scheduler = scheduler
+        self.webhook_sender = webhook_sender
         self.monitor = None
         self.running = False
         self.thread = None
@@ -29,7 +44,7 @@ class MonitorJob:
             return
 
         self._stop_event.clear()
-        self.thread = threading.Thread(target=self._run_monitor, daemon=True)
+        self.thread = threading.Thread(target=self._run_monitor, name=f"monitor-{self.stream_id}", daemon=True)
         self.thread.start()
         self.running = True
         logger.info(f"启动监控任务: {self.stream_id}")
@@ -46,9 +61,13 @@ class MonitorJob:
 
         if self.thread and self.thread.is_alive():
             try:
-                self.thread.join(timeout=5.0)  # 等待最多5秒
+                # 解复用线程最迟在读取超时后退出，再留出会话收尾的时间
+                timeout = 5.0
+                if self.monitor and self.monitor.open_spec.timeout[1]:
+                    timeout += self.monitor.open_spec.timeout[1]
+                self.thread.join(timeout=timeout)
                 if self.thread.is_alive():
-                    logger.error(f"强制终止线程: {self.stream_id}")
+                    logger.error(f"监控线程未在 {timeout:g} 秒内退出: {self.stream_id}")
                     # 线程仍在运行，记录但继续执行
             except Exception as e:
                 logger.error(f"停止线程时发生错误: {e}")
@@ -61,26 +80,29 @@ class MonitorJob:
         """
         logger.info(f"=== 开始监控流: {self.stream_id} {self.stream_name} {self.stream_url} ===")
 
-        # 这里需要根据实际的 StreamMonitor 类进行调整
-        self.monitor = StreamMonitor(
-            stream_id=self.stream_id,
-            stream_name=self.stream_name,
-            stream_url=self.stream_url,
-            check_interval=self.check_interval
-        )
-
         try:
             self.monitor = StreamMonitor(
                 stream_id=self.stream_id,
                 stream_name=self.stream_name,
                 stream_url=self.stream_url,
-                check_interval=self.check_interval
+                check_interval=self.check_interval,
+                webhook_sender=self.webhook_sender,
+                **self.monitor_options
             )
 
+            # 断开后按退避与熔断策略重连，直到任务被停止
+            policy = self.reconnect_policy
             while not self._stop_event.is_set():
-                if not self.monitor.start_monitoring():
-                    break
-                time.sleep(0.1)  # 防止CPU过度使用
+                circuit_open = policy.state == OPEN
+                delay = policy.next_delay()
+                if delay:
+                    action = "熔断，试探连接" if circuit_open else "重连"
+                    logger.info(f"流 {self.stream_id} {delay:.1f} 秒后{action} (连续失败 {policy.failures} 次)")
+                    if self._stop_event.wait(delay):
+                        break
+                started = time.monotonic()
+                connected = self.monitor.start_monitoring(self.scheduler)
+                policy.record(connected, time.monotonic() - started)
 
         except Exception as e:
             logger.error(f"监控任务 {self.stream_id} {self.stream_name} {self.stream_url} 发生错误: {e}")
@@ -1,7 +1,20 @@
-from typing import Dict
+import threading
+from typing import Dict, Optional
 
+from config.WebhookSender import WebhookSender, get_webhook_sender
 from config.log4py import logger
 from job.monitor_job import MonitorJob
+from job.scheduler import MonitorScheduler
+from monitor.FleetHealth import FleetHealthEvaluator
+from monitor.Profiler import profile_path, start_profile
+
+# 运行模式：thread 每个流独立的检查线程；scheduler 共享调度器驱动所有流的周期任务
+MODE_THREAD = "thread"
+MODE_SCHEDULER = "scheduler"
+
+# 健康评估方式：stream 每个流各自检查；fleet 由管理器一次向量化评估所有流
+HEALTH_STREAM = "stream"
+HEALTH_FLEET = "fleet"
 
 
 class MonitorManager:
@@ -9,19 +22,46 @@ class MonitorManager:
     监控任务管理器
     """
 
-    def __init__(self):
+    def __init__(self, mode: str = MODE_THREAD, webhook_sender: WebhookSender = None,
+                 health_evaluation: str = HEALTH_STREAM, profile_dir: str = 'profiles'):
+        """
+        :param webhook_sender: 所有流共享的 Webhook 发送器，默认取进程单例
+        :param health_evaluation: 健康评估方式 stream|fleet
+        :param profile_dir: 采样分析折叠栈文件的默认目录
+        """
         self.monitor_jobs: Dict[str, MonitorJob] = {}
         self.running = False
+        if mode not in (MODE_THREAD, MODE_SCHEDULER):
+            logger.warning(f"未知的运行模式 {mode}，使用 {MODE_THREAD}")
+            mode = MODE_THREAD
+        self.mode = mode
+        self.scheduler = MonitorScheduler() if mode == MODE_SCHEDULER else None
+        self.webhook_sender = webhook_sender or get_webhook_sender()
+        if health_evaluation not in (HEALTH_STREAM, HEALTH_FLEET):
+            logger.warning(f"未知的健康评估方式 {health_evaluation}，使用 {HEALTH_STREAM}")
+            health_evaluation = HEALTH_STREAM
+        self.health_evaluation = health_evaluation
+        self.profile_dir = profile_dir
+        self.health_evaluator = FleetHealthEvaluator()
+        self.check_interval = None  # fleet 模式下的检查间隔，取所有流中最小的
+        self._fleet_task = None
+        self._fleet_thread = None
+        self._fleet_stop = threading.Event()
 
-    def add_stream(self, stream_id: str, stream_name: str, stream_url: str, check_interval: int = 30):
+    def add_stream(self, stream_id: str, stream_name: str, stream_url: str, check_interval: int = 30, **options):
         """
         添加要监控的流
+        :param options: 单流参数，透传给 StreamMonitor（如 stall_timeout、quality_sampling）
         """
         if stream_id in self.monitor_jobs:
             logger.warning(f"流 {stream_id} 已经在监控列表中")
             return False
 
-        job = MonitorJob(stream_id, stream_name, stream_url, check_interval)
+        if self.health_evaluation == HEALTH_FLEET:
+            options['health_check'] = False
+            self.check_interval = min(self.check_interval or check_interval, check_interval)
+        job = MonitorJob(stream_id, stream_name, stream_url, check_interval, self.scheduler, self.webhook_sender,
+                         **options)
         self.monitor_jobs[stream_id] = job
         logger.info(f"添加流到监控列表: {stream_id} {stream_name} {stream_url}")
         return True
@@ -31,17 +71,25 @@ class MonitorManager:
         启动所有监控任务
         """
         self.running = True
+        if self.scheduler:
+            self.scheduler.start()
         for stream_id, job in self.monitor_jobs.items():
             job.start()
-        logger.info(f"启动了 {len(self.monitor_jobs)} 个监控任务")
+        if self.health_evaluation == HEALTH_FLEET:
+            self._start_fleet_health_check()
+        logger.info(f"启动了 {len(self.monitor_jobs)} 个监控任务 (模式: {self.mode})")
 
     def stop_all(self):
         """
         停止所有监控任务
         """
         self.running = False
+        self._stop_fleet_health_check()
         for stream_id, job in self.monitor_jobs.items():
             job.stop()
+            self.webhook_sender.forget_stream(stream_id)
+        if self.scheduler:
+            self.scheduler.stop()
         logger.info("所有监控任务已停止")
 
     def start_stream(self, stream_id: str):
@@ -59,17 +107,107 @@ class MonitorManager:
         """
         if stream_id in self.monitor_jobs:
             self.monitor_jobs[stream_id].stop()
+            # 清除告警状态，重新启动后从正常状态开始
+            self.webhook_sender.forget_stream(stream_id)
             return True
         return False
 
     def get_status(self):
         """
-        获取所有监控任务状态
+        获取所有监控任务状态，metrics 为 stats 与 deep_stats 的扁平快照
         """
         status = {}
         for stream_id, job in self.monitor_jobs.items():
             status[stream_id] = {
                 'running': job.is_running(),
-                'stream_url': job.stream_url
+                'stream_name': job.stream_name,
+                'stream_url': job.stream_url,
+                'reconnect_state': job.reconnect_policy.state,
+                'reconnect_failures': job.reconnect_policy.failures
             }
+            monitor = job.monitor
+            if monitor:
+                # 包计数取自同一份快照，与 metrics 一致
+                metrics = monitor.metrics_snapshot()
+                status[stream_id].update({
+                    'total_packets': metrics['total_packets'],
+                    'video_packets': metrics['video_packets'],
+                    'keyframes': metrics['keyframes'],
+                    'last_packet_time': metrics['last_packet_time'],
+                    'bitrate': monitor.deep_stats['current_bitrate'],
+                    'frame_rate': monitor.deep_stats['frame_rate'],
+                    'gop_size': monitor.deep_stats['gop_size'],
+                    'metrics': metrics
+                })
+                if monitor.timers is not None:
+                    status[stream_id]['phases'] = monitor.timers.snapshot()
         return status
+
+    def profile_stream(self, stream_id: str, seconds: float = 10, interval: float = 0.005,
+                       path: str = None) -> Optional[str]:
+        """
+        对单个流的会话线程做 seconds 秒的调用栈采样，后台写出折叠栈文件（可生成火焰图）
+        scheduler 模式下只采样解复用所在的任务线程
+        :return: 文件路径，流不存在或尚未启动时为 None
+        """
+        job = self.monitor_jobs.get(stream_id)
+        if job is None or job.monitor is None:
+            logger.warning(f"流 {stream_id} 不存在或尚未启动，无法采样分析")
+            return None
+        monitor = job.monitor
+        path = path or profile_path(self.profile_dir, stream_id)
+        start_profile(stream_id, lambda: monitor.session_threads, path, seconds, interval)
+        logger.info(f"开始采样分析: {stream_id} {seconds:g} 秒 -> {path}")
+        return path
+
+    def assess_fleet_health(self, now: float = None) -> Dict[str, dict]:
+        """
+        一次向量化评估所有运行中流的健康状况，返回 {stream_id: health}，结果与逐流 assess_stream_health 相同
+        """
+        monitors = [job.monitor for job in list(self.monitor_jobs.values())
+                    if job.monitor is not None and job.monitor.running]
+        healths = self.health_evaluator.evaluate(monitors, now)
+        return {monitor.stream_id: health for monitor, health in zip(monitors, healths)}
+
+    def run_fleet_health_check(self):
+        """
+        执行一次批量健康检查，并由各流输出状态与告警
+        """
+        try:
+            monitors = {job.stream_id: job.monitor for job in list(self.monitor_jobs.values())}
+            for stream_id, health in self.assess_fleet_health().items():
+                monitor = monitors.get(stream_id)
+                try:
+                    monitor.report_health(health)
+                except Exception as e:
+                    logger.error(f"健康检查错误: {stream_id} {monitor.stream_name} {monitor.stream_url}")
+                    logger.error(f"健康检查错误: {e}")
+        except Exception as e:
+            logger.error("批量健康检查错误")
+            logger.error(f"批量健康检查错误: {e}")
+
+    def _start_fleet_health_check(self):
+        interval = self.check_interval or 30
+        if self.scheduler:
+            self._fleet_task = self.scheduler.schedule(interval, self.run_fleet_health_check, "health:fleet")
+            return
+        self._fleet_stop.clear()
+        self._fleet_thread = threading.Thread(target=self._fleet_health_loop, args=(interval,),
+                                              name="fleet-health", daemon=True)
+        self._fleet_thread.start()
+
+    def _stop_fleet_health_check(self):
+        if self._fleet_task is not None:
+            self.scheduler.cancel(self._fleet_task)
+            self._fleet_task = None
+        self._fleet_stop.set()
+        if self._fleet_thread is not None:
+            self._fleet_thread.join(timeout=5.0)
+            self._fleet_thread = None
+
+    def _fleet_health_loop(self, interval: float):
+        """
+        线程模式下的批量健康检查循环
+        """
+        while not self._fleet_stop.wait(interval):
+            self.run_fleet_health_check()
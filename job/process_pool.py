@@ -0,0 +1,282 @@
+import bisect
+import hashlib
+import multiprocessing
+import os
+import threading
+import time
+from multiprocessing.connection import wait
+from typing import Dict, List, Optional
+
+from config.ConfigLoader import get_config
+from config.WebhookSender import shutdown_dispatcher
+from config.log4py import configure_logging, forward_logging, logger, receive_logging
+from job.monitor_manager import HEALTH_STREAM, MonitorManager, MODE_THREAD
+from monitor.Profiler import profile_path
+
+# 每个工作进程在哈希环上的虚拟节点数，越大分布越均匀
+RING_REPLICAS = 64
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode('utf-8')).digest()[:8], 'big')
+
+
+class HashRing:
+    """
+    一致性哈希环：按流 id 分配工作进程，工作进程数变化时只有约 1/N 的流需要迁移
+    """
+
+    def __init__(self, worker_count: int, replicas: int = RING_REPLICAS):
+        self.worker_count = worker_count
+        points = sorted((_hash(f"worker-{worker}#{replica}"), worker)
+                        for worker in range(worker_count) for replica in range(replicas))
+        self._keys = [point for point, _ in points]
+        self._workers = [worker for _, worker in points]
+
+    def worker_for(self, stream_id: str) -> int:
+        index = bisect.bisect(self._keys, _hash(stream_id)) % len(self._keys)
+        return self._workers[index]
+
+
+def _worker_main(worker_index: int, streams: List[dict], mode: str, report_interval: float, conn,
+                 health_evaluation: str = HEALTH_STREAM, log_queue=None):
+    """
+    工作进程入口：用普通 MonitorManager 运行分到的流，周期性通过管道上报状态，并执行父进程下发的命令
+    日志经 log_queue 转发到父进程写文件
+    """
+    if log_queue is not None:
+        forward_logging(log_queue)
+    try:
+        configure_logging(get_config().get('logging'))
+    except Exception as e:
+        logger.warning(f"工作进程 #{worker_index} 加载日志配置失败")
+        logger.warning(e)
+    manager = MonitorManager(mode=mode, health_evaluation=health_evaluation)
+    for stream in streams:
+        manager.add_stream(**stream)
+    manager.start_all()
+    logger.info(f"工作进程 #{worker_index} (pid {os.getpid()}) 已启动，负责 {len(streams)} 个流")
+
+    try:
+        while True:
+            if conn.poll(report_interval):
+                command, *args = conn.recv()
+                if command == 'stop':
+                    break
+                elif command == 'start_stream':
+                    manager.start_stream(*args)
+                elif command == 'stop_stream':
+                    manager.stop_stream(*args)
+                elif command == 'profile_stream':
+                    manager.profile_stream(*args)
+            conn.send(('status', worker_index, manager.get_status()))
+    except (KeyboardInterrupt, EOFError, BrokenPipeError):
+        pass
+    finally:
+        manager.stop_all()
+        shutdown_dispatcher()
+        logger.info(f"工作进程 #{worker_index} 已退出")
+
+
+class WorkerHandle:
+    """
+    父进程中的工作进程句柄
+    """
+
+    def __init__(self, index: int):
+        self.index = index
+        self.process = None
+        self.conn = None
+        self.stream_ids: List[str] = []
+        self.started_at = None
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+
+class ShardedMonitorManager:
+    """
+    多进程监控管理器 - 按流 id 一致性哈希分片到 N 个工作进程，接口与 MonitorManager 一致
+    """
+
+    def __init__(self, workers: int = 0, mode: str = MODE_THREAD, report_interval: float = 5,
+                 health_evaluation: str = HEALTH_STREAM, profile_dir: str = 'profiles'):
+        self.worker_count = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.mode = mode
+        self.report_interval = report_interval
+        self.health_evaluation = health_evaluation
+        self.profile_dir = profile_dir
+        self.running = False
+        self.streams: Dict[str, dict] = {}
+        self.workers = [WorkerHandle(i) for i in range(self.worker_count)]
+        self.ring = HashRing(self.worker_count)
+        # 各工作进程最近一次上报的流状态，仅由读取线程整体替换
+        self._reports: Dict[str, dict] = {}
+        self._reader = None
+        self._ctx = multiprocessing.get_context('spawn')
+        self._log_queue = None
+        self._log_listener = None
+
+    def add_stream(self, stream_id: str, stream_name: str, stream_url: str, check_interval: int = 30, **options):
+        """
+        添加要监控的流
+        :param options: 单流参数，透传给 StreamMonitor
+        """
+        if stream_id in self.streams:
+            logger.warning(f"流 {stream_id} 已经在监控列表中")
+            return False
+
+        self.streams[stream_id] = {
+            'stream_id': stream_id,
+            'stream_name': stream_name,
+            'stream_url': stream_url,
+            'check_interval': check_interval,
+            **options
+        }
+        worker = self.workers[self.ring.worker_for(stream_id)]
+        worker.stream_ids.append(stream_id)
+        logger.info(f"添加流到监控列表: {stream_id} {stream_name} {stream_url} -> 工作进程 #{worker.index}")
+        return True
+
+    def start_all(self):
+        """
+        启动所有工作进程
+        """
+        self.running = True
+        if self._log_listener is None:
+            self._log_queue = self._ctx.Queue()
+            self._log_listener = receive_logging(self._log_queue)
+        for worker in self.workers:
+            if worker.stream_ids:
+                self._start_worker(worker)
+        self._reader = threading.Thread(target=self._read_reports, name="shard-reports", daemon=True)
+        self._reader.start()
+        active = sum(1 for worker in self.workers if worker.stream_ids)
+        logger.info(f"启动了 {active} 个工作进程，共 {len(self.streams)} 个监控任务 (模式: {self.mode})")
+
+    def stop_all(self):
+        """
+        停止所有工作进程
+        """
+        self.running = False
+        for worker in self.workers:
+            self._send(worker, ('stop',))
+        for worker in self.workers:
+            self._join_worker(worker)
+        if self._log_listener is not None:
+            self._log_listener.stop()
+            self._log_listener = None
+        logger.info("所有监控任务已停止")
+
+    def start_stream(self, stream_id: str):
+        """
+        启动指定流的监控；所在工作进程已退出时整体重启该进程
+        """
+        if stream_id not in self.streams:
+            return False
+        worker = self.workers[self.ring.worker_for(stream_id)]
+        if not worker.is_alive():
+            logger.warning(f"工作进程 #{worker.index} 已退出，重新启动")
+            self._join_worker(worker)
+            self._start_worker(worker)
+            return True
+        return self._send(worker, ('start_stream', stream_id))
+
+    def stop_stream(self, stream_id: str):
+        """
+        停止指定流的监控
+        """
+        if stream_id not in self.streams:
+            return False
+        return self._send(self.workers[self.ring.worker_for(stream_id)], ('stop_stream', stream_id))
+
+    def profile_stream(self, stream_id: str, seconds: float = 10, interval: float = 0.005,
+                       path: str = None) -> Optional[str]:
+        """
+        由流所在的工作进程采样分析，文件路径在父进程确定
+        """
+        if stream_id not in self.streams:
+            return None
+        path = path or profile_path(self.profile_dir, stream_id)
+        if not self._send(self.workers[self.ring.worker_for(stream_id)],
+                          ('profile_stream', stream_id, seconds, interval, path)):
+            return None
+        return path
+
+    def get_status(self):
+        """
+        获取所有监控任务状态（来自工作进程上报）
+        """
+        reports = self._reports
+        status = {}
+        for worker in self.workers:
+            alive = worker.is_alive()
+            for stream_id in worker.stream_ids:
+                report = reports.get(stream_id)
+                # 工作进程刚启动尚未上报时视为运行中
+                if report is None or report.get('reported_at', 0) < worker.started_at:
+                    stream = self.streams[stream_id]
+                    report = {'running': alive, 'stream_name': stream['stream_name'], 'stream_url': stream['stream_url']}
+                status[stream_id] = {**report, 'running': alive and report['running'], 'worker': worker.index}
+        return status
+
+    def _start_worker(self, worker: WorkerHandle):
+        parent_conn, child_conn = self._ctx.Pipe()
+        streams = [self.streams[stream_id] for stream_id in worker.stream_ids]
+        worker.process = self._ctx.Process(target=_worker_main, name=f"monitor-worker-{worker.index}",
+                                           args=(worker.index, streams, self.mode, self.report_interval,
+                                                 child_conn, self.health_evaluation, self._log_queue),
+                                           daemon=True)
+        worker.started_at = time.time()
+        worker.process.start()
+        child_conn.close()
+        worker.conn = parent_conn
+
+    def _join_worker(self, worker: WorkerHandle):
+        if worker.process is None:
+            return
+        worker.process.join(timeout=10.0)
+        if worker.process.is_alive():
+            logger.error(f"强制终止工作进程 #{worker.index}")
+            worker.process.terminate()
+            worker.process.join(timeout=5.0)
+        if worker.conn:
+            worker.conn.close()
+        worker.process = None
+        worker.conn = None
+
+    def _send(self, worker: WorkerHandle, message) -> bool:
+        conn = worker.conn
+        if conn is None:
+            return False
+        try:
+            conn.send(message)
+            return True
+        except (OSError, BrokenPipeError) as e:
+            logger.warning(f"向工作进程 #{worker.index} 发送命令失败: {e}")
+            return False
+
+    def _read_reports(self):
+        """
+        读取各工作进程上报的状态
+        """
+        while self.running:
+            conns = {worker.conn: worker for worker in self.workers if worker.conn is not None}
+            if not conns:
+                time.sleep(self.report_interval)
+                continue
+            for conn in wait(list(conns), timeout=self.report_interval):
+                try:
+                    message = conn.recv()
+                except (EOFError, OSError):
+                    # 工作进程退出，等待主循环的重启逻辑处理
+                    if conns[conn].conn is conn:
+                        conns[conn].conn = None
+                        conn.close()
+                    continue
+                if message[0] == 'status':
+                    now = time.time()
+                    reports = dict(self._reports)
+                    for stream_id, report in message[2].items():
+                        reports[stream_id] = {**report, 'reported_at': now}
+                    self._reports = reports
@@ -0,0 +1,125 @@
+import heapq
+import itertools
+import threading
+import time
+
+from config.log4py import logger
+
+
+class ScheduledTask:
+    """
+    调度任务
+    """
+    __slots__ = ('interval', 'func', 'name', 'next_run', 'cancelled')
+
+    def __init__(self, interval, func, name, next_run):
+        self.interval = interval
+        self.func = func
+        self.name = name
+        self.next_run = next_run
+        self.cancelled = False
+
+
+class MonitorScheduler:
+    """
+    共享调度器 - 所有流的周期任务（健康检查、码率计算等）由同一个线程按最小堆定时驱动
+    """
+
+    def __init__(self, name: str = "monitor-scheduler"):
+        self.name = name
+        self.running = False
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def start(self):
+        """
+        启动调度线程
+        """
+        with self._cond:
+            if self.running:
+                return
+            self.running = True
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        logger.info(f"共享调度器已启动: {self.name}")
+
+    def stop(self):
+        """
+        停止调度线程
+        """
+        with self._cond:
+            self.running = False
+            self._heap.clear()
+            self._cond.notify_all()
+        if self._thread and self._thread.is_alive():
+            self._thread.join(timeout=5.0)
+        logger.info(f"共享调度器已停止: {self.name}")
+
+    def schedule(self, interval: float, func, name: str = "", delay: float = None) -> ScheduledTask:
+        """
+        注册周期任务
+        :param interval: 执行间隔(秒)
+        :param func: 无参回调
+        :param name: 任务名称，用于日志
+        :param delay: 首次执行延迟(秒)，默认等于 interval
+        """
+        first = time.monotonic() + (interval if delay is None else delay)
+        task = ScheduledTask(interval, func, name, first)
+        with self._cond:
+            heapq.heappush(self._heap, (task.next_run, next(self._seq), task))
+            if self._heap[0][2] is task:
+                self._cond.notify()
+        return task
+
+    def cancel(self, task: ScheduledTask):
+        """
+        取消任务，堆中的条目在出堆时惰性丢弃
+        """
+        if task is not None:
+            task.cancelled = True
+
+    def pending(self) -> int:
+        """
+        当前有效任务数
+        """
+        with self._cond:
+            return sum(1 for _, _, task in self._heap if not task.cancelled)
+
+    def _run(self):
+        """
+        调度主循环：等待到最早的到期时间，执行到期任务后重新入堆
+        """
+        while True:
+            with self._cond:
+                if not self.running:
+                    return
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                next_run, _, task = self._heap[0]
+                now = time.monotonic()
+                if next_run > now:
+                    self._cond.wait(next_run - now)
+                    continue
+                heapq.heappop(self._heap)
+                if task.cancelled:
+                    continue
+
+            try:
+                task.func()
+            except Exception as e:
+                logger.error(f"调度任务执行错误: {task.name}")
+                logger.error(f"调度任务执行错误: {e}")
+
+            if task.cancelled:
+                continue
+            # 落后时不追赶，直接从当前时间起算下一次
+            task.next_run += task.interval
+            now = time.monotonic()
+            if task.next_run <= now:
+                task.next_run = now + task.interval
+            with self._cond:
+                if self.running:
+                    heapq.heappush(self._heap, (task.next_run, next(self._seq), task))
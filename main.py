@@ -1,8 +1,39 @@
 import time
 
 from config.ConfigLoader import get_config
-from config.log4py import logger
+from config.MetricsExporter import MetricsExporter
+from config.WebhookSender import get_webhook_sender, shutdown_dispatcher
+from config.log4py import configure_logging, logger
 from job.monitor_manager import MonitorManager
+from job.process_pool import ShardedMonitorManager
+
+
+def stream_options(config, stream):
+    """
+    单流参数：流上的配置优先，否则取 monitoring 段的全局配置
+    """
+    return {
+        "stall_timeout": stream.get("stall_timeout", config.get("monitoring.stall_timeout", 10)),
+        "quality_sampling": stream.get("quality_sampling", config.get("monitoring.quality_sampling", "keyframe")),
+        "engine": stream.get("engine", config.get("monitoring.engine", "av")),
+        "hls_sample_interval": config.get("monitoring.hls.sample_interval", 30),
+        "batch_packets": config.get("monitoring.packet_batch.packets", 64),
+        "batch_seconds": config.get("monitoring.packet_batch.interval", 0.1),
+        "encoder_clock": config.get("monitoring.latency.encoder_clock", True),
+        "frame_stride": config.get("monitoring.frame_analysis.stride", 4),
+        "frame_thumbnail": config.get("monitoring.frame_analysis.thumbnail"),
+        "picture_detection": {**(config.get("monitoring.picture_detection") or {}),
+                              **(stream.get("picture_detection") or {})},
+        "audio_analysis": {**(config.get("monitoring.audio_analysis") or {}),
+                           **(stream.get("audio_analysis") or {})},
+        "health_group": stream.get("health_group"),
+        "health_rules": stream.get("health_rules"),
+        "reconnect": config.get("monitoring.reconnect"),
+        "open_profile": stream.get("open_profile"),
+        "fast_start": stream.get("fast_start"),
+        "open_options": stream.get("open_options"),
+        "profiling": config.get("monitoring.profiling.enabled", False)
+    }
 
 
 def main():
@@ -11,10 +42,20 @@ def main():
     """
     logger.info("启动 Stream Monitor 服务器...")
     config = get_config()
+    configure_logging(config.get("logging"))
     streams = config.get("streams")
 
-    # 创建监控管理器
-    manager = MonitorManager()
+    # 创建监控管理器，启用进程池时按流 id 分片到多个工作进程
+    mode = config.get("monitoring.mode", "thread")
+    health_evaluation = config.get("monitoring.health_evaluation", "stream")
+    profile_dir = config.get("monitoring.profiling.dir", "profiles")
+    if config.get("monitoring.process_pool.enabled", False):
+        manager = ShardedMonitorManager(workers=config.get("monitoring.process_pool.workers", 0), mode=mode,
+                                        health_evaluation=health_evaluation, profile_dir=profile_dir)
+    else:
+        # 配置只解析一次，所有流共享同一个 Webhook 发送器
+        manager = MonitorManager(mode=mode, webhook_sender=get_webhook_sender(config.get("webhook") or {}),
+                                 health_evaluation=health_evaluation, profile_dir=profile_dir)
 
     # 添加所有流到监控列表
     for stream in streams:
@@ -24,11 +65,24 @@ def main():
         check_interval = config.get("monitoring.check_interval")
 
         logger.info("视频 id: %s , url: %s", stream_id, stream_url)
-        manager.add_stream(stream_id, stream_name, stream_url, check_interval)
+        manager.add_stream(stream_id, stream_name, stream_url, check_interval, **stream_options(config, stream))
 
     # 启动所有监控任务
     manager.start_all()
 
+    # 启动 OpenMetrics 指标导出
+    exporter = None
+    if config.get("exporter.enabled", False):
+        exporter = MetricsExporter(manager.get_status, refresh_interval=config.get("exporter.refresh_interval", 5),
+                                   profiler=manager.profile_stream)
+        try:
+            exporter.start(config.get("exporter.host", "0.0.0.0"), config.get("exporter.port", 9108))
+        except OSError as e:
+            logger.error("指标导出启动失败")
+            logger.error(e)
+            exporter.stop()
+            exporter = None
+
     try:
         logger.debug("监控系统已启动，按 Ctrl+C 停止所有监控...")
         logger.debug("当前监控任务状态:")
@@ -52,7 +106,10 @@ def main():
         logger.error("\n收到停止信号...")
     finally:
         # 停止所有监控任务
+        if exporter:
+            exporter.stop()
         manager.stop_all()
+        shutdown_dispatcher()
         logger.info("监控系统已关闭")
 
 
@@ -0,0 +1,152 @@
+import math
+import time
+
+import numpy as np
+
+# 无声音时的电平(dBFS)
+FLOOR_DBFS = -120.0
+
+# 整数采样格式的满幅值与零点（无符号 8 位以 128 为零点）
+_FULL_SCALE = {np.dtype(np.int16): (32768.0, 0.0), np.dtype(np.int32): (2147483648.0, 0.0),
+               np.dtype(np.uint8): (128.0, 128.0)}
+
+
+def planar_float(frame) -> np.ndarray:
+    """
+    把解码后的音频帧转为 (声道, 采样) 的 float32 数组，整数格式归一化到 [-1, 1]；
+    fltp 等平面浮点格式直接使用解码器输出，不经过重采样
+    """
+    samples = frame.to_ndarray()
+    if not frame.format.is_planar:
+        # 交错格式为 (1, 采样 * 声道)
+        samples = samples.reshape(-1, len(frame.layout.channels)).T
+    scale = _FULL_SCALE.get(samples.dtype)
+    if scale is None:
+        return samples.astype(np.float32, copy=False)
+    full, zero = scale
+    samples = samples.astype(np.float32)
+    if zero:
+        samples -= zero
+    samples *= 1.0 / full
+    return samples
+
+
+def dbfs(value: float) -> float:
+    return 20 * math.log10(value) if value > 0 else FLOOR_DBFS
+
+
+def measure(samples: np.ndarray, clip_level: float):
+    """
+    一段平面采样的电平：(RMS dBFS, 峰值 dBFS, 削波采样比例)，所有声道合并计算
+    """
+    flat = samples.ravel()
+    if flat.size == 0:
+        return FLOOR_DBFS, FLOOR_DBFS, 0.0
+    magnitude = np.abs(flat)
+    rms = math.sqrt(float(np.dot(flat, flat)) / flat.size)
+    peak = float(magnitude.max())
+    clipped = np.count_nonzero(magnitude >= clip_level)
+    return dbfs(rms), dbfs(peak), clipped / flat.size
+
+
+class AudioAnalyzer:
+    """
+    音频静音/削波检测 - 每隔 interval 秒解码一个 window 秒的音频采样窗口，合并计算 RMS、峰值与削波比例
+    窗口 RMS 低于 silence_dbfs 视为静音窗口，连续静音窗口的起点即静音开始时间；两次窗口之间保持上一窗口的判定
+    """
+
+    def __init__(self, window: float = 1.0, interval: float = 5, silence_seconds: float = 10,
+                 silence_dbfs: float = -60, clip_dbfs: float = -0.5, clip_ratio: float = 0.001):
+        """
+        :param window: 每次采样的音频时长(秒)
+        :param interval: 两次采样窗口开始的最短间隔(秒)
+        :param silence_seconds: 持续静音超过该秒数告警
+        :param silence_dbfs: 窗口 RMS 低于该电平视为静音
+        :param clip_dbfs: 电平不低于该值的采样视为削波；有损编码还原的削波波形略低于满幅，默认 -0.5 dBFS
+        :param clip_ratio: 窗口中削波采样比例超过该值判定为削波
+        """
+        self.window = window
+        self.interval = interval
+        self.silence_seconds = silence_seconds
+        self.silence_dbfs = silence_dbfs
+        self.clip_level = 10 ** (clip_dbfs / 20)
+        self.clip_ratio = clip_ratio
+        self.rms_dbfs = None  # 最近窗口的电平
+        self.peak_dbfs = None
+        self.clipped = 0.0  # 最近窗口的削波采样比例
+        self.clipping = False
+        self.silent_since = None
+        self.windows = 0  # 已完成的窗口数
+        self._window_start = None  # 当前窗口开始时间，None 表示不在采样中
+        self._next_window = 0.0
+        self._warmup = True
+        self._chunks = []
+        self._samples = 0
+        self._target = 0
+
+    def reset(self):
+        """
+        重连后的新会话：清除静音/削波判定与未完成的窗口，断开期间不计入静音时长
+        """
+        self.rms_dbfs = None
+        self.peak_dbfs = None
+        self.clipped = 0.0
+        self.clipping = False
+        self.silent_since = None
+        self._window_start = None
+        self._next_window = 0.0
+        self._warmup = True
+        self._chunks = []
+        self._samples = 0
+
+    def wants(self, now: float) -> bool:
+        """
+        该时刻到达的音频包是否需要解码：正在采样窗口中，或已到下一个窗口的开始时间
+        """
+        return self._window_start is not None or now >= self._next_window
+
+    def feed(self, samples: np.ndarray, sample_rate: int, now: float = None):
+        """
+        输入一帧平面采样 (声道, 采样)；窗口的第一帧只用于预热解码器（上一窗口之后的解码器状态已失效），不参与计算
+        """
+        now = time.time() if now is None else now
+        if self._window_start is None:
+            self._window_start = now
+            self._next_window = now + self.interval
+            self._warmup = True
+            self._target = int(self.window * sample_rate)
+        if self._warmup:
+            self._warmup = False
+            return
+        self._chunks.append(samples)
+        self._samples += samples.shape[-1]
+        if self._samples >= self._target:
+            self._finish()
+
+    def _finish(self):
+        chunks = self._chunks
+        samples = chunks[0] if len(chunks) == 1 else np.concatenate(chunks, axis=-1)
+        self.rms_dbfs, self.peak_dbfs, self.clipped = measure(samples, self.clip_level)
+        self.clipping = self.clipped > self.clip_ratio
+        if self.rms_dbfs < self.silence_dbfs:
+            if self.silent_since is None:
+                self.silent_since = self._window_start
+        else:
+            self.silent_since = None
+        self.windows += 1
+        self._window_start = None
+        self._chunks = []
+        self._samples = 0
+
+    def status(self, now: float = None) -> dict:
+        """
+        当前静音持续时间(秒，未发生为 0)与削波状态
+        """
+        now = time.time() if now is None else now
+        silent = now - self.silent_since if self.silent_since is not None else 0
+        return {
+            'silent_seconds': silent,
+            'silent': silent >= self.silence_seconds,
+            'clipping': self.clipping,
+            'clip_ratio': self.clipped
+        }
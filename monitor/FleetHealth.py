@@ -0,0 +1,195 @@
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from monitor.HealthRules import HealthRuleBook, get_rule_book
+
+GOOD, FAIR, POOR = 0, 1, 2
+QUALITY_NAMES = ('good', 'fair', 'poor')
+
+
+def _times(values) -> np.ndarray:
+    """
+    时间戳列，None/0（未发生）转为 nan
+    """
+    return np.array([value or np.nan for value in values], dtype=np.float64)
+
+
+def _optional(values) -> np.ndarray:
+    """
+    可选数值列，None 转为 nan
+    """
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class FleetHealthEvaluator:
+    """
+    批量健康评估 - 把所有流的当前指标读成数组，一次向量化计算可播放性、质量、码率稳定性、帧率、GOP、画面、音频与延迟判定
+    结果与逐流调用 assess_stream_health 相同；阈值按各流编译规则的下标从规则阈值表中取
+    """
+
+    def __init__(self, rule_book: HealthRuleBook = None):
+        self.rule_book = rule_book
+
+    def evaluate(self, monitors: List, now: float = None) -> List[Dict]:
+        """
+        :param monitors: StreamMonitor 列表（共享同一个指标存储）
+        :return: 与 monitors 顺序一致的 health 字典列表
+        """
+        if not monitors:
+            return []
+        now = time.time() if now is None else now
+        book = self.rule_book or get_rule_book()
+        table = book.table()
+        rule_ids = np.fromiter((m.health_rules.index for m in monitors), dtype=np.intp, count=len(monitors))
+
+        def limit(name):
+            return table[name][rule_ids]
+
+        last_packet = _times([m.stats.last_packet_time for m in monitors])
+        last_keyframe = _times([m.stats.last_keyframe_time for m in monitors])
+        frame_rate = np.array([m.deep_stats.frame_rate for m in monitors], dtype=np.float64)
+        gop_size = np.array([m.deep_stats.gop_size for m in monitors], dtype=np.float64)
+
+        # 码率变异系数直接取列式存储的滚动和与平方和
+        column = monitors[0].metrics_store.bitrate
+        rows = np.fromiter((m._metrics_row for m in monitors), dtype=np.intp, count=len(monitors))
+        count = column.count[rows]
+        n = np.minimum(count, column.window).astype(np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            mean = column.win_sum[rows] / n
+            variance = np.maximum(column.win_sq[rows] / n - mean * mean, 0.0)
+            cv = np.where(mean > 0, np.sqrt(variance) / mean, 0.0)
+        has_bitrate = count > limit('bitrate_min_samples')
+
+        # 画面静止/黑屏状态
+        detectors = [m.picture_detector for m in monitors]
+        has_detector = np.array([d is not None for d in detectors])
+        black_since = _optional([d.black_since if d is not None else None for d in detectors])
+        frozen_since = _optional([d.frozen_since if d is not None else None for d in detectors])
+        black_limit = np.array([d.black_seconds if d is not None else np.inf for d in detectors], dtype=np.float64)
+        frozen_limit = np.array([d.frozen_seconds if d is not None else np.inf for d in detectors],
+                                dtype=np.float64)
+        black_seconds = np.nan_to_num(now - black_since, nan=0.0)
+        frozen_seconds = np.where(black_seconds == 0, np.nan_to_num(now - frozen_since, nan=0.0), 0.0)
+        black = has_detector & (black_seconds >= black_limit)
+        frozen = has_detector & (frozen_seconds >= frozen_limit)
+
+        # 音频静音/削波状态
+        analyzers = [m.audio_analyzer for m in monitors]
+        has_audio = np.array([a is not None for a in analyzers])
+        silent_since = _optional([a.silent_since if a is not None else None for a in analyzers])
+        silent_limit = np.array([a.silence_seconds if a is not None else np.inf for a in analyzers],
+                                dtype=np.float64)
+        silent_seconds = np.nan_to_num(now - silent_since, nan=0.0)
+        silent = has_audio & (silent_seconds >= silent_limit)
+        clipping = has_audio & np.array([a is not None and a.clipping for a in analyzers])
+        clip_issue = clipping & ~silent
+
+        # 延迟估计（每流一个元组，按单调时钟计算）
+        latencies = [m.latency_status(now - m._clock_offset) for m in monitors]
+        live_delay = _optional([None if latency is None else latency[0] for latency in latencies])
+        growth = _optional([None if latency is None else latency[1] for latency in latencies])
+
+        # 各项判定（nan 比较结果为 False，对应标量实现中的 None 判断）
+        no_packets = now - last_packet > limit('no_packet_seconds')
+        no_keyframe = now - last_keyframe > limit('no_keyframe_seconds')
+        unstable = has_bitrate & (cv > limit('bitrate_cv_unstable'))
+        moderate = has_bitrate & ~unstable & (cv > limit('bitrate_cv_moderate'))
+        fps_poor = (frame_rate > 0) & (frame_rate < limit('fps_poor'))
+        fps_fair = (frame_rate > 0) & ~fps_poor & (frame_rate < limit('fps_fair'))
+        gop_large = (gop_size > 0) & (gop_size > limit('gop_max'))
+        gop_small = (gop_size > 0) & ~gop_large & (gop_size < limit('gop_min'))
+        behind_live = live_delay > limit('live_delay_seconds')
+        delay_growing = ~behind_live & (growth * 1000 > limit('delay_growth_ms'))
+        bloat = behind_live | delay_growing
+
+        # 质量按标量实现的检查顺序依次覆盖
+        quality = np.where(no_keyframe, POOR, GOOD)
+        quality = np.where(unstable, POOR, np.where(moderate, FAIR, quality))
+        quality = np.where(fps_poor, POOR, np.where(fps_fair & (quality == GOOD), FAIR, quality))
+        quality = np.where(black | frozen, POOR, quality)
+        quality = np.where(silent, POOR, np.where(clip_issue & (quality == GOOD), FAIR, quality))
+        quality = np.where(bloat & (quality == GOOD), FAIR, quality)
+
+        any_issue = (no_packets | no_keyframe | unstable | fps_poor | fps_fair | gop_large | gop_small | black | frozen
+                     | silent | clip_issue | bloat)
+        delay = (now - last_packet) * 1000
+        delays = [None if value != value else int(value) for value in delay.tolist()]
+        qualities = np.array(QUALITY_NAMES, dtype=object)[quality].tolist()
+        stabilities = np.where(unstable, 'unstable', np.where(moderate, 'moderate', 'stable')).tolist()
+        black_secs = np.where(has_detector, black_seconds, 0).astype(np.int64).tolist()
+        frozen_secs = np.where(has_detector, frozen_seconds, 0).astype(np.int64).tolist()
+        silent_secs = np.where(has_audio, silent_seconds, 0).astype(np.int64).tolist()
+
+        # 逐流组装结果，只对存在问题的流生成问题描述
+        results = [
+            {
+                'playable': playable,
+                'quality': level,
+                'issues': [],
+                'estimated_delay': delay_ms,
+                'bitrate_stability': stability,
+                'resolution_stability': 'stable',
+                'black': is_black,
+                'black_seconds': black_sec,
+                'frozen': is_frozen,
+                'frozen_seconds': frozen_sec,
+                'silent': is_silent,
+                'silent_seconds': silent_sec,
+                'clipping': is_clipping,
+                'live_delay': None if latency is None else int(latency[0] * 1000),
+                'delay_growth': None if latency is None else round(latency[1] * 1000, 1),
+                'end_to_end_delay': None if latency is None or latency[2] is None else int(latency[2] * 1000),
+                'buffer_bloat': is_bloat
+            }
+            for (playable, level, delay_ms, stability, is_black, black_sec, is_frozen, frozen_sec, is_silent, silent_sec,
+                 is_clipping, latency, is_bloat)
+            in zip((~no_packets).tolist(), qualities, delays, stabilities, black.tolist(), black_secs,
+                   frozen.tolist(), frozen_secs, silent.tolist(), silent_secs, clipping.tolist(), latencies,
+                   bloat.tolist())
+        ]
+        flags = (no_packets, no_keyframe, unstable, fps_poor, fps_fair, gop_large, gop_small, black, frozen,
+                 silent, clip_issue, behind_live, delay_growing)
+        for i in np.flatnonzero(any_issue).tolist():
+            self._issues(results[i], monitors[i], [bool(flag[i]) for flag in flags], latencies[i])
+        return results
+
+    @staticmethod
+    def _issues(health, monitor, flag, latency):
+        """
+        按标量实现的顺序、用该流的规则模板生成问题描述
+        """
+        (no_packets, no_keyframe, unstable, fps_poor, fps_fair, gop_large, gop_small, black, frozen, silent,
+         clip_issue, behind_live, delay_growing) = flag
+        rules = monitor.health_rules
+        issue = rules.issue
+        deep_stats = monitor.deep_stats
+        issues = health['issues']
+        if no_packets:
+            issues.append(issue['no_packets'](limit=rules.no_packet_seconds))
+        if no_keyframe:
+            issues.append(issue['no_keyframe'](limit=rules.no_keyframe_seconds))
+        if unstable:
+            issues.append(issue['bitrate_unstable']())
+        if fps_poor:
+            issues.append(issue['fps_poor'](fps=deep_stats.frame_rate))
+        elif fps_fair:
+            issues.append(issue['fps_fair'](fps=deep_stats.frame_rate))
+        if gop_large:
+            issues.append(issue['gop_large'](gop=deep_stats.gop_size))
+        elif gop_small:
+            issues.append(issue['gop_small'](gop=deep_stats.gop_size))
+        if black:
+            issues.append(issue['black'](seconds=health['black_seconds']))
+        elif frozen:
+            issues.append(issue['frozen'](seconds=health['frozen_seconds']))
+        if silent:
+            issues.append(issue['silent'](seconds=health['silent_seconds']))
+        elif clip_issue:
+            issues.append(issue['clipping'](ratio=monitor.audio_analyzer.clipped))
+        if behind_live:
+            issues.append(issue['live_delay'](seconds=latency[0]))
+        elif delay_growing:
+            issues.append(issue['delay_growth'](rate=latency[1] * 1000))
@@ -0,0 +1,415 @@
+import http.client
+import struct
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+# FLV 标签类型
+TAG_AUDIO = 8
+TAG_VIDEO = 9
+TAG_SCRIPT = 18
+
+# 视频帧类型（标签体首字节高 4 位，增强型 FLV 为第 4-6 位）
+FRAME_KEY = 1
+FRAME_COMMAND = 5  # 视频信息/命令帧，不是画面
+# AVC/HEVC 包类型：序列头（解码器配置）、编码帧、序列结束；增强型 FLV 另有 CodedFramesX（无 cts）与元数据
+PACKET_SEQUENCE_HEADER = 0
+PACKET_CODED_FRAMES = 1
+PACKET_SEQUENCE_END = 2
+PACKET_CODED_FRAMES_X = 3
+PACKET_METADATA = 4
+
+# 传统 FLV 的视频 codec id 与增强型 FLV 的 FourCC
+VIDEO_CODECS = {2: 'flv1', 3: 'screen', 4: 'vp6f', 5: 'vp6a', 7: 'h264', 12: 'hevc', 13: 'av1'}
+FOURCC_CODECS = {b'avc1': 'h264', b'hvc1': 'hevc', b'av01': 'av1', b'vp09': 'vp9'}
+# 带 1 字节包类型与 3 字节 cts 的传统 codec id（AVC 及国内通行的 HEVC/AV1 扩展）
+AVC_LIKE = frozenset((7, 12, 13))
+SOUND_AAC = 10
+
+# 解码器配置记录中的 profile
+H264_PROFILES = {66: 'Baseline', 77: 'Main', 88: 'Extended', 100: 'High', 110: 'High 10', 122: 'High 4:2:2',
+                 244: 'High 4:4:4 Predictive'}
+HEVC_PROFILES = {1: 'Main', 2: 'Main 10', 3: 'Main Still Picture', 4: 'Rext'}
+
+HEADER_SIZE = 11
+PREVIOUS_TAG_SIZE = 4
+# 解析标签头时需要看到的标签体字节数：增强型视频头 1 + FourCC 4 + cts 3
+BODY_PEEK = 8
+FILE_HEADER_SIZE = 9
+
+_TIMESTAMP = struct.Struct('>I')
+_DOUBLE = struct.Struct('>d')
+
+# kind 为标签类型；timestamp 为解码时间戳(毫秒)；size 为去掉标签体头部后的负载字节数（与 av 解复用出的包大小一致）；
+# cts 为合成时间偏移(毫秒，pts = timestamp + cts)；body 在序列头与脚本标签上为完整标签体，
+# 解析器设置了 keyframe_peek 时关键帧上为负载开头的 keyframe_peek 字节（读取 SEI），其余为 None
+FlvTag = namedtuple('FlvTag', 'kind timestamp size keyframe packet_type codec cts body')
+
+
+def _int24(buf, offset: int) -> int:
+    return (buf[offset] << 16) | (buf[offset + 1] << 8) | buf[offset + 2]
+
+
+def _signed24(buf, offset: int) -> int:
+    value = _int24(buf, offset)
+    return value - 0x1000000 if value & 0x800000 else value
+
+
+class FlvTagParser:
+    """
+    增量解析 FLV 字节流的标签头：对调用方传入的块用 memoryview 切片直接读取，不拷贝标签体；
+    只有跨块的标签头（最多 19 字节）、需要完整内容的序列头/脚本标签以及关键帧负载开头会被拷贝
+    """
+
+    def __init__(self, keyframe_peek: int = 0):
+        """
+        :param keyframe_peek: 关键帧负载开头收集的字节数，0 表示不收集
+        """
+        self.keyframe_peek = keyframe_peek
+        self._pending = bytearray()  # 跨块未凑齐的文件头或标签头
+        self._header_done = False
+        self._skip = 0  # 当前标签尚未读到的字节（标签体剩余部分与 PreviousTagSize）
+        self._body = None  # 正在收集标签体的标签
+        self._body_left = 0
+        self._body_offset = 0  # 收集的标签体中负载的起点
+        self._body_tag = None
+
+    def _need(self, buf, start: int, available: int) -> int:
+        """
+        从 start 开始解析下一个单元需要的字节数
+        """
+        if not self._header_done:
+            return FILE_HEADER_SIZE
+        if available < HEADER_SIZE:
+            return HEADER_SIZE
+        return HEADER_SIZE + min(_int24(buf, start + 1), BODY_PEEK)
+
+    def feed(self, data) -> List[FlvTag]:
+        """
+        解析一块数据，返回其中完整解析出的标签；data 在调用返回后即可复用
+        :raises ValueError: 不是 FLV 流或标签头损坏
+        """
+        view = memoryview(data)
+        end = len(view)
+        pos = 0
+        tags = []
+        while pos < end:
+            if self._skip:
+                count = min(self._skip, end - pos)
+                if self._body is not None:
+                    self._collect(view[pos:pos + count], tags)
+                self._skip -= count
+                pos += count
+                continue
+
+            pending = self._pending
+            if pending:
+                # 上一块末尾不完整的头部：先凑齐再解析
+                while len(pending) < self._need(pending, 0, len(pending)) and pos < end:
+                    take = min(self._need(pending, 0, len(pending)) - len(pending), end - pos)
+                    pending += view[pos:pos + take]
+                    pos += take
+                if len(pending) < self._need(pending, 0, len(pending)):
+                    break
+                self._parse(pending, 0, tags)
+                self._skip -= len(pending)
+                pending.clear()
+                continue
+
+            need = self._need(view, pos, end - pos)
+            if end - pos < need:
+                pending += view[pos:end]
+                break
+            self._parse(view, pos, tags)
+            self._skip -= need
+            pos += need
+        return tags
+
+    def _parse(self, buf, start: int, tags: List[FlvTag]):
+        """
+        解析 start 处的文件头或标签头，设置 _skip 为整个单元的长度（由调用方减去已读取的部分）
+        """
+        if not self._header_done:
+            if bytes(buf[start:start + 3]) != b'FLV':
+                raise ValueError("不是 FLV 流")
+            self._header_done = True
+            self._skip = _TIMESTAMP.unpack_from(buf, start + 5)[0] + PREVIOUS_TAG_SIZE
+            return
+
+        kind = buf[start] & 0x1f
+        size = _int24(buf, start + 1)
+        self._skip = HEADER_SIZE + size + PREVIOUS_TAG_SIZE
+        if kind not in (TAG_VIDEO, TAG_AUDIO, TAG_SCRIPT):
+            raise ValueError(f"FLV 标签类型无效: {kind}")
+        if size == 0:
+            return
+        timestamp = _int24(buf, start + 4) | (buf[start + 7] << 24)
+        if timestamp & 0x80000000:
+            timestamp -= 0x100000000
+        body = start + HEADER_SIZE
+        peek = min(size, BODY_PEEK)
+
+        if kind == TAG_VIDEO:
+            tag = self._video_tag(buf, body, peek, size, timestamp)
+        elif kind == TAG_AUDIO:
+            flags = buf[body]
+            sound = flags >> 4
+            header = 2 if sound == SOUND_AAC else 1
+            packet_type = buf[body + 1] if sound == SOUND_AAC and peek > 1 else PACKET_CODED_FRAMES
+            tag = FlvTag(TAG_AUDIO, timestamp, size - header, False, packet_type, sound, 0, None)
+        else:
+            tag = FlvTag(TAG_SCRIPT, timestamp, size, False, None, None, 0, None)
+
+        if tag is None:
+            return
+        if kind == TAG_SCRIPT or (kind == TAG_VIDEO and tag.packet_type == PACKET_SEQUENCE_HEADER):
+            # 序列头与脚本标签很小且很少出现，收集完整标签体
+            self._collect_body(buf, body, peek, size, 0, tag, tags)
+            return
+        if self.keyframe_peek and tag.keyframe and tag.packet_type == PACKET_CODED_FRAMES:
+            # 关键帧只收集负载开头（SEI 位于图像数据之前），其余部分照常跳过
+            header = size - tag.size
+            self._collect_body(buf, body, peek, min(size, header + self.keyframe_peek), header, tag, tags)
+            return
+        tags.append(tag)
+
+    def _collect_body(self, buf, body: int, peek: int, length: int, offset: int, tag: FlvTag, tags: List[FlvTag]):
+        """
+        开始收集标签体的前 length 字节，收集完成后从 offset 处截取为 tag.body
+        """
+        self._body = bytearray(buf[body:body + min(peek, length)])
+        self._body_left = length - len(self._body)
+        self._body_offset = offset
+        self._body_tag = tag
+        if not self._body_left:
+            self._finish_body(tags)
+
+    @staticmethod
+    def _video_tag(buf, body: int, peek: int, size: int, timestamp: int) -> Optional[FlvTag]:
+        flags = buf[body]
+        if flags & 0x80:
+            # 增强型 FLV：帧类型在第 4-6 位，包类型在低 4 位，随后是 FourCC
+            frame_type = (flags >> 4) & 0x07
+            packet_type = flags & 0x0f
+            if frame_type == FRAME_COMMAND or peek < 5:
+                return None
+            codec = FOURCC_CODECS.get(bytes(buf[body + 1:body + 5]), 'unknown')
+            header = 5
+            cts = 0
+            if packet_type == PACKET_CODED_FRAMES and codec in ('h264', 'hevc'):
+                cts = _signed24(buf, body + 5) if peek >= 8 else 0
+                header = 8
+            elif packet_type == PACKET_CODED_FRAMES_X:
+                packet_type = PACKET_CODED_FRAMES
+        else:
+            frame_type = flags >> 4
+            codec_id = flags & 0x0f
+            if frame_type == FRAME_COMMAND:
+                return None
+            codec = VIDEO_CODECS.get(codec_id, 'unknown')
+            if codec_id in AVC_LIKE:
+                if peek < 5:
+                    return None
+                packet_type = buf[body + 1]
+                cts = _signed24(buf, body + 2)
+                header = 5
+            else:
+                packet_type = PACKET_CODED_FRAMES
+                cts = 0
+                header = 1
+        return FlvTag(TAG_VIDEO, timestamp, size - header, frame_type == FRAME_KEY, packet_type, codec, cts, None)
+
+    def _collect(self, chunk, tags: List[FlvTag]):
+        count = min(len(chunk), self._body_left)
+        if count:
+            self._body += chunk[:count]
+            self._body_left -= count
+        if not self._body_left:
+            self._finish_body(tags)
+
+    def _finish_body(self, tags: List[FlvTag]):
+        tags.append(self._body_tag._replace(body=bytes(self._body[self._body_offset:])))
+        self._body = None
+        self._body_tag = None
+
+
+def sequence_header_profile(tag: FlvTag) -> Optional[str]:
+    """
+    从 AVC/HEVC 序列头（解码器配置记录）读取 profile
+    """
+    body = tag.body
+    # 传统头 5 字节；增强型头 1 + FourCC 4
+    offset = 5
+    if tag.codec == 'h264' and len(body) > offset + 2:
+        profile = body[offset + 1]
+        if profile == 66 and body[offset + 2] & 0x40:
+            return 'Constrained Baseline'
+        return H264_PROFILES.get(profile, str(profile))
+    if tag.codec == 'hevc' and len(body) > offset + 1:
+        profile = body[offset + 1] & 0x1f
+        return HEVC_PROFILES.get(profile, str(profile))
+    return None
+
+
+def _amf_string(data: bytes, offset: int, long: bool = False) -> Tuple[str, int]:
+    width = 4 if long else 2
+    length = int.from_bytes(data[offset:offset + width], 'big')
+    start = offset + width
+    return data[start:start + length].decode('utf-8', 'replace'), start + length
+
+
+def _amf_value(data: bytes, offset: int):
+    """
+    读取一个 AMF0 值，返回 (值, 下一个偏移)；对象与数组只跳过，返回 None
+    """
+    marker = data[offset]
+    offset += 1
+    if marker == 0:
+        return _DOUBLE.unpack_from(data, offset)[0], offset + 8
+    if marker == 1:
+        return bool(data[offset]), offset + 1
+    if marker == 2:
+        return _amf_string(data, offset)
+    if marker == 12:
+        return _amf_string(data, offset, long=True)
+    if marker in (5, 6):
+        return None, offset
+    if marker == 11:
+        return None, offset + 10
+    if marker in (3, 8):
+        if marker == 8:
+            offset += 4
+        _, offset = _amf_properties(data, offset)
+        return None, offset
+    if marker == 10:
+        count = int.from_bytes(data[offset:offset + 4], 'big')
+        offset += 4
+        for _ in range(count):
+            _, offset = _amf_value(data, offset)
+        return None, offset
+    raise ValueError(f"不支持的 AMF0 类型: {marker}")
+
+
+def _amf_properties(data: bytes, offset: int) -> Tuple[Dict, int]:
+    properties = {}
+    while offset + 3 <= len(data):
+        if data[offset:offset + 3] == b'\x00\x00\x09':
+            return properties, offset + 3
+        key, offset = _amf_string(data, offset)
+        properties[key], offset = _amf_value(data, offset)
+    return properties, offset
+
+
+def parse_script(body: bytes) -> Tuple[Optional[str], Dict]:
+    """
+    解析脚本标签（onMetaData、onTextData 等）的名称与顶层标量字段，无法解析时返回 (None, {})
+    """
+    try:
+        name, offset = _amf_value(body, 0)
+        if not isinstance(name, str) or offset >= len(body) or body[offset] not in (3, 8):
+            return None, {}
+        offset += 5 if body[offset] == 8 else 1
+        return name, _amf_properties(body, offset)[0]
+    except (ValueError, IndexError, struct.error):
+        return None, {}
+
+
+def parse_metadata(body: bytes) -> Dict:
+    """
+    解析 onMetaData 脚本标签的顶层标量字段（width、height、framerate、videocodecid 等），不是 onMetaData 时返回空
+    """
+    name, properties = parse_script(body)
+    return properties if name == 'onMetaData' else {}
+
+
+class HttpFlvSource:
+    """
+    HTTP-FLV 拉流：http.client 建立连接（跟随重定向）后，直接用缓冲读取器的 readinto1 把数据读入预分配的缓冲区，
+    每次最多一次系统调用、有数据即返回；分块传输编码在这里解析
+    """
+
+    MAX_REDIRECTS = 3
+    MAX_LINE = 1024
+
+    def __init__(self, url: str, timeout: Tuple[float, float] = (10, 10), chunk_size: int = 64 * 1024):
+        """
+        :param timeout: (连接与响应头超时, 读取超时) 秒
+        :raises ValueError: 响应不是 FLV
+        """
+        open_timeout, read_timeout = timeout
+        self.url = url
+        self.connection = None
+        self._response = None
+        self._sock = None
+        for _ in range(self.MAX_REDIRECTS + 1):
+            response = self._request(open_timeout)
+            if response.status in (301, 302, 303, 307, 308) and response.getheader('Location'):
+                self.url = urljoin(self.url, response.getheader('Location'))
+                self.close()
+                continue
+            break
+        if response.status != 200:
+            self.close()
+            raise ConnectionError(f"HTTP {response.status} {response.reason}")
+
+        self._sock.settimeout(read_timeout or None)
+        self._fp = response.fp
+        self._chunked = response.chunked
+        self._chunk_left = 0
+        self._chunk_started = False
+        self._buffer = bytearray(chunk_size)
+        self._view = memoryview(self._buffer)
+        # 首块数据用于校验 FLV 签名，之后由 read() 原样返回
+        self._first = self._read_into()
+        if not self._first or self._view[:min(self._first, 3)] != b'FLV'[:self._first]:
+            self.close()
+            raise ValueError("响应不是 FLV 流")
+
+    def _request(self, timeout: float):
+        parts = urlsplit(self.url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.hostname, parts.port, timeout=timeout or None)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        self.connection.request('GET', path, headers={'User-Agent': 'stream-monitor', 'Accept': '*/*'})
+        # HTTP/1.0 或 Connection: close 的响应会从连接上摘下套接字，先保留引用用于设置读取超时
+        self._sock = self.connection.sock
+        self._response = self.connection.getresponse()
+        return self._response
+
+    def _read_into(self) -> int:
+        view = self._view
+        if not self._chunked:
+            return self._fp.readinto1(view)
+        if not self._chunk_left:
+            if self._chunk_started:
+                self._fp.readline(self.MAX_LINE)  # 上一块结尾的 CRLF
+            line = self._fp.readline(self.MAX_LINE)
+            if not line:
+                return 0
+            self._chunk_started = True
+            self._chunk_left = int(line.split(b';', 1)[0].strip() or b'0', 16)
+            if not self._chunk_left:
+                return 0
+        count = self._fp.readinto1(view[:min(self._chunk_left, len(view))])
+        self._chunk_left -= count
+        return count
+
+    def read(self) -> memoryview:
+        """
+        读取下一块数据，返回内部缓冲区的切片（下次读取前有效），流结束时返回空切片
+        """
+        if self._first:
+            count, self._first = self._first, 0
+        else:
+            count = self._read_into()
+        return self._view[:count]
+
+    def close(self):
+        # 响应持有套接字文件的引用，需与连接一起关闭才会释放套接字
+        response, self._response = self._response, None
+        connection, self.connection = self.connection, None
+        self._sock = None
+        if response is not None:
+            response.close()
+        if connection is not None:
+            connection.close()
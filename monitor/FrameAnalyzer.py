@@ -0,0 +1,111 @@
+import numpy as np
+
+from config.log4py import logger
+
+# Y 平面为首个平面且 8 位的像素格式，可直接零拷贝读取亮度
+LUMA_8BIT_FORMATS = {
+    'yuv420p', 'yuvj420p', 'yuv422p', 'yuvj422p', 'yuv444p', 'yuvj444p',
+    'yuv411p', 'yuv440p', 'yuvj440p', 'nv12', 'nv21', 'gray'
+}
+
+
+def luma_plane(frame) -> np.ndarray:
+    """
+    返回解码帧亮度平面的 (高, 宽) 视图，8 位 YUV 格式直接映射解码缓冲区不拷贝，其他格式转换为 gray
+    注意：视图只在 frame 存活期间有效
+    """
+    if frame.format.name not in LUMA_8BIT_FORMATS:
+        frame = frame.reformat(format='gray')
+    plane = frame.planes[0]
+    buffer = np.frombuffer(plane, dtype=np.uint8)
+    return buffer.reshape(-1, plane.line_size)[:frame.height, :frame.width]
+
+
+class FrameAnalyzer:
+    """
+    快速帧质量分析 - 基于亮度平面的向量化指标：亮度、对比度、黑屏、画面静止、块效应
+    """
+
+    def __init__(self, stride: int = 4, thumbnail: tuple = None, black_threshold: int = 20,
+                 black_ratio: float = 0.98, frozen_threshold: float = 1.0):
+        """
+        :param stride: 亮度平面的采样步长，1 为全分辨率
+        :param thumbnail: (宽, 高)，设置后先缩放为灰度缩略图再计算亮度类指标，忽略 stride
+        :param black_threshold: 低于该亮度值的像素视为黑色（有限范围 YUV 黑为 16）
+        :param black_ratio: 黑色像素占比超过该值判定为黑屏
+        :param frozen_threshold: 与上一采样帧的平均绝对差低于该值判定为画面静止
+        """
+        self.stride = max(1, int(stride))
+        self.thumbnail = thumbnail
+        self.black_threshold = black_threshold
+        self.black_ratio = black_ratio
+        self.frozen_threshold = frozen_threshold
+        self._previous = None  # 上一采样帧的亮度样本（小尺寸拷贝）
+
+    def analyze(self, frame) -> dict:
+        """
+        分析一帧
+        """
+        luma = luma_plane(frame)
+        if self.thumbnail:
+            width, height = self.thumbnail
+            thumb = frame.reformat(width=width, height=height, format='gray')
+            sample = np.frombuffer(thumb.planes[0], dtype=np.uint8).reshape(-1, thumb.planes[0].line_size)[
+                     :height, :width]
+        else:
+            sample = luma[::self.stride, ::self.stride]
+
+        brightness = float(sample.mean())
+        contrast = float(sample.std(dtype=np.float32))
+        black_ratio = np.count_nonzero(sample < self.black_threshold) / sample.size
+
+        frame_diff = None
+        previous = self._previous
+        if previous is not None and previous.shape == sample.shape:
+            frame_diff = float(np.abs(sample.astype(np.int16) - previous).mean())
+        self._previous = sample.astype(np.int16)
+
+        return {
+            'brightness': brightness,
+            'contrast': contrast,
+            'black_ratio': black_ratio,
+            'black_frame': black_ratio >= self.black_ratio,
+            'frame_diff': frame_diff,
+            'frozen_frame': frame_diff is not None and frame_diff < self.frozen_threshold,
+            'blockiness': self._blockiness(luma),
+            'resolution': (frame.width, frame.height)
+        }
+
+    def _blockiness(self, luma: np.ndarray) -> float:
+        """
+        块效应：8 像素块边界处的水平梯度与整体水平梯度之比，约为 1 表示无块效应，越大越明显
+        行方向按 stride 采样，列方向保持全分辨率以对齐块边界
+        """
+        if luma.shape[1] < 16:
+            return 0.0
+        rows = luma[::self.stride * 2].astype(np.int16)
+        gradient = np.abs(np.diff(rows, axis=1))
+        overall = gradient.mean()
+        if overall <= 0:
+            return 0.0
+        return float(gradient[:, 7::8].mean() / overall)
+
+    def reset(self):
+        """
+        重置静止检测的参考帧（如重连后）
+        """
+        self._previous = None
+
+
+def parse_thumbnail(value):
+    """
+    解析 "160x90" 形式的缩略图尺寸
+    """
+    if not value:
+        return None
+    try:
+        width, height = str(value).lower().split('x')
+        return int(width), int(height)
+    except ValueError:
+        logger.warning(f"无效的缩略图尺寸: {value}")
+        return None
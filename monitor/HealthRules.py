@@ -0,0 +1,239 @@
+import json
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+
+from config.AlertFilter import LEVEL_ORDER
+from config.ConfigLoader import get_config
+from config.log4py import logger
+
+# 默认阈值（与原硬编码一致）
+DEFAULT_THRESHOLDS = {
+    'no_packet_seconds': 10,  # 超过该秒数无数据包判定为不可播放
+    'no_keyframe_seconds': 30,  # 超过该秒数无关键帧判定为质量差
+    'bitrate_min_samples': 10,  # 码率样本数超过该值才检查稳定性
+    'bitrate_cv_moderate': 0.2,  # 码率变异系数超过该值为 moderate
+    'bitrate_cv_unstable': 0.5,  # 码率变异系数超过该值为 unstable
+    'fps_poor': 15,  # 帧率低于该值为质量差
+    'fps_fair': 24,  # 帧率低于该值为质量一般
+    'gop_min': 10,  # GOP 帧数低于该值提示
+    'gop_max': 300,  # GOP 帧数高于该值提示
+    'live_delay_seconds': 5,  # 落后直播边缘超过该秒数判定为缓冲积压
+    'delay_growth_ms': 100,  # 延迟增长率超过该值(毫秒/秒)判定为缓冲积压
+}
+
+# 告警条件按顺序匹配，级别最高的条件决定 alertLevel 与 message；ignore 表示不参与
+DEFAULT_SEVERITY = {
+    'not_playable': 'error',
+    'black': 'error',
+    'frozen': 'error',
+    'silent': 'error',
+    'poor_quality': 'warning',
+    'bitrate_unstable': 'warning',
+    'buffer_bloat': 'warning',
+    'clipping': 'warning',
+}
+
+# 问题描述模板
+DEFAULT_ISSUES = {
+    'no_packets': '{limit:g}秒内无数据包',
+    'no_keyframe': '{limit:g}秒内无关键帧',
+    'bitrate_unstable': '码率波动较大',
+    'fps_poor': '帧率过低: {fps:.1f}fps',
+    'fps_fair': '帧率较低: {fps:.1f}fps',
+    'gop_large': 'GOP过大: {gop}帧',
+    'gop_small': 'GOP过小: {gop}帧',
+    'black': '黑屏 {seconds} 秒',
+    'frozen': '画面静止 {seconds} 秒',
+    'silent': '静音 {seconds} 秒',
+    'clipping': '音频削波: {ratio:.2%}',
+    'live_delay': '落后直播边缘 {seconds:.1f} 秒',
+    'delay_growth': '延迟持续增长: {rate:.0f}ms/s',
+}
+
+# 告警消息模板，可引用 stream_id 与 health 中的字段
+DEFAULT_MESSAGES = {
+    'not_playable': 'stream {stream_id} can not be played.',
+    'black': 'stream {stream_id} is black for {black_seconds}s.',
+    'frozen': 'stream {stream_id} is frozen for {frozen_seconds}s.',
+    'silent': 'stream {stream_id} audio is silent for {silent_seconds}s.',
+    'poor_quality': 'stream {stream_id} quality is poor.',
+    'bitrate_unstable': 'stream {stream_id} bitrate is unstable.',
+    'buffer_bloat': 'stream {stream_id} is {live_delay}ms behind live.',
+    'clipping': 'stream {stream_id} audio is clipping.',
+    'ok': 'stream {stream_id} running OK.',
+}
+
+# 模板校验用的示例参数
+_ISSUE_SAMPLE = {'limit': 10, 'fps': 10.0, 'gop': 10, 'seconds': 10, 'rate': 100.0, 'ratio': 0.01}
+_MESSAGE_SAMPLE = {'stream_id': 'sample', 'playable': True, 'quality': 'good', 'issues': [], 'estimated_delay': 0,
+                   'bitrate_stability': 'stable', 'resolution_stability': 'stable', 'black': False,
+                   'black_seconds': 0, 'frozen': False, 'frozen_seconds': 0, 'silent': False,
+                   'silent_seconds': 0, 'clipping': False, 'live_delay': 0, 'delay_growth': 0.0,
+                   'end_to_end_delay': None, 'buffer_bloat': False}
+
+# 告警条件与 health 字段的对应
+_CONDITIONS = {
+    'not_playable': lambda health: not health['playable'],
+    'black': lambda health: health['black'],
+    'frozen': lambda health: health['frozen'],
+    'silent': lambda health: health.get('silent', False),
+    'poor_quality': lambda health: health['quality'] == 'poor',
+    'bitrate_unstable': lambda health: health['bitrate_stability'] == 'unstable',
+    'buffer_bloat': lambda health: health.get('buffer_bloat', False),
+    'clipping': lambda health: health.get('clipping', False),
+}
+
+
+class CompiledRules:
+    """
+    编译后的一套健康规则：阈值为普通属性，模板预先绑定 format，告警条件按级别排好序
+    每次检查的开销与配置了多少分组、覆盖无关
+    """
+    __slots__ = tuple(DEFAULT_THRESHOLDS) + ('index', 'issue', 'alerts', 'ok_message')
+
+    def __init__(self, index: int, thresholds: Dict, severity: Dict, issues: Dict, messages: Dict):
+        self.index = index
+        for name, value in thresholds.items():
+            setattr(self, name, value)
+        self.issue = {name: template.format for name, template in issues.items()}
+        ranked = [(name, level) for name, level in severity.items() if level in LEVEL_ORDER]
+        # 级别高的优先，同级别保持配置顺序
+        ranked.sort(key=lambda item: -LEVEL_ORDER[item[1]])
+        self.alerts = [(_CONDITIONS[name], level, messages[name].format) for name, level in ranked]
+        self.ok_message = messages['ok'].format
+
+    def alert(self, stream_id: str, health: Dict):
+        """
+        根据健康状况返回 (alertLevel, message)
+        """
+        for condition, level, message in self.alerts:
+            if condition(health):
+                return level, message(stream_id=stream_id, **health)
+        return 'info', self.ok_message(stream_id=stream_id, **health)
+
+
+class HealthRuleBook:
+    """
+    健康规则集合 - 加载时把 默认 ← 分组 ← 单流覆盖 合并并编译，相同规则的流共享一份编译结果
+    同时维护所有编译规则的阈值表，供向量化评估按规则下标取阈值
+    """
+
+    def __init__(self, config: Dict = None):
+        config = config or {}
+        self.base = self._section(config, 'default')
+        self.groups = {name: self._section(group or {}, f"groups.{name}")
+                       for name, group in (config.get('groups') or {}).items()}
+        self.base = {
+            'thresholds': {**DEFAULT_THRESHOLDS, **self.base['thresholds']},
+            'severity': {**DEFAULT_SEVERITY, **self.base['severity']},
+            'issues': {**DEFAULT_ISSUES, **self.base['issues']},
+            'messages': {**DEFAULT_MESSAGES, **self.base['messages']},
+        }
+        self._compiled: Dict[str, CompiledRules] = {}
+        self._rules = []
+        self._table = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _section(config: Dict, name: str) -> Dict:
+        """
+        校验一段规则配置，忽略未知的阈值与告警条件
+        """
+        section = {
+            'thresholds': dict(config.get('thresholds') or {}),
+            'severity': dict(config.get('severity') or {}),
+            'issues': dict(config.get('issues') or {}),
+            'messages': dict(config.get('messages') or {}),
+        }
+        for key in list(section['thresholds']):
+            if key not in DEFAULT_THRESHOLDS:
+                logger.warning(f"健康规则 {name}: 未知阈值 {key}，已忽略")
+                section['thresholds'].pop(key)
+        for key, level in list(section['severity'].items()):
+            if key not in DEFAULT_SEVERITY or (level not in LEVEL_ORDER and level != 'ignore'):
+                logger.warning(f"健康规则 {name}: 无效的告警级别 {key}={level}，已忽略")
+                section['severity'].pop(key)
+        return section
+
+    def resolve(self, group: str = None, overrides: Dict = None) -> CompiledRules:
+        """
+        获取流的编译规则：默认规则 ← 分组规则 ← 单流覆盖
+        """
+        if group and group not in self.groups:
+            logger.warning(f"未知的健康规则分组 {group}，使用默认规则")
+            group = None
+        key = json.dumps([group, overrides], sort_keys=True, default=str)
+        with self._lock:
+            rules = self._compiled.get(key)
+            if rules is not None:
+                return rules
+
+            merged = {part: dict(values) for part, values in self.base.items()}
+            layers = [self.groups[group]] if group else []
+            if overrides:
+                layers.append(self._section(overrides, 'stream'))
+            for layer in layers:
+                for part, values in layer.items():
+                    merged[part].update(values)
+            self._check_templates(merged['issues'], DEFAULT_ISSUES, _ISSUE_SAMPLE)
+            self._check_templates(merged['messages'], DEFAULT_MESSAGES, _MESSAGE_SAMPLE)
+
+            rules = CompiledRules(len(self._rules), merged['thresholds'], merged['severity'], merged['issues'],
+                                  merged['messages'])
+            self._rules.append(rules)
+            self._compiled[key] = rules
+            self._table = None
+            return rules
+
+    @staticmethod
+    def _check_templates(templates: Dict, defaults: Dict, sample: Dict):
+        """
+        编译时校验模板，无效的模板回退为默认模板
+        """
+        for name, template in list(templates.items()):
+            if name not in defaults:
+                templates.pop(name)
+                continue
+            try:
+                str(template).format(**sample)
+                templates[name] = str(template)
+            except (KeyError, IndexError, ValueError) as e:
+                logger.warning(f"无效的健康规则模板 {name}: {template}，使用默认模板")
+                logger.warning(e)
+                templates[name] = defaults[name]
+
+    def table(self) -> Dict[str, np.ndarray]:
+        """
+        阈值表：{阈值名: 按规则下标排列的数组}
+        """
+        table = self._table
+        if table is None:
+            with self._lock:
+                table = {name: np.array([getattr(rules, name) for rules in self._rules], dtype=np.float64)
+                         for name in DEFAULT_THRESHOLDS}
+                self._table = table
+        return table
+
+
+# 规则单例（进程内所有流共享）
+_book_instance: Optional[HealthRuleBook] = None
+_book_lock = threading.Lock()
+
+
+def get_rule_book() -> HealthRuleBook:
+    """获取进程共享的健康规则（单例模式），从全局配置的 health_rules 段编译"""
+    global _book_instance
+
+    with _book_lock:
+        if _book_instance is None:
+            try:
+                rules_config = get_config().get('health_rules') or {}
+            except Exception as e:
+                logger.warning("加载健康规则失败，使用默认规则")
+                logger.error(e)
+                rules_config = {}
+            _book_instance = HealthRuleBook(rules_config)
+
+    return _book_instance
@@ -0,0 +1,343 @@
+import http.client
+import re
+import threading
+import time
+from collections import namedtuple
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+from monitor.MetricsStore import SlotRecord
+
+# 超过目标时长的该倍数未出现新分片，播放列表视为过期（直播中断）
+STALE_FACTOR = 1.5
+# 两次轮询的最短间隔(秒)
+MIN_POLL_SECONDS = 0.1
+MAX_REDIRECTS = 3
+
+Segment = namedtuple('Segment', 'sequence uri duration discontinuity map_uri byterange')
+MediaPlaylist = namedtuple('MediaPlaylist', 'target_duration media_sequence segments ended independent')
+HttpResult = namedtuple('HttpResult', 'status headers body seconds')
+
+_URI_ATTR = re.compile(r'URI="([^"]*)"')
+_BANDWIDTH_ATTR = re.compile(r'(?:^|,)BANDWIDTH=(\d+)')
+
+
+def parse_playlist(text: str, base_url: str) -> Tuple[List[Tuple[int, str]], Optional[MediaPlaylist]]:
+    """
+    解析 M3U8：主播放列表返回 ([(带宽, 地址)], None)，媒体播放列表返回 ([], MediaPlaylist)；地址已按 base_url 解析为绝对地址
+    :raises ValueError: 不是 M3U8
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    if not lines or not lines[0].startswith('#EXTM3U'):
+        raise ValueError("不是 M3U8 播放列表")
+    variants = []
+    segments = []
+    target_duration = 0.0
+    sequence = 0
+    ended = False
+    independent = False
+    duration = None
+    discontinuity = False
+    map_uri = None
+    byterange = None
+    next_offset = {}  # 未写明偏移的 BYTERANGE 接着同一地址的上一个子范围
+    bandwidth = None
+    for line in lines[1:]:
+        if line.startswith('#'):
+            tag, _, value = line.partition(':')
+            if tag == '#EXT-X-STREAM-INF':
+                match = _BANDWIDTH_ATTR.search(value)
+                bandwidth = int(match.group(1)) if match else 0
+            elif tag == '#EXT-X-TARGETDURATION':
+                target_duration = float(value)
+            elif tag == '#EXT-X-MEDIA-SEQUENCE':
+                sequence = int(value)
+            elif tag == '#EXTINF':
+                duration = float(value.split(',', 1)[0])
+            elif tag == '#EXT-X-DISCONTINUITY':
+                discontinuity = True
+            elif tag == '#EXT-X-MAP':
+                match = _URI_ATTR.search(value)
+                map_uri = urljoin(base_url, match.group(1)) if match else None
+            elif tag == '#EXT-X-BYTERANGE':
+                length, _, offset = value.partition('@')
+                byterange = (int(length), int(offset) if offset else None)
+            elif tag == '#EXT-X-ENDLIST':
+                ended = True
+            elif tag == '#EXT-X-INDEPENDENT-SEGMENTS':
+                independent = True
+            continue
+        uri = urljoin(base_url, line)
+        if bandwidth is not None:
+            variants.append((bandwidth, uri))
+            bandwidth = None
+            continue
+        if byterange is not None:
+            length, offset = byterange
+            if offset is None:
+                offset = next_offset.get(uri, 0)
+            next_offset[uri] = offset + length
+            byterange = (offset, offset + length - 1)
+        segments.append(Segment(sequence, uri, duration or 0.0, discontinuity, map_uri, byterange))
+        sequence += 1
+        duration = None
+        discontinuity = False
+        byterange = None
+    if variants:
+        return variants, None
+    first = segments[0].sequence if segments else sequence
+    return [], MediaPlaylist(target_duration, first, segments, ended, independent)
+
+
+class HttpConnectionPool:
+    """
+    进程共享的 HTTP keep-alive 连接池：按 (协议, 主机, 端口) 保留空闲连接，同一 CDN 上的流共用连接
+    """
+
+    def __init__(self, max_idle_per_host: int = 8):
+        self.max_idle_per_host = max_idle_per_host
+        self._idle: Dict[tuple, List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _acquire(self, key, open_timeout: float, read_timeout: float):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.reused += 1
+                return idle.pop(), True
+            self.created += 1
+        scheme, host, port = key
+        connection_class = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        connection = connection_class(host, port, timeout=open_timeout or None)
+        connection.connect()
+        connection.sock.settimeout(read_timeout or None)
+        return connection, False
+
+    def _release(self, key, connection):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append(connection)
+                return
+        connection.close()
+
+    def get(self, url: str, headers: Dict[str, str] = None, timeout: Tuple[float, float] = (10, 10)) -> HttpResult:
+        """
+        GET 并读取完整响应体；复用的空闲连接已被服务端关闭时换新连接重试一次
+        """
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = (parts.path or '/') + (f"?{parts.query}" if parts.query else '')
+        request_headers = {'User-Agent': 'stream-monitor', 'Accept': '*/*', **(headers or {})}
+        while True:
+            connection, reused = self._acquire(key, *timeout)
+            started = time.monotonic()
+            try:
+                connection.request('GET', path, headers=request_headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (http.client.HTTPException, OSError):
+                connection.close()
+                if reused:
+                    continue
+                raise
+            seconds = time.monotonic() - started
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+            return HttpResult(response.status, {k.lower(): v for k, v in response.getheaders()}, body, seconds)
+
+    def close(self):
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+_pool_instance = None
+_pool_lock = threading.Lock()
+
+
+def get_http_pool() -> HttpConnectionPool:
+    """获取进程共享的 HTTP 连接池（单例模式）"""
+    global _pool_instance
+
+    with _pool_lock:
+        if _pool_instance is None:
+            _pool_instance = HttpConnectionPool()
+        return _pool_instance
+
+
+class HlsStats(SlotRecord):
+    """
+    HLS 播放列表与分片统计
+    """
+    __slots__ = ('target_duration', 'media_sequence', 'segments', 'sequence_gaps', 'sequence_resets',
+                 'target_duration_violations', 'playlist_polls', 'playlist_not_modified', 'playlist_errors',
+                 'stale_polls', 'last_segment_time', 'sampled_segments', 'segment_bytes', 'download_seconds',
+                 'throughput', 'download_ratio')
+
+    def __init__(self):
+        self.target_duration = 0.0  # EXT-X-TARGETDURATION(秒)
+        self.media_sequence = None  # 播放列表中最新分片的媒体序列号
+        self.segments = 0  # 观察到的新分片数
+        self.sequence_gaps = 0  # 两次轮询之间被移出播放列表、未观察到的分片数
+        self.sequence_resets = 0  # 媒体序列号倒退次数（源站重启）
+        self.target_duration_violations = 0  # EXTINF 四舍五入后超过目标时长的分片数
+        self.playlist_polls = 0
+        self.playlist_not_modified = 0  # 条件请求返回 304 的次数
+        self.playlist_errors = 0
+        self.stale_polls = 0  # 播放列表已过期时的轮询次数
+        self.last_segment_time = None  # 最近出现新分片的时间
+        self.sampled_segments = 0  # 下载并解复用的采样分片数
+        self.segment_bytes = 0  # 最近采样分片的字节数
+        self.download_seconds = 0.0  # 最近采样分片的下载耗时
+        self.throughput = 0.0  # 最近采样分片的下载吞吐 (bps)
+        self.download_ratio = 0.0  # 下载耗时 / 分片时长，大于 1 时下载跟不上播放
+
+
+class HlsSession:
+    """
+    一次 HLS 会话：用连接池条件轮询媒体播放列表（If-None-Match / If-Modified-Since），跟踪媒体序列号推进，
+    按需下载分片；主播放列表选择第一个变体
+    """
+
+    def __init__(self, url: str, stats: HlsStats, timeout: Tuple[float, float] = (10, 10),
+                 pool: HttpConnectionPool = None):
+        """
+        :raises ValueError: 不是 M3U8
+        """
+        self.stats = stats
+        self.timeout = timeout
+        self.pool = pool or get_http_pool()
+        self.url = url
+        self.playlist: Optional[MediaPlaylist] = None
+        self._etag = None
+        self._last_modified = None
+        self._last_sequence = None
+        self._last_change = None
+        self._changed = False
+        self._maps: Dict[str, bytes] = {}  # EXT-X-MAP 初始化分片缓存
+        for _ in range(MAX_REDIRECTS + 1):
+            variants, playlist = parse_playlist(*self._fetch(url))
+            if playlist is not None:
+                break
+            url = self.url = variants[0][1]
+        else:
+            raise ValueError("主播放列表嵌套过深")
+        self._update(playlist, time.monotonic())
+
+    def _fetch(self, url: str, conditional: bool = False) -> Optional[Tuple[str, str]]:
+        """
+        获取播放列表文本与最终地址（跟随重定向），条件请求未修改时返回 None
+        """
+        headers = {}
+        if conditional:
+            if self._etag:
+                headers['If-None-Match'] = self._etag
+            if self._last_modified:
+                headers['If-Modified-Since'] = self._last_modified
+        for _ in range(MAX_REDIRECTS + 1):
+            result = self.pool.get(url, headers, self.timeout)
+            if result.status in (301, 302, 303, 307, 308) and result.headers.get('location'):
+                url = self.url = urljoin(url, result.headers['location'])
+                continue
+            break
+        if result.status == 304:
+            return None
+        if result.status != 200:
+            raise ConnectionError(f"HTTP {result.status}")
+        self._etag = result.headers.get('etag')
+        self._last_modified = result.headers.get('last-modified')
+        return result.body.decode('utf-8', 'replace'), url
+
+    def poll(self, now: float) -> List[Segment]:
+        """
+        条件轮询一次播放列表，返回新出现的分片（首次为播放列表中最新的分片）
+        """
+        stats = self.stats
+        stats.playlist_polls += 1
+        fetched = self._fetch(self.url, conditional=True)
+        if fetched is None:
+            stats.playlist_not_modified += 1
+            self._changed = False
+            new = []
+        else:
+            _, playlist = parse_playlist(*fetched)
+            if playlist is None:
+                raise ValueError("媒体播放列表变为主播放列表")
+            new = self._update(playlist, now)
+        if not self.alive(now):
+            stats.stale_polls += 1
+        return new
+
+    def _update(self, playlist: MediaPlaylist, now: float) -> List[Segment]:
+        stats = self.stats
+        self.playlist = playlist
+        stats.target_duration = playlist.target_duration
+        segments = playlist.segments
+        if not segments:
+            self._changed = False
+            return []
+        last = segments[-1].sequence
+        previous = self._last_sequence
+        if previous is None or last < previous:
+            if previous is not None:
+                stats.sequence_resets += 1
+            new = segments[-1:]
+        else:
+            new = [segment for segment in segments if segment.sequence > previous]
+            if segments[0].sequence > previous + 1:
+                stats.sequence_gaps += segments[0].sequence - previous - 1
+        for segment in new:
+            if round(segment.duration) > playlist.target_duration:
+                stats.target_duration_violations += 1
+        if previous is not None:
+            stats.segments += len(new)
+        self._changed = bool(new)
+        if new:
+            self._last_sequence = last
+            self._last_change = now
+            stats.media_sequence = last
+            stats.last_segment_time = time.time()
+        return new
+
+    def alive(self, now: float) -> bool:
+        """
+        直播是否在推进：最近一次出现新分片距今不超过 STALE_FACTOR 倍目标时长；点播列表始终视为存活
+        """
+        playlist = self.playlist
+        if playlist is not None and playlist.ended:
+            return True
+        return self._last_change is not None and now - self._last_change <= STALE_FACTOR * max(
+            playlist.target_duration, MIN_POLL_SECONDS)
+
+    def next_delay(self) -> float:
+        """
+        下次轮询的间隔：播放列表有变化时等待一个目标时长，未变化时等待半个目标时长
+        """
+        target = self.playlist.target_duration if self.playlist is not None else 1.0
+        return max(target if self._changed else target / 2, MIN_POLL_SECONDS)
+
+    def download(self, segment: Segment) -> Tuple[bytes, float]:
+        """
+        下载分片，返回 (数据, 耗时秒)；fMP4 分片前拼接初始化分片
+        """
+        headers = {'Range': 'bytes=%d-%d' % segment.byterange} if segment.byterange else None
+        result = self.pool.get(segment.uri, headers, self.timeout)
+        if result.status not in (200, 206):
+            raise ConnectionError(f"HTTP {result.status}")
+        data = result.body
+        if segment.map_uri:
+            init = self._maps.get(segment.map_uri)
+            if init is None:
+                init = self._maps[segment.map_uri] = self.pool.get(segment.map_uri, None, self.timeout).body
+            data = init + data
+        return data, result.seconds
+
+    def close(self):
+        self._maps.clear()
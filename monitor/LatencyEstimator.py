@@ -0,0 +1,272 @@
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+# 延迟来源：pts 只有包时间戳与到达时间，延迟相对于观测到的直播边缘；sei/script 有编码器墙上时间，可得端到端延迟
+SOURCE_PTS = 'pts'
+SOURCE_SEI = 'sei'
+SOURCE_SCRIPT = 'script'
+
+# 每隔该秒数（到达时间）采样一次延迟（相对直播边缘）的变化率，连接时追赶直播边缘的阶段延迟为 0，不计为负增长
+GROWTH_INTERVAL = 1.0
+# 延迟增长率的平滑系数（每次采样）
+GROWTH_ALPHA = 0.2
+# 编码器与本机时钟的最大漂移(200 ppm)：不超过该速率的长期增长按时钟漂移让直播边缘跟随，更快的计为延迟增长
+MAX_CLOCK_DRIFT = 200e-6
+DRIFT_ALPHA = 0.01
+
+# 合理的编码器墙上时间范围（2001 ~ 2100 年的 Unix 秒）
+EPOCH_MIN = 978307200
+EPOCH_MAX = 4102444800
+# Unix 秒、毫秒、微秒、纳秒
+EPOCH_SCALES = (1, 1e3, 1e6, 1e9)
+
+# SEI：H.264 NAL 类型 6，HEVC 前缀 SEI 39；负载类型 5 为 user_data_unregistered（16 字节 UUID + 自定义数据）
+H264_SEI = 6
+HEVC_PREFIX_SEI = 39
+SEI_USER_DATA_UNREGISTERED = 5
+UUID_SIZE = 16
+# 每个关键帧最多查看的 NAL 单元数与 SEI 字节数，单包开销有上限
+MAX_SEI_NALS = 8
+MAX_SEI_BYTES = 1024
+# light 引擎在关键帧上收集的负载字节数（x264 版本信息 SEI 约 600 字节，时间 SEI 通常在其后）
+KEYFRAME_PEEK = 2048
+
+# FLV 脚本标签（onMetaData、onTextData）中携带编码器墙上时间的字段，按顺序取第一个可解析的
+SCRIPT_WALLCLOCK_KEYS = ('wallclock', 'walltime', 'timestamp', 'utc', 'time')
+
+_DIGITS = re.compile(rb'(\d{10,19})(?:\.(\d{1,9}))?')
+_ISO_TIME = re.compile(rb'\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d{1,6})?(?:Z|[+-]\d{2}:\d{2})?')
+
+
+def _epoch(value: float) -> Optional[float]:
+    """
+    按数量级把 Unix 秒/毫秒/微秒/纳秒换算为秒，不在合理范围内时返回 None
+    """
+    for scale in EPOCH_SCALES:
+        seconds = value / scale
+        if EPOCH_MIN <= seconds <= EPOCH_MAX:
+            return seconds
+    return None
+
+
+def parse_wallclock(value) -> Optional[float]:
+    """
+    解析编码器墙上时间，返回 Unix 秒：数值（秒/毫秒/微秒/纳秒）、ISO 8601 字符串，
+    或字节串中的十进制时间戳、ISO 8601 文本，以及恰好 8 字节的大端整数
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return _epoch(value)
+    if isinstance(value, str):
+        value = value.encode('ascii', 'ignore')
+    data = bytes(value)
+    match = _ISO_TIME.search(data)
+    if match:
+        text = match.group(0).decode().replace('Z', '+00:00')
+        try:
+            parsed = datetime.fromisoformat(text)
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return _epoch(parsed.timestamp())
+    match = _DIGITS.search(data)
+    if match:
+        seconds = _epoch(int(match.group(1)))
+        if seconds is not None and match.group(2) and seconds == int(match.group(1)):
+            seconds += int(match.group(2)) / 10 ** len(match.group(2))
+        return seconds
+    if len(data) == 8:
+        return _epoch(int.from_bytes(data, 'big'))
+    return None
+
+
+def _unescape(data) -> bytes:
+    """
+    去掉 RBSP 中的防竞争字节（00 00 03）
+    """
+    data = bytes(data)
+    if b'\x00\x00\x03' not in data:
+        return data
+    out = bytearray()
+    zeros = 0
+    for byte in data:
+        if zeros >= 2 and byte == 3:
+            zeros = 0
+            continue
+        out.append(byte)
+        zeros = zeros + 1 if byte == 0 else 0
+    return bytes(out)
+
+
+def _nal_units(data):
+    """
+    依次产出 NAL 单元（memoryview），自动识别 Annex B 起始码与 4 字节长度前缀（AVCC/HVCC）两种格式
+    """
+    size = len(data)
+    if size >= 4 and (data[:3] == b'\x00\x00\x01' or data[:4] == b'\x00\x00\x00\x01'):
+        raw = bytes(data[:min(size, MAX_SEI_BYTES * MAX_SEI_NALS)])
+        starts = [match.end() for match in re.finditer(b'\x00\x00\x01', raw)]
+        for i, start in enumerate(starts):
+            end = starts[i + 1] - 3 if i + 1 < len(starts) else len(raw)
+            yield memoryview(raw)[start:end]
+        return
+    pos = 0
+    while pos + 4 <= size:
+        length = int.from_bytes(data[pos:pos + 4], 'big')
+        pos += 4
+        if length <= 0 or pos + length > size:
+            return
+        yield data[pos:pos + length]
+        pos += length
+
+
+def _sei_messages(rbsp: bytes):
+    """
+    依次产出 SEI 消息 (payload_type, payload)
+    """
+    pos = 0
+    size = len(rbsp)
+    while pos < size and rbsp[pos] != 0x80:
+        payload_type = 0
+        while pos < size and rbsp[pos] == 0xff:
+            payload_type += 255
+            pos += 1
+        if pos >= size:
+            return
+        payload_type += rbsp[pos]
+        pos += 1
+        payload_size = 0
+        while pos < size and rbsp[pos] == 0xff:
+            payload_size += 255
+            pos += 1
+        if pos >= size:
+            return
+        payload_size += rbsp[pos]
+        pos += 1
+        yield payload_type, rbsp[pos:pos + payload_size]
+        pos += payload_size
+
+
+def sei_wallclock(data, codec: str) -> Optional[float]:
+    """
+    从关键帧开头的 SEI user_data_unregistered 中读取编码器墙上时间（Unix 秒）；
+    遇到第一个图像 NAL 或查看了 MAX_SEI_NALS 个 NAL 后停止，不扫描图像数据
+    :param data: 包数据（支持缓冲协议，不拷贝）
+    :param codec: h264 或 hevc，其他编码返回 None
+    """
+    if codec not in ('h264', 'hevc'):
+        return None
+    hevc = codec == 'hevc'
+    view = memoryview(data)
+    for count, nal in enumerate(_nal_units(view)):
+        if count >= MAX_SEI_NALS or len(nal) < 2:
+            return None
+        if hevc:
+            nal_type = (nal[0] >> 1) & 0x3f
+            header = 2
+            is_sei, is_picture = nal_type == HEVC_PREFIX_SEI, nal_type < 32
+        else:
+            nal_type = nal[0] & 0x1f
+            header = 1
+            is_sei, is_picture = nal_type == H264_SEI, 1 <= nal_type <= 5
+        if is_picture:
+            return None
+        if not is_sei or len(nal) > MAX_SEI_BYTES:
+            continue
+        for payload_type, payload in _sei_messages(_unescape(nal[header:])):
+            if payload_type == SEI_USER_DATA_UNREGISTERED and len(payload) > UUID_SIZE:
+                seconds = parse_wallclock(payload[UUID_SIZE:])
+                if seconds is not None:
+                    return seconds
+    return None
+
+
+def script_wallclock(properties) -> Optional[float]:
+    """
+    从脚本标签的顶层字段中读取编码器墙上时间（Unix 秒）
+    """
+    for key in SCRIPT_WALLCLOCK_KEYS:
+        seconds = parse_wallclock(properties.get(key))
+        if seconds is not None:
+            return seconds
+    return None
+
+
+class LatencyEstimator:
+    """
+    直播延迟估计 - 连接时把流的媒体时间(dts)锚定到单调时钟，跟踪 (到达时间 - 媒体时间) 的漂移，每包 O(1)
+
+    到达最快的包（(到达时间 - 媒体时间) 的最小值）视为直播边缘：连接时服务端突发下发的缓存使该值逐步减小，
+    追上直播后保持稳定；此后该值的增长即为落后直播边缘的延迟（源站或链路积压）。
+    编码器与本机时钟的漂移（不超过 MAX_CLOCK_DRIFT）由直播边缘缓慢跟随，不计入延迟。
+    有编码器墙上时间（SEI、FLV 脚本标签）时另外给出端到端延迟（采集到到达）。
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """
+        重新锚定（连接或时间戳不连续）
+        """
+        self.base = None  # 直播边缘：到达时间 - 媒体时间 的最小值(秒)
+        self.first_relative = None  # 首个包的 到达时间 - 媒体时间
+        self.media_end = None  # 已收到的最大媒体时间(秒)
+        self.growth = 0.0  # 平滑后的延迟增长率(秒/秒)
+        self.drift = 0.0  # 估计的时钟漂移(秒/秒)，绝对值不超过 MAX_CLOCK_DRIFT
+        self._sample_arrival = None
+        self._sample_delay = None
+        self.encoder_base = None  # 编码器墙上时间（换算到单调时钟）- 媒体时间
+        self.source = SOURCE_PTS
+
+    def on_media(self, media: float, now: float):
+        """
+        一个视频包：media 为媒体时间(秒)，now 为到达时的单调时钟
+        """
+        relative = now - media
+        base = self.base
+        if base is None:
+            self.base = self.first_relative = relative
+            self._sample_arrival = now
+            self._sample_delay = 0.0
+            self.media_end = media
+            return
+        if relative < base:
+            self.base = relative
+        if media > self.media_end:
+            self.media_end = media
+
+        elapsed = now - self._sample_arrival
+        if elapsed >= GROWTH_INTERVAL:
+            delay = relative - self.base
+            rate = (delay - self._sample_delay) / elapsed
+            self.growth += (rate - self.growth) * GROWTH_ALPHA
+            self.drift += (min(max(rate, -MAX_CLOCK_DRIFT), MAX_CLOCK_DRIFT) - self.drift) * DRIFT_ALPHA
+            self.base = min(self.base + self.drift * elapsed, relative)
+            self._sample_arrival = now
+            self._sample_delay = relative - self.base
+
+    def on_wallclock(self, wall: float, source: str, media: float = None):
+        """
+        编码器墙上时间
+        :param wall: 编码器时间换算到本机单调时钟
+        :param media: 对应的媒体时间，默认为最新收到的视频包
+        """
+        media = self.media_end if media is None else media
+        if media is not None:
+            self.encoder_base = wall - media
+            self.source = source
+
+    def status(self, now: float):
+        """
+        :param now: 单调时钟
+        :return: (落后直播边缘秒数, 延迟增长率 秒/秒, 端到端延迟秒数或 None, 连接时的积压秒数)，未收到包时为 None
+        """
+        if self.base is None:
+            return None
+        live = now - self.media_end
+        end_to_end = live - self.encoder_base if self.encoder_base is not None else None
+        return max(0.0, live - self.base), self.growth, end_to_end, self.first_relative - self.base
@@ -0,0 +1,304 @@
+import math
+import threading
+import weakref
+from typing import Optional
+
+import numpy as np
+
+# 质量等级编码，质量历史按 int8 存储
+QUALITY_LEVELS = ('good', 'fair', 'poor')
+QUALITY_CODES = {level: code for code, level in enumerate(QUALITY_LEVELS)}
+
+
+class SlotRecord:
+    """
+    __slots__ 记录 - 属性存储，兼容 dict 的下标访问（stats['x']、update、get 等）
+    """
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def __iter__(self):
+        return iter(self.__slots__)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def update(self, values):
+        for key, value in values.items():
+            self[key] = value
+
+    def as_dict(self) -> dict:
+        return dict(self.items())
+
+
+class PacketStats(SlotRecord):
+    """
+    基础监控状态
+    """
+    __slots__ = ('total_packets', 'video_packets', 'audio_packets', 'keyframes', 'start_time', 'last_packet_time',
+                 'last_keyframe_time')
+
+    def __init__(self):
+        self.total_packets = 0
+        self.video_packets = 0
+        self.audio_packets = 0
+        self.keyframes = 0
+        self.start_time = None
+        self.last_packet_time = None
+        self.last_keyframe_time = None
+
+
+class DeepStats(SlotRecord):
+    """
+    深度分析状态，bitrate_history 为列式存储中本流的环形缓冲视图
+    """
+    __slots__ = ('current_bitrate', 'average_bitrate', 'bitrate_history', 'resolution', 'frame_rate', 'codec',
+                 'profile', 'bit_depth', 'color_space', 'gop_size', 'last_gop_start', 'buffer_health', 'packet_loss',
+                 'jitter', 'gop_duration', 'last_frame_analysis', 'decode_count', 'decode_cpu',
+                 # 帧质量分析结果（FrameAnalyzer.analyze）
+                 'brightness', 'contrast', 'black_ratio', 'black_frame', 'frame_diff', 'frozen_frame', 'blockiness')
+
+    def __init__(self, bitrate_history):
+        self.current_bitrate = 0  # 当前码率 (bps)
+        self.average_bitrate = 0  # 平均码率
+        self.bitrate_history = bitrate_history  # 码率历史 (最近60秒)
+        self.resolution = (0, 0)  # 分辨率 (宽, 高)
+        self.frame_rate = 0  # 帧率
+        self.codec = 'unknown'  # 视频编码
+        self.profile = 'unknown'  # 编码配置
+        self.bit_depth = 8  # 位深
+        self.color_space = 'unknown'  # 色彩空间
+        self.gop_size = 0  # GOP大小
+        self.last_gop_start = None  # 上一个GOP开始时间
+        self.buffer_health = 100  # 缓冲区健康度 (%)
+        self.packet_loss = 0  # 丢包率(%)，按视频包时间戳间隙估算
+        self.jitter = 0  # 到达抖动(ms)
+        self.gop_duration = 0  # GOP时长(秒，媒体时间)
+        self.last_frame_analysis = None  # 最后帧分析时间
+        self.decode_count = 0  # 解码次数
+        self.decode_cpu = 0.0  # 解码累计 CPU 时间 (秒)
+        self.brightness = None
+        self.contrast = None
+        self.black_ratio = None
+        self.black_frame = False
+        self.frame_diff = None
+        self.frozen_frame = False
+        self.blockiness = None
+
+
+class RingColumn:
+    """
+    一个指标的列式环形缓冲：所有流共用一个 (行数, 容量) 的二维数组，每个流占一行
+    维护最近 window 个样本的和与平方和，滚动均值/方差为 O(1)
+    """
+
+    def __init__(self, rows: int, size: int, window: int, dtype=np.float64):
+        self.size = size
+        self.window = min(window, size)
+        self.values = np.zeros((rows, size), dtype=dtype)
+        self.head = np.zeros(rows, dtype=np.int32)  # 下一个写入位置
+        self.count = np.zeros(rows, dtype=np.int32)
+        self.total = np.zeros(rows, dtype=np.float64)  # 全部样本之和
+        self.win_sum = np.zeros(rows, dtype=np.float64)  # 最近 window 个样本之和
+        self.win_sq = np.zeros(rows, dtype=np.float64)  # 最近 window 个样本平方和
+
+    def grow(self, rows: int):
+        for name in ('values', 'head', 'count', 'total', 'win_sum', 'win_sq'):
+            old = getattr(self, name)
+            new = np.zeros((rows,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def clear(self, row: int):
+        self.values[row] = 0
+        self.head[row] = self.count[row] = 0
+        self.total[row] = self.win_sum[row] = self.win_sq[row] = 0
+
+    def push(self, row: int, value: float):
+        size = self.size
+        head = int(self.head[row])
+        count = int(self.count[row])
+        values = self.values[row]
+        if count == size:
+            self.total[row] -= values[head]
+        else:
+            count += 1
+            self.count[row] = count
+        if count > self.window:
+            leaving = float(values[(head - self.window) % size])
+            self.win_sum[row] -= leaving
+            self.win_sq[row] -= leaving * leaving
+        values[head] = value
+        self.total[row] += value
+        self.win_sum[row] += value
+        self.win_sq[row] += value * value
+        head = (head + 1) % size
+        self.head[row] = head
+        if head == 0:
+            # 每绕一圈精确重算一次，消除累积误差
+            self._recompute(row)
+
+    def _recompute(self, row: int):
+        values = self.ordered(row)
+        self.total[row] = values.sum()
+        recent = values[-self.window:]
+        self.win_sum[row] = recent.sum()
+        self.win_sq[row] = np.square(recent).sum()
+
+    def ordered(self, row: int) -> np.ndarray:
+        """
+        按写入顺序返回该行样本（拷贝）
+        """
+        count = int(self.count[row])
+        head = int(self.head[row])
+        values = self.values[row]
+        if count < self.size:
+            return values[:count].copy()
+        return np.concatenate((values[head:], values[:head]))
+
+    def mean(self, row: int) -> float:
+        count = int(self.count[row])
+        return float(self.total[row]) / count if count else 0.0
+
+    def window_stats(self, row: int):
+        """
+        最近 window 个样本的 (均值, 总体标准差)
+        """
+        n = min(int(self.count[row]), self.window)
+        if not n:
+            return 0.0, 0.0
+        mean = float(self.win_sum[row]) / n
+        variance = max(0.0, float(self.win_sq[row]) / n - mean * mean)
+        return mean, math.sqrt(variance)
+
+
+class RingView:
+    """
+    单个流在列中的环形缓冲视图，兼容原 deque 的 append / len / 迭代
+    """
+    __slots__ = ('store', 'column', 'row', 'labels')
+
+    def __init__(self, store, column: RingColumn, row: int, labels: tuple = None):
+        self.store = store
+        self.column = column
+        self.row = row
+        self.labels = labels
+
+    def append(self, value):
+        if self.labels is not None:
+            value = QUALITY_CODES.get(value, 0)
+        with self.store.lock:
+            self.column.push(self.row, value)
+
+    def __len__(self):
+        return int(self.column.count[self.row])
+
+    def __iter__(self):
+        with self.store.lock:
+            values = self.column.ordered(self.row)
+        if self.labels is not None:
+            return iter([self.labels[int(code)] for code in values])
+        return iter(values.tolist())
+
+    def mean(self) -> float:
+        return self.column.mean(self.row)
+
+    def window_stats(self):
+        return self.column.window_stats(self.row)
+
+
+class MetricsStore:
+    """
+    进程内所有流共享的列式指标存储：码率历史(60 个样本，最近 10 个滚动统计)、质量历史(100 个，int8)
+    按行分配给流，容量不足时成倍扩容，流对象回收时释放行
+    """
+
+    def __init__(self, capacity: int = 256, bitrate_size: int = 60, bitrate_window: int = 10,
+                 quality_size: int = 100):
+        self.lock = threading.Lock()
+        self.capacity = capacity
+        self.bitrate = RingColumn(capacity, bitrate_size, bitrate_window)
+        self.quality = RingColumn(capacity, quality_size, quality_size, dtype=np.int8)
+        self._free = list(range(capacity - 1, -1, -1))
+        self.active = np.zeros(capacity, dtype=bool)
+
+    def allocate(self, owner=None) -> int:
+        """
+        分配一行；传入 owner 时在其被回收后自动释放
+        """
+        with self.lock:
+            if not self._free:
+                capacity = self.capacity * 2
+                self.bitrate.grow(capacity)
+                self.quality.grow(capacity)
+                active = np.zeros(capacity, dtype=bool)
+                active[:self.capacity] = self.active
+                self.active = active
+                self._free = list(range(capacity - 1, self.capacity - 1, -1))
+                self.capacity = capacity
+            row = self._free.pop()
+            self.bitrate.clear(row)
+            self.quality.clear(row)
+            self.active[row] = True
+        if owner is not None:
+            weakref.finalize(owner, self.release, row)
+        return row
+
+    def release(self, row: int):
+        with self.lock:
+            if self.active[row]:
+                self.active[row] = False
+                self._free.append(row)
+
+    def bitrate_history(self, row: int) -> RingView:
+        return RingView(self, self.bitrate, row)
+
+    def quality_history(self, row: int) -> RingView:
+        return RingView(self, self.quality, row, QUALITY_LEVELS)
+
+    def nbytes(self) -> int:
+        """
+        列式存储占用的数组字节数
+        """
+        columns = (self.bitrate, self.quality)
+        return self.active.nbytes + sum(getattr(column, name).nbytes for column in columns
+                                        for name in ('values', 'head', 'count', 'total', 'win_sum', 'win_sq'))
+
+
+# 存储单例（进程内所有流共享）
+_store_instance: Optional[MetricsStore] = None
+_store_lock = threading.Lock()
+
+
+def get_metrics_store() -> MetricsStore:
+    """获取进程共享的指标存储（单例模式）"""
+    global _store_instance
+
+    with _store_lock:
+        if _store_instance is None:
+            _store_instance = MetricsStore()
+
+    return _store_instance
@@ -0,0 +1,136 @@
+import threading
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from config.ConfigLoader import get_config
+from config.log4py import logger
+
+# 按协议自动选择的 profile
+PROFILE_FILE = 'file'
+PROFILE_HTTP = 'http'
+PROFILE_HLS = 'hls'
+PROFILE_RTMP = 'rtmp'
+PROFILE_RTSP = 'rtsp'
+# 快速起播：最小化探测数据量与时长，叠加在协议 profile 之上
+PROFILE_FAST_START = 'fast_start'
+
+# 内置 profile，值为 FFmpeg 的 demuxer/协议选项
+DEFAULT_PROFILES = {
+    PROFILE_FILE: {},
+    PROFILE_HTTP: {},
+    PROFILE_HLS: {'live_start_index': '-1', 'http_persistent': '1'},
+    PROFILE_RTMP: {'rtmp_live': 'live', 'rtmp_buffer': '1000'},
+    PROFILE_RTSP: {'rtsp_transport': 'tcp'},
+    PROFILE_FAST_START: {'analyzeduration': '500000', 'probesize': '65536', 'fpsprobesize': '0'},
+}
+
+# 各协议的套接字读写超时选项（微秒），与 av.open 的 timeout（中断回调）一起生效
+TIMEOUT_OPTIONS = {
+    PROFILE_HTTP: 'rw_timeout',
+    PROFILE_HLS: 'rw_timeout',
+    PROFILE_RTMP: 'rw_timeout',
+    PROFILE_RTSP: 'timeout',
+}
+
+
+def protocol_profile(url: str) -> str:
+    """
+    按地址选择协议 profile
+    """
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower()
+    if scheme in ('rtmp', 'rtmps', 'rtmpt', 'rtmpe'):
+        return PROFILE_RTMP
+    if scheme in ('rtsp', 'rtsps'):
+        return PROFILE_RTSP
+    if scheme in ('http', 'https'):
+        return PROFILE_HLS if parsed.path.lower().endswith('.m3u8') else PROFILE_HTTP
+    return PROFILE_FILE
+
+
+class OpenSpec:
+    """
+    一个流解析后的 av.open 参数：常规打开与快速起播两套选项，以及 (打开超时, 读取超时)
+    """
+    __slots__ = ('profile', 'options', 'fast_options', 'fast_start', 'timeout')
+
+    def __init__(self, profile: str, options: Dict[str, str], fast_options: Dict[str, str], fast_start: bool,
+                 timeout: Tuple[float, float]):
+        self.profile = profile
+        self.options = options
+        self.fast_options = fast_options
+        self.fast_start = fast_start
+        self.timeout = timeout
+
+    def select(self, fast: bool = False) -> Dict[str, str]:
+        """
+        本次连接使用的选项：配置了快速起播或重连复用探测结果时使用快速选项
+        """
+        return self.fast_options if fast or self.fast_start else self.options
+
+
+class OpenProfiles:
+    """
+    av.open 选项 profile 集合：内置 profile ← open_options.profiles ← 流上的 open_options，加载时解析一次
+    """
+
+    def __init__(self, config: Dict = None):
+        config = config or {}
+        self.open_timeout = float(config.get('open_timeout', 10))
+        self.read_timeout = float(config.get('read_timeout', 10))
+        self.fast_start = bool(config.get('fast_start', False))
+        self.profiles = {name: dict(options) for name, options in DEFAULT_PROFILES.items()}
+        for name, options in (config.get('profiles') or {}).items():
+            self.profiles.setdefault(name, {}).update(options or {})
+
+    @staticmethod
+    def _strings(options: Dict) -> Dict[str, str]:
+        return {str(key): str(value) for key, value in options.items() if value is not None}
+
+    def resolve(self, url: str, profile: str = None, fast_start: bool = None, overrides: Dict = None) -> OpenSpec:
+        """
+        解析流的打开参数
+        :param profile: 指定 profile，默认按协议选择
+        :param fast_start: 首次连接即使用快速起播选项，默认取 open_options.fast_start
+        :param overrides: 流上的原始 FFmpeg 选项，优先级最高
+        """
+        protocol = protocol_profile(url)
+        if profile and profile not in self.profiles:
+            logger.warning(f"未知的打开选项 profile {profile}，使用 {protocol}")
+            profile = None
+        profile = profile or protocol
+
+        options = dict(self.profiles[profile])
+        timeout_option = TIMEOUT_OPTIONS.get(protocol)
+        if timeout_option and self.read_timeout > 0:
+            options.setdefault(timeout_option, int(self.read_timeout * 1000000))
+        fast_options = {**options, **self.profiles[PROFILE_FAST_START]}
+        if overrides:
+            options.update(overrides)
+            fast_options.update(overrides)
+
+        timeout = (self.open_timeout or None, self.read_timeout or None)
+        return OpenSpec(profile, self._strings(options), self._strings(fast_options),
+                        self.fast_start if fast_start is None else bool(fast_start), timeout)
+
+
+# profile 单例（进程内所有流共享）
+_profiles_instance: Optional[OpenProfiles] = None
+_profiles_lock = threading.Lock()
+
+
+def get_open_profiles() -> OpenProfiles:
+    """获取进程共享的打开选项 profile（单例模式），从全局配置的 open_options 段加载"""
+    global _profiles_instance
+
+    with _profiles_lock:
+        if _profiles_instance is None:
+            try:
+                options_config = get_config().get('open_options') or {}
+            except Exception as e:
+                logger.warning("加载打开选项失败，使用默认选项")
+                logger.error(e)
+                options_config = {}
+            _profiles_instance = OpenProfiles(options_config)
+
+    return _profiles_instance
@@ -0,0 +1,163 @@
+from collections import deque
+
+from monitor.LatencyEstimator import LatencyEstimator
+
+# 相邻包媒体时间差超过该秒数（或倒退）视为时间戳不连续（重连、换流），不计入抖动和丢包
+DISCONTINUITY_SECONDS = 10.0
+# 时间差超过帧间隔的该倍数判定为丢帧
+LOSS_FACTOR = 1.5
+
+
+class PacketTimeline:
+    """
+    基于包时间戳的测量 - 用 dts/pts、duration 与 time_base 计算帧率、GOP 帧数、媒体时间码率、到达抖动与丢包
+    到达时间由调用方每个包读取一次单调时钟传入，网络突发不会扭曲帧率与 GOP
+    """
+
+    def __init__(self, window: int = 30):
+        """
+        :param window: 帧率计算使用的最近视频包数
+        """
+        self._time_bases = {}  # 流 -> float(time_base)
+        self._video_times = deque(maxlen=window)  # 最近视频包的媒体时间(秒)
+        self.frame_rate = 0.0
+        self.frames_since_keyframe = 0
+        self.gop_size = 0  # 上一个完整 GOP 的帧数
+        self.gop_duration = 0.0  # 上一个完整 GOP 的媒体时长(秒)
+        self._keyframe_time = None
+        # 累计字节数（音视频），只由解复用线程递增；码率线程按差值取窗口字节数，不写回，窗口切换时不丢计数
+        self.byte_count = 0
+        self._window_bytes = 0  # 当前码率窗口开始时的 byte_count
+        self.media_end = None  # 已收到数据的最大媒体时间(秒)
+        self._window_start = None  # 当前码率窗口起点的媒体时间
+        self._window_arrival = None  # 当前码率窗口起点的到达时间
+        self._last_media = None
+        self._last_arrival = None
+        self.jitter = 0.0  # 到达抖动(秒)，RFC 3550 平滑
+        self.received = 0
+        self.lost = 0
+        self.latency = LatencyEstimator()  # 媒体时间与到达时间的漂移：落后直播边缘的延迟
+
+    def _seconds(self, packet, stream):
+        """
+        包的媒体时间与时长(秒)，无时间戳时返回 (None, 0)
+        """
+        timestamp = packet.dts
+        if timestamp is None:
+            timestamp = packet.pts
+            if timestamp is None:
+                return None, 0.0
+        time_base = self._time_bases.get(stream)
+        if time_base is None:
+            time_base = self._time_bases[stream] = float(stream.time_base or packet.time_base or 0)
+        return timestamp * time_base, (packet.duration or 0) * time_base
+
+    def _advance(self, media, duration):
+        end = media + duration
+        media_end = self.media_end
+        if media_end is None or abs(media - media_end) > DISCONTINUITY_SECONDS:
+            # 首个包或时间戳跳变，重新开始码率窗口
+            self.media_end = end
+            self._window_start = media
+        elif end > media_end:
+            self.media_end = end
+
+    def on_audio(self, packet, stream, now: float):
+        """
+        音频包：计入码率
+        """
+        media, duration = self._seconds(packet, stream)
+        self.on_audio_time(media, duration, packet.size, now)
+
+    def on_audio_time(self, media, duration: float, size: int, now: float):
+        """
+        已换算为秒的音频包（轻量 FLV 引擎直接从标签头得到时间戳）
+        """
+        self.byte_count += size
+        if self._window_arrival is None:
+            self._window_arrival = now
+        if media is not None:
+            self._advance(media, duration)
+
+    def on_video(self, packet, stream, now: float):
+        """
+        视频包：计入码率、帧率、GOP、抖动与丢包
+        """
+        media, duration = self._seconds(packet, stream)
+        self.on_video_time(media, duration, packet.size, packet.is_keyframe, now)
+
+    def on_video_time(self, media, duration: float, size: int, keyframe: bool, now: float):
+        """
+        已换算为秒的视频包，media 为 None 表示没有时间戳
+        """
+        self.byte_count += size
+        if self._window_arrival is None:
+            self._window_arrival = now
+        latency = self.latency
+        if media is None:
+            # 无时间戳时退化为到达时间，不估计延迟
+            media = now
+            latency = None
+        else:
+            self._advance(media, duration)
+
+        times = self._video_times
+        last = self._last_media
+        if last is not None:
+            delta = media - last
+            if delta < 0 or delta > DISCONTINUITY_SECONDS:
+                times.clear()
+                self._keyframe_time = None
+                if latency is not None:
+                    latency.reset()
+            else:
+                transit = (now - self._last_arrival) - delta
+                self.jitter += (abs(transit) - self.jitter) / 16
+                interval = duration if duration > 0 else (1.0 / self.frame_rate if self.frame_rate > 0 else 0)
+                if interval > 0 and delta > interval * LOSS_FACTOR:
+                    self.lost += int(round(delta / interval)) - 1
+        self._last_media = media
+        self._last_arrival = now
+        self.received += 1
+        if latency is not None:
+            latency.on_media(media, now)
+
+        times.append(media)
+        if len(times) > 1:
+            span = times[-1] - times[0]
+            if span > 0:
+                self.frame_rate = (len(times) - 1) / span
+
+        if keyframe:
+            if self._keyframe_time is not None:
+                self.gop_size = self.frames_since_keyframe
+                self.gop_duration = media - self._keyframe_time
+            self._keyframe_time = media
+            self.frames_since_keyframe = 0
+        self.frames_since_keyframe += 1
+
+    def take_bitrate(self, now: float) -> float:
+        """
+        结束当前码率窗口，返回窗口内的码率(bps)：字节数 / 窗口内推进的媒体时间，无时间戳时按到达时间
+        """
+        total = self.byte_count
+        byte_count = total - self._window_bytes
+        bitrate = 0.0
+        if byte_count:
+            span = self.media_end - self._window_start if self._window_start is not None else 0
+            if span <= 0 and self._window_arrival is not None:
+                span = now - self._window_arrival
+            if span > 0:
+                bitrate = byte_count * 8 / span
+        self._window_bytes = total
+        self._window_start = self.media_end
+        self._window_arrival = now
+        return bitrate
+
+    @property
+    def packet_loss(self) -> float:
+        """
+        估算丢包率(%)
+        """
+        total = self.received + self.lost
+        return self.lost * 100.0 / total if total else 0.0
@@ -0,0 +1,138 @@
+import time
+from collections import deque
+
+import numpy as np
+
+# dHash 采样网格：8 行 x 9 列，每格取 4x4 个像素求均值
+HASH_ROWS = 8
+HASH_COLS = 9
+CELL = 4
+
+
+def _grid(luma: np.ndarray) -> np.ndarray:
+    """
+    从亮度平面按等距索引取 32x36 个像素（不缩放整帧），返回 float32 数组
+    """
+    height, width = luma.shape
+    rows = np.linspace(0, height - 1, HASH_ROWS * CELL).astype(np.intp)
+    cols = np.linspace(0, width - 1, HASH_COLS * CELL).astype(np.intp)
+    return luma[np.ix_(rows, cols)].astype(np.float32)
+
+
+def dhash64(grid: np.ndarray) -> int:
+    """
+    64 位差值哈希：8x9 缩略图中每行相邻像素的大小关系
+    """
+    small = grid.reshape(HASH_ROWS, CELL, HASH_COLS, CELL).mean(axis=(1, 3))
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count('1')
+
+
+class CpuBudget:
+    """
+    单流 CPU 预算（令牌桶）：每秒积累 fraction 秒的 CPU 时间，最多积累 burst 秒
+    """
+
+    def __init__(self, fraction: float = 0.005, burst: float = 0.05):
+        self.fraction = fraction
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.skipped = 0  # 因预算不足跳过的次数
+
+    def available(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.fraction)
+        self.updated = now
+        if self.tokens > 0:
+            return True
+        self.skipped += 1
+        return False
+
+    def charge(self, cpu_seconds: float):
+        self.tokens -= cpu_seconds
+
+
+class PictureDetector:
+    """
+    画面静止/黑屏检测 - 每个采样关键帧计算一次 dHash，保存在小环形缓冲中
+    """
+
+    def __init__(self, frozen_seconds: float = 10, black_seconds: float = 5, black_threshold: int = 20,
+                 black_ratio: float = 0.98, hash_distance: int = 2, brightness_delta: float = 2.0,
+                 ring_size: int = 32):
+        """
+        :param frozen_seconds: 画面持续静止超过该秒数告警
+        :param black_seconds: 持续黑屏超过该秒数告警
+        :param black_threshold: 低于该亮度视为黑色像素
+        :param black_ratio: 黑色像素占比超过该值视为黑屏帧
+        :param hash_distance: 与静止起点的哈希汉明距离不超过该值视为同一画面
+        :param brightness_delta: 与静止起点的平均亮度差不超过该值视为同一画面（dHash 对整体亮度变化不敏感）
+        :param ring_size: 哈希环形缓冲大小
+        """
+        self.frozen_seconds = frozen_seconds
+        self.black_seconds = black_seconds
+        self.black_threshold = black_threshold
+        self.black_ratio = black_ratio
+        self.hash_distance = hash_distance
+        self.brightness_delta = brightness_delta
+        self.ring = deque(maxlen=ring_size)  # (时间, 哈希, 平均亮度)
+        self.frozen_since = None
+        self.black_since = None
+        self._anchor = None  # 当前静止区间起点的 (哈希, 平均亮度)
+        self._anchor_time = None
+
+    def reset(self):
+        """
+        重连后的新会话：清除静止/黑屏状态，断开期间不计入持续时间
+        """
+        self.ring.clear()
+        self.frozen_since = None
+        self.black_since = None
+        self._anchor = None
+        self._anchor_time = None
+
+    def feed(self, luma: np.ndarray, now: float = None):
+        """
+        输入一帧亮度平面
+        """
+        now = time.time() if now is None else now
+        grid = _grid(luma)
+        brightness = float(grid.mean())
+        black = np.count_nonzero(grid < self.black_threshold) >= grid.size * self.black_ratio
+        frame_hash = dhash64(grid)
+        self.ring.append((now, frame_hash, brightness))
+
+        if black:
+            if self.black_since is None:
+                self.black_since = now
+        else:
+            self.black_since = None
+
+        anchor = self._anchor
+        if (anchor is not None and hamming(anchor[0], frame_hash) <= self.hash_distance
+                and abs(anchor[1] - brightness) <= self.brightness_delta):
+            if self.frozen_since is None:
+                self.frozen_since = self._anchor_time
+        else:
+            self._anchor = (frame_hash, brightness)
+            self._anchor_time = now
+            self.frozen_since = None
+
+    def status(self, now: float = None) -> dict:
+        """
+        当前静止/黑屏持续时间(秒)，未发生为 0；黑屏优先，黑屏期间不重复报告静止
+        """
+        now = time.time() if now is None else now
+        black = now - self.black_since if self.black_since is not None else 0
+        frozen = now - self.frozen_since if self.frozen_since is not None and not black else 0
+        return {
+            'black_seconds': black,
+            'frozen_seconds': frozen,
+            'black': black >= self.black_seconds,
+            'frozen': frozen >= self.frozen_seconds
+        }
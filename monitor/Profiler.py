@@ -0,0 +1,171 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List
+
+from config.log4py import logger
+
+# 分阶段计时：packet 包含 decode/frame_quality/picture，report 包含 webhook，audio 为音频采样窗口的解码与分析
+PHASE_DEMUX = 'demux'  # demux() 取下一个包，含等待网络数据
+PHASE_PACKET = 'packet'  # 单个视频包的统计与采样分析
+PHASE_DECODE = 'decode'
+PHASE_FRAME_QUALITY = 'frame_quality'
+PHASE_PICTURE = 'picture'
+PHASE_AUDIO = 'audio'
+PHASE_BITRATE = 'bitrate'
+PHASE_HEALTH = 'health'
+PHASE_REPORT = 'report'
+PHASE_WEBHOOK = 'webhook'
+PHASES = (PHASE_DEMUX, PHASE_PACKET, PHASE_DECODE, PHASE_FRAME_QUALITY, PHASE_PICTURE, PHASE_AUDIO, PHASE_BITRATE,
+          PHASE_HEALTH, PHASE_REPORT, PHASE_WEBHOOK)
+# 额外统计线程 CPU 时间的阶段；逐包阶段只计墙钟时间，thread_time_ns 开销约为 perf_counter_ns 的数倍
+CPU_PHASES = frozenset((PHASE_DECODE, PHASE_FRAME_QUALITY, PHASE_PICTURE, PHASE_AUDIO, PHASE_BITRATE, PHASE_HEALTH,
+                        PHASE_REPORT, PHASE_WEBHOOK))
+
+_INDEX = {phase: i for i, phase in enumerate(PHASES)}
+
+
+class PhaseTimers:
+    """
+    单个流的分阶段累计计时（纳秒）与调用次数
+    开启时在 StreamMonitor 实例上用 wrap() 包装对应方法；未开启时不包装，热路径没有任何额外开销
+    """
+    __slots__ = ('wall_ns', 'cpu_ns', 'calls')
+
+    def __init__(self):
+        self.wall_ns = [0] * len(PHASES)
+        self.cpu_ns = [0] * len(PHASES)
+        self.calls = [0] * len(PHASES)
+
+    def wrap(self, phase: str, func: Callable) -> Callable:
+        """
+        返回计时版本的 func；同一阶段只在一个线程中执行，计数不加锁
+        """
+        index = _INDEX[phase]
+        wall_ns = self.wall_ns
+        cpu_ns = self.cpu_ns
+        calls = self.calls
+        clock = time.perf_counter_ns
+
+        if phase not in CPU_PHASES:
+            def timed(*args, **kwargs):
+                start = clock()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    wall_ns[index] += clock() - start
+                    calls[index] += 1
+            return timed
+
+        cpu_clock = time.thread_time_ns
+
+        def timed_cpu(*args, **kwargs):
+            start = clock()
+            cpu_start = cpu_clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                cpu_ns[index] += cpu_clock() - cpu_start
+                wall_ns[index] += clock() - start
+                calls[index] += 1
+        return timed_cpu
+
+    def wrap_iter(self, phase: str, iterable: Iterable):
+        """
+        计时版本的迭代器：统计每次取下一个元素的耗时
+        """
+        index = _INDEX[phase]
+        wall_ns = self.wall_ns
+        calls = self.calls
+        clock = time.perf_counter_ns
+        iterator = iter(iterable)
+        while True:
+            start = clock()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                wall_ns[index] += clock() - start
+                return
+            wall_ns[index] += clock() - start
+            calls[index] += 1
+            yield item
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        {阶段: {calls, wall_ns, cpu_ns}}，cpu_ns 只对 CPU_PHASES 有意义
+        """
+        return {phase: {'calls': self.calls[i], 'wall_ns': self.wall_ns[i],
+                        'cpu_ns': self.cpu_ns[i] if phase in CPU_PHASES else None}
+                for i, phase in enumerate(PHASES)}
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def sample_stacks(threads: Callable[[], List[threading.Thread]], seconds: float = 10,
+                  interval: float = 0.005) -> Counter:
+    """
+    定时采样指定线程的 Python 调用栈，返回 {折叠栈: 次数}
+    :param threads: 返回当前要采样的线程，每次采样重新获取（重连后线程会更换）
+    """
+    stacks = Counter()
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        frames = sys._current_frames()
+        for thread in threads():
+            frame = frames.get(thread.ident)
+            if frame is None:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(thread.name.split('-', 1)[0])
+            stacks[';'.join(reversed(labels))] += 1
+        del frames
+        time.sleep(interval)
+    return stacks
+
+
+def write_folded(stacks: Counter, path: str):
+    """
+    以折叠栈格式写出（每行 "帧;帧;帧 次数"），可直接用 flamegraph.pl / speedscope 生成火焰图
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        for stack, count in sorted(stacks.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def start_profile(name: str, threads: Callable[[], List[threading.Thread]], path: str, seconds: float = 10,
+                  interval: float = 0.005) -> threading.Thread:
+    """
+    后台采样 seconds 秒后写出折叠栈文件
+    """
+
+    def run():
+        try:
+            stacks = sample_stacks(threads, seconds, interval)
+            write_folded(stacks, path)
+            logger.info(f"采样分析已写出: {name} {sum(stacks.values())} 个样本 -> {path}")
+        except Exception as e:
+            logger.error(f"采样分析失败: {name}")
+            logger.error(e)
+
+    thread = threading.Thread(target=run, name=f"profiler-{name}", daemon=True)
+    thread.start()
+    return thread
+
+
+def profile_path(directory: str, stream_id: str) -> str:
+    """
+    默认的折叠栈文件路径
+    """
+    safe_id = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in str(stream_id))
+    return os.path.abspath(os.path.join(directory or '.', f"profile-{safe_id}-{time.strftime('%Y%m%d-%H%M%S')}.folded"))
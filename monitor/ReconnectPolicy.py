@@ -0,0 +1,97 @@
+import random
+import threading
+from typing import Optional
+
+from config.log4py import logger
+
+# 熔断器状态
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ReconnectPolicy:
+    """
+    单个流的重连策略 - 指数退避 + 抖动，连续失败达到阈值后熔断一段时间，熔断结束后放行一次试探连接
+    连接成功且持续超过 stable_seconds 才视为恢复；很快又断开的会话按失败处理
+    """
+
+    def __init__(self, base_delay: float = 1, max_delay: float = 60, multiplier: float = 2,
+                 stable_seconds: float = 30, failure_threshold: int = 5, open_seconds: float = 60,
+                 rng: random.Random = None):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.stable_seconds = stable_seconds
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.rng = rng or random.Random()
+        self.state = CLOSED
+        self.failures = 0  # 连续失败次数
+        self.stats = {'attempts': 0, 'failures': 0, 'opened': 0}
+
+    def _jitter(self, delay: float) -> float:
+        # 等抖动：保留一半延迟，另一半随机，错开同时断开的流
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def next_delay(self) -> float:
+        """
+        下一次连接前应等待的秒数，首次连接与恢复后为 0
+        """
+        self.stats['attempts'] += 1
+        if self.state == OPEN:
+            self.state = HALF_OPEN
+            return self._jitter(self.open_seconds)
+        if not self.failures:
+            return 0.0
+        return self._jitter(min(self.max_delay, self.base_delay * self.multiplier ** (self.failures - 1)))
+
+    def record(self, connected: bool, duration: float = 0.0):
+        """
+        记录一次连接的结果
+        :param connected: 是否连接成功
+        :param duration: 连接成功后会话持续的秒数
+        """
+        if connected and duration >= self.stable_seconds:
+            self.failures = 0
+            self.state = CLOSED
+            return
+        self.failures += 1
+        self.stats['failures'] += 1
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.state = OPEN
+            self.stats['opened'] += 1
+
+
+class OpenLimiter:
+    """
+    进程内同时进行的 av.open 数量上限，CDN 抖动后大量流同时重连时排队执行
+    """
+
+    def __init__(self, limit: int = 8):
+        self.limit = limit
+        self._semaphore = threading.BoundedSemaphore(limit)
+
+    def acquire(self, timeout: float = None) -> bool:
+        return self._semaphore.acquire(timeout=timeout)
+
+    def release(self):
+        self._semaphore.release()
+
+
+# 限流器单例（进程内所有流共享）
+_limiter_instance: Optional[OpenLimiter] = None
+_limiter_lock = threading.Lock()
+
+
+def get_open_limiter(limit: int = None) -> OpenLimiter:
+    """获取进程共享的 av.open 并发限制（单例模式），limit 只在首次创建时生效"""
+    global _limiter_instance
+
+    with _limiter_lock:
+        if _limiter_instance is None:
+            _limiter_instance = OpenLimiter(limit or 8)
+        elif limit and limit != _limiter_instance.limit:
+            logger.warning(f"av.open 并发上限已为 {_limiter_instance.limit}，忽略 {limit}")
+
+    return _limiter_instance
@@ -0,0 +1,128 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Optional
+
+from config.log4py import logger
+
+
+class StallDeadline:
+    """
+    单个流的截止时间，packet_loop 每收到数据包调用 feed() 顺延
+    """
+    __slots__ = ('name', 'timeout', 'deadline', 'on_stall', 'active')
+
+    def __init__(self, name, timeout, on_stall):
+        self.name = name
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        self.on_stall = on_stall
+        self.active = True
+
+    def feed(self, now: float = None):
+        """
+        顺延截止时间，只做一次属性赋值，不加锁、不唤醒看门狗
+        """
+        self.deadline = (time.monotonic() if now is None else now) + self.timeout
+
+
+class StallWatchdog:
+    """
+    共享看门狗 - 一个线程监视所有流的截止时间，超时未顺延则触发回调
+
+    看门狗只在堆顶条目到期时被唤醒；若该条目期间已被顺延，则按新的截止时间重新入堆，
+    因此数据正常流动时每个流每个超时周期最多唤醒一次，空闲 CPU 近似为零。
+    """
+
+    def __init__(self, name: str = "stall-watchdog"):
+        self.name = name
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self.wakeups = 0  # 处理到期条目的次数
+        self.fired = 0  # 触发卡顿回调的次数
+
+    def register(self, name: str, timeout: float, on_stall) -> StallDeadline:
+        """
+        注册流截止时间
+        :param name: 流标识，用于日志
+        :param timeout: 卡顿超时(秒)
+        :param on_stall: 超时回调，在看门狗线程中执行
+        """
+        entry = StallDeadline(name, timeout, on_stall)
+        with self._cond:
+            self._ensure_thread()
+            heapq.heappush(self._heap, (entry.deadline, next(self._seq), entry))
+            if self._heap[0][2] is entry:
+                self._cond.notify()
+        return entry
+
+    def unregister(self, entry: Optional[StallDeadline]):
+        """
+        注销截止时间，堆中的条目在出堆时惰性丢弃
+        """
+        if entry is not None:
+            entry.active = False
+
+    def watching(self) -> int:
+        """
+        当前监视的流数量
+        """
+        with self._cond:
+            return sum(1 for _, _, entry in self._heap if entry.active)
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        """
+        看门狗主循环
+        """
+        while True:
+            with self._cond:
+                if not self._heap:
+                    self._cond.wait()
+                    continue
+                check_at, _, entry = self._heap[0]
+                now = time.monotonic()
+                if check_at > now:
+                    self._cond.wait(check_at - now)
+                    continue
+                heapq.heappop(self._heap)
+                if not entry.active:
+                    continue
+                self.wakeups += 1
+                if entry.deadline > now:
+                    # 期间已被顺延，按新的截止时间重新入堆
+                    heapq.heappush(self._heap, (entry.deadline, next(self._seq), entry))
+                    continue
+                entry.active = False
+                self.fired += 1
+
+            logger.warning(f"流 {entry.name} 超过 {entry.timeout} 秒无数据，判定为卡顿")
+            try:
+                entry.on_stall()
+            except Exception as e:
+                logger.error(f"卡顿回调执行错误: {entry.name}")
+                logger.error(f"卡顿回调执行错误: {e}")
+
+
+# 看门狗单例
+_watchdog_instance: Optional[StallWatchdog] = None
+_watchdog_lock = threading.Lock()
+
+
+def get_watchdog() -> StallWatchdog:
+    """获取进程共享的看门狗（单例模式）"""
+    global _watchdog_instance
+
+    if _watchdog_instance is None:
+        with _watchdog_lock:
+            if _watchdog_instance is None:
+                _watchdog_instance = StallWatchdog()
+
+    return _watchdog_instance
@@ -1,15 +1,50 @@
-import ctypes
+import io
 import logging
 import threading
 import time
-from collections import deque
 from datetime import datetime
 
 import av
-import numpy as np
 
-from config.WebhookSender import WebhookSender
-from config.log4py import logger
+from config.WebhookSender import get_webhook_sender
+from config.log4py import logger, metrics_logger, status_sampler
+from monitor.AudioAnalyzer import AudioAnalyzer, planar_float
+from monitor.FlvReader import (PACKET_CODED_FRAMES, TAG_AUDIO, TAG_VIDEO, VIDEO_CODECS, FlvTagParser, HttpFlvSource,
+                               parse_script, sequence_header_profile)
+from monitor.FrameAnalyzer import FrameAnalyzer, luma_plane, parse_thumbnail
+from monitor.HlsPlaylist import HlsSession, HlsStats
+from monitor.HealthRules import get_rule_book
+from monitor.LatencyEstimator import KEYFRAME_PEEK, SOURCE_SCRIPT, SOURCE_SEI, script_wallclock, sei_wallclock
+from monitor.MetricsStore import DeepStats, PacketStats, get_metrics_store
+from monitor.OpenOptions import PROFILE_HLS, PROFILE_HTTP, get_open_profiles, protocol_profile
+from monitor.PacketTimeline import PacketTimeline
+from monitor.PictureDetector import CpuBudget, PictureDetector
+from monitor.Profiler import (PHASE_AUDIO, PHASE_BITRATE, PHASE_DECODE, PHASE_DEMUX, PHASE_FRAME_QUALITY,
+                              PHASE_HEALTH, PHASE_PACKET, PHASE_PICTURE, PHASE_REPORT, PHASE_WEBHOOK, PhaseTimers)
+from monitor.ReconnectPolicy import get_open_limiter
+from monitor.StallWatchdog import get_watchdog
+
+# 帧质量采样方式：keyframe 只解码关键帧；any 解码到期后的任意视频包（旧行为）
+QUALITY_SAMPLING_KEYFRAME = 'keyframe'
+QUALITY_SAMPLING_ANY = 'any'
+
+# 监控引擎：av 用 FFmpeg 解复用并采样解码；light 只解析 HTTP-FLV 标签头，不解码（无帧质量与画面检测）；
+# hls 条件轮询播放列表，只在采样到期时下载并解复用一个分片（light 遇到 .m3u8 地址时自动使用）
+ENGINE_AV = 'av'
+ENGINE_LIGHT = 'light'
+ENGINE_HLS = 'hls'
+
+# 等待 av.open 并发名额的最长秒数
+OPEN_QUEUE_TIMEOUT = 30
+# 停止时等待会话线程退出的额外秒数（在读取超时之外）
+STOP_GRACE_SECONDS = 1.0
+# 解复用循环的包计数在本地累计，每 BATCH_PACKETS 个包或 BATCH_SECONDS 秒批量发布一次
+BATCH_PACKETS = 64
+BATCH_SECONDS = 0.1
+
+# 指标快照包含的 deep_stats 字段（码率历史、内部时间戳除外，分辨率拆为 width/height）
+SNAPSHOT_DEEP_STATS = tuple(key for key in DeepStats.__slots__
+                            if key not in ('bitrate_history', 'resolution', 'last_gop_start', 'last_frame_analysis'))
 
 
 class StreamMonitor:
@@ -17,94 +52,204 @@ class StreamMonitor:
     视频流监控类 - 增强版（支持码率、分辨率等深度分析）
     """
 
-    def __init__(self, stream_id, stream_name, stream_url, check_interval=5):
+    def __init__(self, stream_id, stream_name, stream_url, check_interval=5, stall_timeout=10,
+                 quality_sampling=QUALITY_SAMPLING_KEYFRAME, frame_stride=4, frame_thumbnail=None,
+                 picture_detection=None, webhook_sender=None, health_check=True, health_group=None,
+                 health_rules=None, fast_probe=True, open_profile=None, fast_start=None, open_options=None,
+                 profiling=False, engine=ENGINE_AV, hls_sample_interval=30, batch_packets=BATCH_PACKETS,
+                 batch_seconds=BATCH_SECONDS, encoder_clock=True, audio_analysis=None):
         self.stream_id = stream_id
         self.stream_name = stream_name
         self.stream_url = stream_url
         self.check_interval = check_interval
+        self.stall_timeout = stall_timeout  # 超过该秒数无数据判定为卡顿
+        self.quality_sampling = quality_sampling  # 帧质量采样方式 keyframe|any
+        self._decoder = None  # keyframe 模式下的常驻解码器
+        self._decoder_key = None
+        self.frame_analyzer = FrameAnalyzer(stride=frame_stride, thumbnail=parse_thumbnail(frame_thumbnail))
+        protocol = protocol_profile(stream_url)
+        if engine == ENGINE_LIGHT and protocol == PROFILE_HLS:
+            engine = ENGINE_HLS
+        if engine in (ENGINE_LIGHT, ENGINE_HLS) and protocol not in (PROFILE_HTTP, PROFILE_HLS):
+            logger.warning(f"{engine} 引擎只支持 HTTP 地址，使用 av 引擎: {stream_id} {stream_name} {stream_url}")
+            engine = ENGINE_AV
+        self.engine = engine  # 监控引擎 av|light|hls，连接后发现响应格式不符时切换为 av
+        # hls 引擎：播放列表统计，与两次分片采样（下载 + 解复用）的最短间隔
+        self.hls_stats = HlsStats() if engine == ENGINE_HLS else None
+        self.hls_sample_interval = hls_sample_interval
+        self._last_segment_sample = None
+        self._keyframe_segments = False  # 采样分片是否以关键帧开始
+        # 从关键帧 SEI 与 FLV 脚本标签读取编码器墙上时间，用于端到端延迟
+        self.encoder_clock = encoder_clock
+
+        # 画面静止/黑屏检测，picture_detection 为 monitoring.picture_detection 配置
+        picture_detection = picture_detection or {}
+        self.picture_detector = None
+        self.picture_budget = None
+        if picture_detection.get('enabled', True):
+            self.picture_detector = PictureDetector(
+                frozen_seconds=picture_detection.get('frozen_seconds', 10),
+                black_seconds=picture_detection.get('black_seconds', 5)
+            )
+            self.picture_budget = CpuBudget(fraction=picture_detection.get('cpu_budget', 0.005))
+
+        # 音频静音/削波检测，audio_analysis 为 monitoring.audio_analysis 配置；light 引擎不解码音频
+        audio_analysis = audio_analysis or {}
+        self.audio_analyzer = None
+        self.audio_budget = None
+        if audio_analysis.get('enabled', True):
+            self.audio_analyzer = AudioAnalyzer(
+                window=audio_analysis.get('window_seconds', 1.0),
+                interval=audio_analysis.get('interval', 5),
+                silence_seconds=audio_analysis.get('silence_seconds', 10),
+                silence_dbfs=audio_analysis.get('silence_dbfs', -60),
+                clip_dbfs=audio_analysis.get('clip_dbfs', -0.5),
+                clip_ratio=audio_analysis.get('clip_ratio', 0.001)
+            )
+            self.audio_budget = CpuBudget(fraction=audio_analysis.get('cpu_budget', 0.003))
+
         self.container = None
         self.running = False
-        self.webhook_sender = WebhookSender()
-        self.heart_beat_time = None
-
-        # 基础监控状态
-        self.stats = {
-            'total_packets': 0,
-            'video_packets': 0,
-            'audio_packets': 0,
-            'keyframes': 0,
-            'start_time': None,
-            'last_packet_time': None,
-            'last_keyframe_time': None
-        }
-
-        # 深度分析状态
-        self.deep_stats = {
-            'current_bitrate': 0,  # 当前码率 (bps)
-            'average_bitrate': 0,  # 平均码率
-            'bitrate_history': deque(maxlen=60),  # 码率历史 (最近60秒)
-            'resolution': (0, 0),  # 分辨率 (宽, 高)
-            'frame_rate': 0,  # 帧率
-            'codec': 'unknown',  # 视频编码
-            'profile': 'unknown',  # 编码配置
-            'bit_depth': 8,  # 位深
-            'color_space': 'unknown',  # 色彩空间
-            'gop_size': 0,  # GOP大小
-            'last_gop_start': None,  # 上一个GOP开始时间
-            'buffer_health': 100,  # 缓冲区健康度 (%)
-            'packet_loss': 0,  # 丢包率
-            'jitter': 0,  # 抖动
-            'last_frame_analysis': None  # 最后帧分析时间
-        }
+        self.fast_probe = fast_probe  # 重连时使用缓存的流信息并缩短探测
+        self._probe_info = None  # 上次完整探测得到的编码、配置与分辨率
+        # av.open 选项：协议 profile ← 指定 profile ← 单流 open_options，加载时解析一次
+        self.open_spec = get_open_profiles().resolve(stream_url, open_profile, fast_start, open_options)
+        # 最近一次连接的起播耗时(秒)：av.open、首包、首个关键帧（从开始连接计）
+        self.startup = {'profile': self.open_spec.profile, 'fast': False, 'open': None, 'first_packet': None,
+                        'first_keyframe': None}
+        self._connect_started = time.monotonic()
+        self.webhook_sender = webhook_sender or get_webhook_sender()  # 进程共享，由 MonitorManager 注入
+        self.watchdog = get_watchdog()
+        self._stall_deadline = None
+        self._stopped = threading.Event()
+        self.session_threads = []  # 本次会话的线程，供采样分析
+        self.check_count = 0
+        self.health_check = health_check  # 为 False 时由 MonitorManager 批量评估健康状况
+        # 健康规则：默认 ← 分组(health_group) ← 单流覆盖(health_rules)，加载时编译一次
+        self.health_rules = get_rule_book().resolve(health_group, health_rules)
+
+        # 监控状态为 __slots__ 记录（兼容 dict 下标访问），码率与质量历史存放在进程共享的列式环形缓冲中
+        self.metrics_store = get_metrics_store()
+        self._metrics_row = self.metrics_store.allocate(owner=self)
+        self.stats = PacketStats()
+        # 解复用线程更新 stats 后整体发布的不可变快照，读者只做一次属性读取，不加锁；批量大小与最长发布间隔(秒)
+        self._stats_view = tuple(self.stats.items())
+        self.batch_packets = max(1, batch_packets)
+        self.batch_seconds = batch_seconds
+        self.deep_stats = DeepStats(self.metrics_store.bitrate_history(self._metrics_row))
 
         # 质量评估历史
-        self.quality_history = deque(maxlen=100)
+        self.quality_history = self.metrics_store.quality_history(self._metrics_row)
+
+        # 基于包时间戳的帧率、GOP、码率、抖动、丢包测量
+        self.timeline = PacketTimeline()
+        # 单调时钟到墙上时间的偏移，每个包只读一次单调时钟
+        self._clock_offset = time.time() - time.monotonic()
+
+        # 分阶段计时：开启时在实例上包装各阶段方法，未开启时热路径保持原样
+        self.timers = None
+        if profiling:
+            self._instrument(PhaseTimers())
 
-        # 帧分析相关
-        self.frame_buffer = deque(maxlen=30)  # 保存最近30帧的时间戳用于帧率计算
-        self.byte_count = 0  # 字节计数器（用于码率计算）
-        self.last_byte_count_time = time.time()
+    def _instrument(self, timers):
+        """
+        用计时版本替换各阶段方法（实例属性覆盖类方法）
+        """
+        self.timers = timers
+        self._analyze_video_packet = timers.wrap(PHASE_PACKET, self._analyze_video_packet)
+        self._on_video_tag = timers.wrap(PHASE_PACKET, self._on_video_tag)
+        self._decode_keyframe = timers.wrap(PHASE_DECODE, self._decode_keyframe)
+        self._decode_packet = timers.wrap(PHASE_DECODE, self._decode_packet)
+        self._analyze_frame_quality = timers.wrap(PHASE_FRAME_QUALITY, self._analyze_frame_quality)
+        self._detect_picture = timers.wrap(PHASE_PICTURE, self._detect_picture)
+        self._sample_audio = timers.wrap(PHASE_AUDIO, self._sample_audio)
+        self._calculate_bitrate = timers.wrap(PHASE_BITRATE, self._calculate_bitrate)
+        self.assess_stream_health = timers.wrap(PHASE_HEALTH, self.assess_stream_health)
+        self.print_status = timers.wrap(PHASE_REPORT, self.print_status)
+        self._send_alert = timers.wrap(PHASE_WEBHOOK, self._send_alert)
 
     def connect(self):
         """
-        连接到流
+        连接到流：进程内同时进行的 av.open 受并发上限约束；按 open_spec 设置探测与超时选项，
+        配置了快速起播或重连且已缓存流信息时缩短探测；light 引擎直接发起 HTTP 请求，同样受并发上限与超时约束
         """
-        try:
-            # options = {
-            #     'rtmp_live': 'live',
-            #     'rtmp_buffer': '1000',
-            #     'timeout': '10000000',
-            #     'analyzeduration': '1000000',
-            #     'probesize': '500000'
-            # }
+        limiter = get_open_limiter()
+        if not limiter.acquire(timeout=OPEN_QUEUE_TIMEOUT):
+            logger.warning(f"连接排队超时: {self.stream_id} {self.stream_name} {self.stream_url}")
+            return False
 
+        spec = self.open_spec
+        fast = spec.fast_start or (self.fast_probe and self._probe_info is not None)
+        startup = self.startup
+        startup.update(fast=fast, open=None, first_packet=None, first_keyframe=None)
+        try:
             logger.info(f"=== 尝试连接: {self.stream_id} 流 {self.stream_name} {self.stream_url} ===")
-            self.container = av.open(self.stream_url)
-            # self.container = av.open(self.stream_url, options=options)
+            self._connect_started = time.monotonic()
+            container = None
+            if self.engine == ENGINE_LIGHT:
+                container = self._open_light()
+            elif self.engine == ENGINE_HLS:
+                container = self._open_hls()
+            if container is None:
+                # 探测与协议选项只作用于容器（传给 options 会同时作用于解码器）
+                container = av.open(self.stream_url, container_options=spec.select(fast), timeout=spec.timeout)
+            self.container = container
+            startup['open'] = time.monotonic() - self._connect_started
             self.stats['start_time'] = datetime.now()
+            self._publish_stats()
 
-            # 尝试获取流信息
-            self._analyze_stream_info()
+            # 尝试获取流信息（light 引擎从序列头与 onMetaData 中获取，hls 引擎从采样分片中获取）
+            if self.engine == ENGINE_AV:
+                self._analyze_stream_info()
 
             logger.info(f"✅ 成功连接到: {self.stream_id} {self.stream_name} {self.stream_url}")
             return True
         except av.AVError as e:
             logger.error(f"❌AVError 连接失败: {self.stream_id} {self.stream_name} {self.stream_url}")
             logger.error(f"❌AVError 连接失败: {e}")
+            # 缩短探测失败时下次完整探测
+            self._probe_info = None
             return False
         except Exception as e:
             logger.error(f"❌ 连接失败: {self.stream_id} {self.stream_name} {self.stream_url}")
             logger.error(f"❌ 连接失败: {e}")
+            self._probe_info = None
             return False
+        finally:
+            limiter.release()
+
+    def _open_light(self):
+        """
+        light 引擎：发起 HTTP 请求并校验 FLV 签名，响应不是 FLV 时返回 None 并改用 av 引擎
+        """
+        try:
+            return HttpFlvSource(self.stream_url, timeout=self.open_spec.timeout)
+        except ValueError:
+            logger.warning(f"响应不是 FLV 流，改用 av 引擎: {self.stream_id} {self.stream_name} {self.stream_url}")
+            self.engine = ENGINE_AV
+            return None
 
-    def _analyze_stream_info(self):
+    def _open_hls(self):
+        """
+        hls 引擎：获取媒体播放列表（主播放列表选择第一个变体），响应不是 M3U8 时返回 None 并改用 av 引擎
+        """
+        try:
+            return HlsSession(self.stream_url, self.hls_stats, timeout=self.open_spec.timeout)
+        except ValueError:
+            logger.warning(f"响应不是 M3U8，改用 av 引擎: {self.stream_id} {self.stream_name} {self.stream_url}")
+            self.engine = ENGINE_AV
+            self.hls_stats = None
+            return None
+
+    def _analyze_stream_info(self, container=None):
         """
         分析流信息（分辨率、编码等）
+        :param container: 默认为当前连接的容器，hls 引擎传入采样分片的容器
         """
         try:
             logging.info(f"=== 尝试获取{self.stream_id} {self.stream_name} {self.stream_url} 流信息 ===")
             video_stream = None
-            for stream in self.container.streams:
+            for stream in (container or self.container).streams:
                 if stream.type == 'video':
                     video_stream = stream
                     break
@@ -113,315 +258,860 @@ class StreamMonitor:
                 # 获取基础流信息
                 codec_name = video_stream.codec_context.name if video_stream.codec_context else 'unknown'
                 profile = getattr(video_stream.codec_context, 'profile', 'unknown')
-
-                self.deep_stats.update({
+                info = {
                     'codec': codec_name,
                     'profile': profile,
                     'resolution': (video_stream.width, video_stream.height) if video_stream.width else (0, 0)
-                })
+                }
+                if info['resolution'][0] > 0:
+                    self._probe_info = info
+                elif self._probe_info is not None:
+                    # 缩短探测未拿到完整参数时沿用上次探测结果
+                    info = self._probe_info
+
+                self.deep_stats.update(info)
 
-                logger.info(f"📺 流信息 - 编码: {codec_name}, 分辨率: {video_stream.width}x{video_stream.height}")
+                width, height = info['resolution']
+                logger.info(f"📺 流信息 - 编码: {info['codec']}, 分辨率: {width}x{height}")
 
         except Exception as e:
             logger.warning(f"无法获取流信息: {self.stream_id} {self.stream_name} {self.stream_url}")
             logger.warning(f"无法获取流信息: {e}")
 
-    def _calculate_bitrate(self):
+    def _report_startup(self, now):
         """
-        计算实时码率
+        记录首个关键帧耗时并输出本次连接的起播耗时，用于调整打开选项 profile
         """
-        current_time = time.time()
-        time_diff = current_time - self.last_byte_count_time
+        startup = self.startup
+        startup['first_keyframe'] = now - self._connect_started
+
+        def ms(seconds):
+            return 'N/A' if seconds is None else f"{seconds * 1000:.0f}ms"
 
-        if time_diff > 0:
-            # 计算当前码率 (bps)
-            current_bitrate = (self.byte_count * 8) / time_diff
-            self.deep_stats['current_bitrate'] = current_bitrate
-            self.deep_stats['bitrate_history'].append(current_bitrate)
+        logger.info("⏱ 起播耗时: %s profile=%s%s open=%s 首包=%s 首个关键帧=%s", self.stream_id, startup['profile'],
+                    ' (fast)' if startup['fast'] else '', ms(startup['open']), ms(startup['first_packet']),
+                    ms(startup['first_keyframe']))
 
-            # 计算平均码率
-            if self.deep_stats['bitrate_history']:
-                self.deep_stats['average_bitrate'] = sum(self.deep_stats['bitrate_history']) / len(
-                    self.deep_stats['bitrate_history'])
+    def _calculate_bitrate(self):
+        """
+        计算实时码率（按窗口内推进的媒体时间），同时刷新帧率、抖动与丢包率
+        """
+        timeline = self.timeline
+        deep_stats = self.deep_stats
+        current_bitrate = timeline.take_bitrate(time.monotonic())
+        deep_stats.current_bitrate = current_bitrate
+        deep_stats.bitrate_history.append(current_bitrate)
 
-            # 重置计数器
-            self.byte_count = 0
-            self.last_byte_count_time = current_time
+        # 平均码率由环形缓冲维护的累计和得到，O(1)
+        deep_stats.average_bitrate = deep_stats.bitrate_history.mean()
+
+        deep_stats.frame_rate = timeline.frame_rate
+        deep_stats.jitter = timeline.jitter * 1000
+        deep_stats.packet_loss = timeline.packet_loss
 
     def _analyze_frame_quality(self, frame):
         """
         分析帧质量
         """
         try:
-            # 转换为numpy数组进行分析
-            np_frame = frame.to_ndarray(format='bgr24')
-
-            # 计算亮度
-            brightness = np.mean(np_frame)
-
-            # 计算对比度 (标准差)
-            contrast = np.std(np_frame)
-
-            return {
-                'brightness': brightness,
-                'contrast': contrast,
-                'resolution': (frame.width, frame.height)
-            }
+            # 直接读取亮度平面计算亮度、对比度、黑屏、静止、块效应
+            return self.frame_analyzer.analyze(frame)
         except Exception as e:
             logger.error(f"帧质量分析失败: {self.stream_id} {self.stream_name} {self.stream_url}")
             logger.error(f"帧质量分析失败: {e}")
             return None
 
-    def _calculate_frame_rate(self):
+    def _analyze_video_packet(self, packet, stream, now):
+        """
+        深度分析视频包
+        :param now: 包到达时的单调时钟
+        """
+        # 码率、帧率、GOP、抖动、丢包均按包时间戳计算
+        timeline = self.timeline
+        timeline.on_video(packet, stream, now)
+        current_time = now + self._clock_offset
+
+        deep_stats = self.deep_stats
+        keyframe = packet.is_keyframe
+
+        # 分析关键帧/GOP
+        if keyframe:
+            self._on_keyframe(now, current_time)
+            if self.encoder_clock:
+                self._read_encoder_clock(packet)
+
+        # 定期进行帧质量分析（每5秒），keyframe 模式只在关键帧上采样
+        quality_due = (deep_stats.last_frame_analysis is None or
+                       current_time - deep_stats.last_frame_analysis > 5)
+        # 静止/黑屏检测在预算允许时对每个关键帧采样
+        detect_due = (keyframe and self.picture_detector is not None and
+                      self.picture_budget.available())
+
+        if self.quality_sampling == QUALITY_SAMPLING_ANY and quality_due:
+            # 尝试解码一帧进行分析；恰为关键帧时同时做静止/黑屏检测
+            self._sample_frame(packet, self._decode_packet, current_time, analyze=True, detect=detect_due)
+        elif keyframe and (quality_due or detect_due):
+            self._sample_frame(packet, self._decode_keyframe, current_time, analyze=quality_due,
+                               detect=detect_due)
+
+    def _on_keyframe(self, now, current_time):
+        """
+        关键帧：更新关键帧统计、起播耗时与 GOP
+        """
+        stats = self.stats
+        stats.keyframes += 1
+        stats.last_keyframe_time = current_time
+        self._publish_stats()
+        if self.startup['first_keyframe'] is None:
+            self._report_startup(now)
+
+        # GOP大小为两个关键帧之间的实际帧数
+        timeline = self.timeline
+        deep_stats = self.deep_stats
+        if timeline.gop_size:
+            deep_stats.gop_size = timeline.gop_size
+            deep_stats.gop_duration = timeline.gop_duration
+            deep_stats.frame_rate = timeline.frame_rate
+
+        deep_stats.last_gop_start = current_time
+
+    def _add_packets(self, total, video, audio, now=None):
         """
-        计算实时帧率
+        把解复用线程本地累计的包计数与最后收包时间更新到 stats 后一起发布，读者经 packet_snapshot() 得到一致快照
+        :param now: 最后一个包的到达时间（单调时钟），None 时不更新最后收包时间
         """
-        current_time = time.time()
-        self.frame_buffer.append(current_time)
+        stats = self.stats
+        stats.total_packets += total
+        stats.video_packets += video
+        stats.audio_packets += audio
+        if now is not None:
+            stats.last_packet_time = now + self._clock_offset
+        self._publish_stats()
+
+    def _publish_stats(self):
+        """
+        以不可变元组整体替换 stats 快照（只由解复用线程调用），单次属性赋值对读者是原子的
+        """
+        self._stats_view = tuple(self.stats.items())
 
-        if len(self.frame_buffer) > 1:
-            time_diff = self.frame_buffer[-1] - self.frame_buffer[0]
-            if time_diff > 0:
-                self.deep_stats['frame_rate'] = (len(self.frame_buffer) - 1) / time_diff
+    def packet_snapshot(self):
+        """
+        stats 的一致快照（dict）：读取最近一次发布的元组，不加锁，不与解复用线程争用
+        """
+        return dict(self._stats_view)
 
-    def _analyze_video_packet(self, packet):
+    def _read_encoder_clock(self, data):
         """
-        深度分析视频包
+        关键帧开头 SEI 中的编码器墙上时间：锚定端到端延迟（只查看图像数据之前的 NAL）
         """
-        if packet.stream and packet.stream.type == 'video':
-            # 统计字节数用于码率计算
-            self.byte_count += packet.size
+        try:
+            wall = sei_wallclock(data, self.deep_stats.codec)
+        except Exception as e:
+            logger.error(f"编码器时间读取失败: {self.stream_id} {self.stream_name} {self.stream_url}")
+            logger.error(f"编码器时间读取失败: {e}")
+            return
+        if wall is not None:
+            self.timeline.latency.on_wallclock(wall - self._clock_offset, SOURCE_SEI)
 
-            # 记录帧时间用于帧率计算
-            self._calculate_frame_rate()
+    def _on_video_tag(self, tag, now):
+        """
+        light 引擎的视频帧：只用标签头中的时间戳、大小与帧类型，关键帧上另有负载开头（读取 SEI）
+        """
+        self.timeline.on_video_time(tag.timestamp / 1000, 0.0, tag.size, tag.keyframe, now)
+        if tag.keyframe:
+            self._on_keyframe(now, now + self._clock_offset)
+            if tag.body is not None:
+                self._read_encoder_clock(tag.body)
 
-            # 分析关键帧/GOP
-            if packet.is_keyframe:
-                self.stats['keyframes'] += 1
-                self.stats['last_keyframe_time'] = time.time()
+    def _on_stream_config(self, tag):
+        """
+        light 引擎的序列头与脚本标签：更新编码、配置与分辨率（onMetaData），读取编码器墙上时间（onMetaData、onTextData）
+        """
+        deep_stats = self.deep_stats
+        if tag.kind == TAG_VIDEO:
+            deep_stats.codec = tag.codec
+            deep_stats.profile = sequence_header_profile(tag) or deep_stats.profile
+            width, height = deep_stats.resolution
+            logger.info(f"📺 流信息 - 编码: {deep_stats.codec}, 分辨率: {width}x{height}")
+            return
+        name, metadata = parse_script(tag.body)
+        if self.encoder_clock and name in ('onMetaData', 'onTextData'):
+            wall = script_wallclock(metadata)
+            if wall is not None:
+                self.timeline.latency.on_wallclock(wall - self._clock_offset, SOURCE_SCRIPT, tag.timestamp / 1000)
+        if name != 'onMetaData':
+            return
+        width, height = metadata.get('width'), metadata.get('height')
+        if isinstance(width, float) and isinstance(height, float) and width > 0 and height > 0:
+            deep_stats.resolution = (int(width), int(height))
+        codec_id = metadata.get('videocodecid')
+        if deep_stats.codec == 'unknown' and isinstance(codec_id, float):
+            deep_stats.codec = VIDEO_CODECS.get(int(codec_id), 'unknown')
+
+    def _sample_frame(self, packet, decode, current_time, analyze, detect):
+        """
+        解码一帧并执行帧质量分析和/或静止黑屏检测
+        """
+        try:
+            cpu_start = time.thread_time()
+            frames = decode(packet)
+            self.deep_stats['decode_count'] += 1
+            self.deep_stats['decode_cpu'] += time.thread_time() - cpu_start
+
+            for frame in frames:
+                if analyze:
+                    frame_analysis = self._analyze_frame_quality(frame)
+                    if frame_analysis:
+                        self.deep_stats.update(frame_analysis)
+                if detect:
+                    self._detect_picture(frame, current_time)
+                break  # 只分析第一帧
+
+            if analyze:
+                self.deep_stats['last_frame_analysis'] = current_time
+            if detect:
+                self.picture_budget.charge(time.thread_time() - cpu_start)
+        except Exception as e:
+            logger.error(f"帧解码失败: {self.stream_id} {self.stream_name} {self.stream_url}")
+            logger.error(f"帧解码失败: {e}")
 
-                # 计算GOP大小
-                if self.deep_stats['last_gop_start']:
-                    gop_duration = time.time() - self.deep_stats['last_gop_start']
-                    gop_size = int(gop_duration * self.deep_stats.get('frame_rate', 25))
-                    self.deep_stats['gop_size'] = gop_size
+    def _detect_picture(self, frame, current_time):
+        """
+        静止/黑屏检测
+        """
+        self.picture_detector.feed(luma_plane(frame), current_time)
+
+    def _on_audio_packet(self, packet, stream, now):
+        """
+        音频包：计入码率并做静音/削波检测
+        :param now: 包到达时的单调时钟
+        """
+        self.timeline.on_audio(packet, stream, now)
+        self._analyze_audio_packet(packet, now + self._clock_offset)
 
-                self.deep_stats['last_gop_start'] = time.time()
+    def _analyze_audio_packet(self, packet, current_time):
+        """
+        处于采样窗口中（或已到下一窗口）且预算允许时解码音频包
+        """
+        if self.audio_analyzer.wants(current_time) and self.audio_budget.available():
+            self._sample_audio(packet, current_time)
 
-            # 定期进行帧质量分析（每10帧或每5秒）
-            current_time = time.time()
-            if (self.deep_stats['last_frame_analysis'] is None or
-                    current_time - self.deep_stats['last_frame_analysis'] > 5):
+    def _sample_audio(self, packet, current_time):
+        """
+        解码一个音频包，平面浮点采样送入音频分析
+        """
+        try:
+            cpu_start = time.thread_time()
+            analyzer = self.audio_analyzer
+            for frame in packet.decode():
+                analyzer.feed(planar_float(frame), frame.sample_rate, current_time)
+            self.audio_budget.charge(time.thread_time() - cpu_start)
+        except Exception as e:
+            logger.error(f"音频解码失败: {self.stream_id} {self.stream_name} {self.stream_url}")
+            logger.error(f"音频解码失败: {e}")
 
-                try:
-                    # 尝试解码一帧进行分析
-                    for frame in packet.decode():
-                        frame_analysis = self._analyze_frame_quality(frame)
-                        if frame_analysis:
-                            self.deep_stats.update(frame_analysis)
-                        break  # 只分析第一帧
-
-                    self.deep_stats['last_frame_analysis'] = current_time
-                except Exception as e:
-                    logger.error(f"帧解码失败: {self.stream_id} {self.stream_name} {self.stream_url}")
-                    logger.error(f"帧解码失败: {e}")
+    @staticmethod
+    def _decode_packet(packet):
+        """
+        直接解码数据包（any 采样方式）
+        """
+        return packet.decode()
 
-    def assess_stream_health(self):
+    def _decode_keyframe(self, packet):
+        """
+        用常驻解码器解码关键帧，skip_frame=NONKEY 让解码器跳过所有非关键帧
+        """
+        decoder = self._get_decoder(packet.stream)
+        frames = decoder.decode(packet)
+        if not frames:
+            # 存在重排序延迟的编码（如带B帧的H.264）需要冲刷才能立即拿到关键帧画面
+            frames = decoder.decode(None)
+            decoder.flush_buffers()
+        return frames
+
+    def _get_decoder(self, stream):
+        """
+        获取常驻解码器，编码或 extradata 变化（如重连后换流）时重建，跨重连复用
+        """
+        codec_context = stream.codec_context
+        key = (codec_context.name, codec_context.extradata)
+        if self._decoder is None or self._decoder_key != key:
+            decoder = av.CodecContext.create(codec_context.name, 'r')
+            if codec_context.extradata:
+                decoder.extradata = codec_context.extradata
+            decoder.skip_frame = 'NONKEY'
+            decoder.thread_count = 1
+            self._decoder = decoder
+            self._decoder_key = key
+        return self._decoder
+
+    def assess_stream_health(self, now=None):
         """
         评估流健康状况 - 增强版
         """
-        current_time = time.time()
+        current_time = time.time() if now is None else now
         health = {
             'playable': True,
             'quality': 'good',
             'issues': [],
             'estimated_delay': None,
             'bitrate_stability': 'stable',
-            'resolution_stability': 'stable'
+            'resolution_stability': 'stable',
+            'black': False,
+            'black_seconds': 0,
+            'frozen': False,
+            'frozen_seconds': 0,
+            'silent': False,
+            'silent_seconds': 0,
+            'clipping': False,
+            'live_delay': None,
+            'delay_growth': None,
+            'end_to_end_delay': None,
+            'buffer_bloat': False
         }
 
+        rules = self.health_rules
+        issue = rules.issue
+        stats = self.packet_snapshot()
+
         # 基础健康检查
-        if (self.stats['last_packet_time'] and
-                current_time - self.stats['last_packet_time'] > 10):
+        if (stats['last_packet_time'] and
+                current_time - stats['last_packet_time'] > rules.no_packet_seconds):
             health['playable'] = False
-            health['issues'].append("10秒内无数据包")
+            health['issues'].append(issue['no_packets'](limit=rules.no_packet_seconds))
 
-        if (self.stats['last_keyframe_time'] and
-                current_time - self.stats['last_keyframe_time'] > 30):
-            health['issues'].append("30秒内无关键帧")
+        if (stats['last_keyframe_time'] and
+                current_time - stats['last_keyframe_time'] > rules.no_keyframe_seconds):
+            health['issues'].append(issue['no_keyframe'](limit=rules.no_keyframe_seconds))
             health['quality'] = 'poor'
 
-        # 码率稳定性检查
-        if len(self.deep_stats['bitrate_history']) > 10:
-            recent_bitrates = list(self.deep_stats['bitrate_history'])[-10:]
-            bitrate_variance = np.std(recent_bitrates) / np.mean(recent_bitrates) if np.mean(recent_bitrates) > 0 else 0
+        # 码率稳定性检查：最近 10 个样本的变异系数，由环形缓冲的滚动和与平方和 O(1) 得到
+        bitrate_history = self.deep_stats['bitrate_history']
+        if len(bitrate_history) > rules.bitrate_min_samples:
+            bitrate_mean, bitrate_std = bitrate_history.window_stats()
+            bitrate_variance = bitrate_std / bitrate_mean if bitrate_mean > 0 else 0
 
-            if bitrate_variance > 0.5:
+            if bitrate_variance > rules.bitrate_cv_unstable:
                 health['bitrate_stability'] = 'unstable'
-                health['issues'].append("码率波动较大")
+                health['issues'].append(issue['bitrate_unstable']())
                 health['quality'] = 'poor'
-            elif bitrate_variance > 0.2:
+            elif bitrate_variance > rules.bitrate_cv_moderate:
                 health['bitrate_stability'] = 'moderate'
                 health['quality'] = 'fair'
 
         # 帧率检查
-        if self.deep_stats['frame_rate'] > 0:
-            if self.deep_stats['frame_rate'] < 15:
-                health['issues'].append(f"帧率过低: {self.deep_stats['frame_rate']:.1f}fps")
+        frame_rate = self.deep_stats['frame_rate']
+        if frame_rate > 0:
+            if frame_rate < rules.fps_poor:
+                health['issues'].append(issue['fps_poor'](fps=frame_rate))
                 health['quality'] = 'poor'
-            elif self.deep_stats['frame_rate'] < 24:
-                health['issues'].append(f"帧率较低: {self.deep_stats['frame_rate']:.1f}fps")
+            elif frame_rate < rules.fps_fair:
+                health['issues'].append(issue['fps_fair'](fps=frame_rate))
                 if health['quality'] == 'good':
                     health['quality'] = 'fair'
 
         # GOP大小检查
-        if self.deep_stats['gop_size'] > 0:
-            if self.deep_stats['gop_size'] > 300:  # GOP太大可能导致seek困难
-                health['issues'].append(f"GOP过大: {self.deep_stats['gop_size']}帧")
-            elif self.deep_stats['gop_size'] < 10:  # GOP太小影响编码效率
-                health['issues'].append(f"GOP过小: {self.deep_stats['gop_size']}帧")
+        gop_size = self.deep_stats['gop_size']
+        if gop_size > 0:
+            if gop_size > rules.gop_max:  # GOP太大可能导致seek困难
+                health['issues'].append(issue['gop_large'](gop=gop_size))
+            elif gop_size < rules.gop_min:  # GOP太小影响编码效率
+                health['issues'].append(issue['gop_small'](gop=gop_size))
+
+        # 画面静止/黑屏检查
+        if self.picture_detector is not None:
+            picture = self.picture_detector.status(current_time)
+            health['black'] = picture['black']
+            health['black_seconds'] = int(picture['black_seconds'])
+            health['frozen'] = picture['frozen']
+            health['frozen_seconds'] = int(picture['frozen_seconds'])
+            if picture['black']:
+                health['issues'].append(issue['black'](seconds=health['black_seconds']))
+                health['quality'] = 'poor'
+            elif picture['frozen']:
+                health['issues'].append(issue['frozen'](seconds=health['frozen_seconds']))
+                health['quality'] = 'poor'
+
+        # 音频静音/削波检查
+        if self.audio_analyzer is not None:
+            audio = self.audio_analyzer.status(current_time)
+            health['silent'] = audio['silent']
+            health['silent_seconds'] = int(audio['silent_seconds'])
+            health['clipping'] = audio['clipping']
+            if audio['silent']:
+                health['issues'].append(issue['silent'](seconds=health['silent_seconds']))
+                health['quality'] = 'poor'
+            elif audio['clipping']:
+                health['issues'].append(issue['clipping'](ratio=audio['clip_ratio']))
+                if health['quality'] == 'good':
+                    health['quality'] = 'fair'
+
+        # 落后直播边缘的延迟与增长率（包时间戳相对到达时间的漂移），有编码器墙上时间时另有端到端延迟
+        latency = self.latency_status(current_time - self._clock_offset)
+        if latency is not None:
+            self._apply_latency(health, latency)
 
         # 估算延迟
-        if self.stats['last_packet_time']:
-            health['estimated_delay'] = int((current_time - self.stats['last_packet_time']) * 1000)
+        if stats['last_packet_time']:
+            health['estimated_delay'] = int((current_time - stats['last_packet_time']) * 1000)
 
         return health
 
-    def start_monitoring(self):
+    def latency_status(self, now=None):
+        """
+        延迟估计：(落后直播边缘秒数, 增长率 秒/秒, 端到端秒数或 None, 连接时积压秒数)；
+        尚未收到带时间戳的视频包，或 hls 引擎（只采样分片，没有连续的到达时间）时为 None
+        :param now: 单调时钟
+        """
+        if self.engine == ENGINE_HLS:
+            return None
+        return self.timeline.latency.status(time.monotonic() if now is None else now)
+
+    def _apply_latency(self, health, latency):
         """
-        开始监控
+        把延迟估计写入 health：落后直播边缘超过阈值或延迟持续增长时判定为缓冲积压
         """
+        rules = self.health_rules
+        live_delay, growth, end_to_end, _ = latency
+        health['live_delay'] = int(live_delay * 1000)
+        health['delay_growth'] = round(growth * 1000, 1)
+        health['end_to_end_delay'] = None if end_to_end is None else int(end_to_end * 1000)
+        if live_delay > rules.live_delay_seconds:
+            health['issues'].append(rules.issue['live_delay'](seconds=live_delay))
+        elif growth * 1000 > rules.delay_growth_ms:
+            health['issues'].append(rules.issue['delay_growth'](rate=growth * 1000))
+        else:
+            return
+        health['buffer_bloat'] = True
+        if health['quality'] == 'good':
+            health['quality'] = 'fair'
+
+    def start_monitoring(self, scheduler=None):
+        """
+        开始监控，阻塞到本次会话结束（卡顿或外部停止）
+        :param scheduler: 共享调度器，传入时健康检查与码率计算由调度器驱动，当前线程只负责解复用
+        :return: 是否连接成功
+        """
+        # 每次会话一个停止事件，上一次会话残留的线程不会因重连而继续运行；连接期间调用 stop() 同样生效
+        stopped = self._stopped = threading.Event()
         if not self.connect():
             self.running = False
             return False
-
         self.running = True
+        if stopped.is_set():
+            self.running = False
+            self.container.close()
+            self.container = None
+            return True
+
+        self.timeline = PacketTimeline()  # 重连后时间戳重新开始
+        self.frame_analyzer.reset()  # 静止检测不与上一次会话的画面比较
+        if self.picture_detector is not None:
+            self.picture_detector.reset()
+        if self.audio_analyzer is not None:
+            self.audio_analyzer.reset()
         logger.info(f"🚀 开始流监控: {self.stream_id} {self.stream_name} {self.stream_url}")
 
-        # 启动视频流读取现成
-        packet_thread = threading.Thread(target=self.packet_loop)
-        packet_thread.daemon = True
-        packet_thread.start()
-        self.heart_beat_time = time.time()
+        self._stall_deadline = self.watchdog.register(self.stream_id, self.stall_timeout, self._on_stall)
 
-        # 启动健康检查线程
-        health_thread = threading.Thread(target=self.health_check_loop)
-        health_thread.daemon = True
-        health_thread.start()
-
-        # 启动码率计算线程
-        bitrate_thread = threading.Thread(target=self.bitrate_calculation_loop)
-        bitrate_thread.daemon = True
-        bitrate_thread.start()
-
-        while self.running:
-            current_time = time.time()
-            #默认超过10s则需要退出监控，通过重启监控机制恢复监控
-            if current_time - self.heart_beat_time > 10:
-                self.stop()
-                self._force_stop_thread(packet_thread)
-                return False
+        loop = {ENGINE_LIGHT: self.tag_loop, ENGINE_HLS: self.playlist_loop}.get(self.engine, self.packet_loop)
+        if scheduler is not None:
+            self.session_threads = [threading.current_thread()]
+            return self._run_scheduled(scheduler, loop)
 
-    def _force_stop_thread(self, thread):
-        """强制停止线程"""
-        try:
-            # 方法1: 使用异步异常（Python 3.7+）
-            if hasattr(thread, '_thread_id'):
-                tid = thread._thread_id
-            else:
-                # 获取线程ID
-                for tid, tobj in threading._active.items():
-                    if tobj is thread:
-                        break
-                else:
-                    logger.error("无法找到线程ID")
-                    return
-
-            # 向线程发送异步异常
-            res = ctypes.pythonapi.PyThreadState_SetAsyncExc(
-                ctypes.c_long(tid),
-                ctypes.py_object(SystemExit)
-            )
+        # 解复用线程拥有容器与解码器，退出时在本线程内关闭
+        packet_thread = threading.Thread(target=loop, name=f"demux-{self.stream_id}", daemon=True)
+        packet_thread.start()
+        threads = self.session_threads = [packet_thread]
 
-            if res == 0:
-                logger.error("无效的线程ID")
-            elif res != 1:
-                # 如果返回值大于1，需要清理
-                ctypes.pythonapi.PyThreadState_SetAsyncExc(tid, None)
-                logger.error("强制终止线程失败")
-            else:
-                logger.info("已发送终止信号给线程")
-
-            # 等待线程结束
-            thread.join(timeout=3.0)
+        # 启动健康检查线程
+        if self.health_check:
+            threads.append(threading.Thread(target=self.health_check_loop, args=(stopped,),
+                                            name=f"health-{self.stream_id}", daemon=True))
+
+        # 启动码率计算线程（hls 引擎按采样分片计算码率）
+        if self.engine != ENGINE_HLS:
+            threads.append(threading.Thread(target=self.bitrate_calculation_loop, args=(stopped,),
+                                            name=f"bitrate-{self.stream_id}", daemon=True))
+        for thread in threads[1:]:
+            thread.start()
+
+        # 阻塞等待停止：看门狗判定卡顿、流结束或外部调用 stop()，由 MonitorJob 按重连策略恢复
+        stopped.wait()
+        self.watchdog.unregister(self._stall_deadline)
+        self._join_threads(threads)
+        return True
+
+    def _join_threads(self, threads):
+        """
+        等待本次会话的线程退出：解复用线程最迟在下一个包或读取超时（中断回调）时退出
+        """
+        read_timeout = self.open_spec.timeout[1] or 0
+        deadline = time.monotonic() + read_timeout + STOP_GRACE_SECONDS
+        for thread in threads:
+            thread.join(timeout=max(0.0, deadline - time.monotonic()))
             if thread.is_alive():
-                logger.error("线程仍然存活，可能需要更强制的手段")
+                logger.warning(f"线程 {thread.name} 未在 {read_timeout + STOP_GRACE_SECONDS:g} 秒内退出")
 
-        except Exception as e:
-            logger.error(f"强制停止线程时出错: {e}")
+    def _run_scheduled(self, scheduler, loop):
+        """
+        共享调度模式：周期任务注册到调度器，在当前线程中执行解复用
+        :param loop: 本次会话的解复用循环（packet_loop 或 tag_loop）
+        """
+        tasks = []
+        if self.engine != ENGINE_HLS:
+            tasks.append(scheduler.schedule(1, self.run_bitrate_calculation, f"bitrate:{self.stream_id}"))
+        if self.health_check:
+            tasks.append(scheduler.schedule(self.check_interval, self.run_health_check, f"health:{self.stream_id}"))
+        try:
+            loop()
+        finally:
+            for task in tasks:
+                scheduler.cancel(task)
+            self.watchdog.unregister(self._stall_deadline)
+        return True
+
+    def _on_stall(self):
+        """
+        看门狗回调：超过 stall_timeout 秒无数据，停止监控
+        """
+        if self.running:
+            self.stop()
 
-    def bitrate_calculation_loop(self):
+    def bitrate_calculation_loop(self, stopped=None):
         """
         码率计算循环
+        :param stopped: 本次会话的停止事件
         """
-        while self.running:
-            try:
-                self._calculate_bitrate()
-            except Exception as e:
-                logger.error(f"码率计算错误: {self.stream_id} {self.stream_name} {self.stream_url}")
-                logger.error(f"码率计算错误: {e}")
+        stopped = stopped or self._stopped
+        while not stopped.is_set():
+            self.run_bitrate_calculation()
+            stopped.wait(1)  # 每秒计算一次
 
-            time.sleep(1)  # 每秒计算一次
+    def run_bitrate_calculation(self):
+        """
+        执行一次码率计算
+        """
+        try:
+            self._calculate_bitrate()
+        except Exception as e:
+            logger.error(f"码率计算错误: {self.stream_id} {self.stream_name} {self.stream_url}")
+            logger.error(f"码率计算错误: {e}")
 
     def packet_loop(self):
         """
         主监控循环 demux() 实时，持续监控流，直播结束，for循环结束
+        包计数累计在本地变量中，流类型按 stream_index 缓存；每 batch_packets 个包、batch_seconds 秒或遇到关键帧时
+        批量发布到 stats，同时顺延卡顿截止时间并检查停止标志
         """
-        for packet in self.container.demux():
-            if not self.running:
-                break
-
-            self.stats['total_packets'] += 1
-            self.stats['last_packet_time'] = time.time()
+        container = self.container
+        packets = container.demux()
+        if self.timers is not None:
+            packets = self.timers.wrap_iter(PHASE_DEMUX, packets)
+        analyze_video = self._analyze_video_packet
+        # 未开启音频分析时直接计入码率，不经过额外的方法调用
+        on_audio = self._on_audio_packet if self.audio_analyzer is not None else self.timeline.on_audio
+        monotonic = time.monotonic
+        batch_packets = self.batch_packets
+        batch_seconds = self.batch_seconds
+        kinds = {}  # stream_index -> (流类型, 流)
+        total = video = audio = 0
+        flush_at = 0.0  # 首个包立即发布，记录首包耗时
+        now = None
+        try:
+            for packet in packets:
+                # 每个包只读一次单调时钟
+                now = monotonic()
+                index = packet.stream_index
+                entry = kinds.get(index)
+                if entry is None:
+                    stream = packet.stream
+                    entry = kinds[index] = (stream.type if stream is not None else None, stream)
+                kind, stream = entry
+                total += 1
+                keyframe = False
+                if kind == 'video':
+                    video += 1
+                    keyframe = packet.is_keyframe
+                elif kind == 'audio':
+                    audio += 1
+
+                # 关键帧先发布计数再更新关键帧统计，快照中的关键帧数不会超前于视频包数
+                if keyframe or total >= batch_packets or now >= flush_at:
+                    if not self.running:
+                        break
+                    if self.startup['first_packet'] is None:
+                        self.startup['first_packet'] = now - self._connect_started
+                    self._add_packets(total, video, audio, now)
+                    total = video = audio = 0
+                    flush_at = now + batch_seconds
+                    # 顺延卡顿截止时间
+                    self._stall_deadline.feed(now)
+
+                # 统计包类型
+                if kind == 'video':
+                    analyze_video(packet, stream, now)
+                elif kind == 'audio':
+                    on_audio(packet, stream, now)  # 音频包也计入码率，按采样窗口做静音/削波检测
+        except Exception as e:
+            # stop() 之后的读取超时（中断回调）属于正常退出
+            if self.running:
+                logger.error(f"解复用错误: {self.stream_id} {self.stream_name} {self.stream_url}")
+                logger.error(f"解复用错误: {e}")
+        finally:
+            if total:
+                self._add_packets(total, video, audio, now)
+            # 容器与解码器只在解复用线程中关闭，避免与阻塞中的 demux() 并发
+            self.container = None
+            self._decoder = None
+            self._decoder_key = None
+            container.close()
+            if self.running:
+                # 流结束或读取出错，结束本次会话
+                self.stop()
 
-            # 统计包类型
-            if packet.stream and packet.stream.type == 'video':
-                self.stats['video_packets'] += 1
-                self._analyze_video_packet(packet)
-            elif packet.stream and packet.stream.type == 'audio':
-                self.stats['audio_packets'] += 1
-                self.byte_count += packet.size  # 音频包也计入码率
+    def tag_loop(self):
+        """
+        light 引擎主循环：按块读取 HTTP-FLV 字节流，只解析标签头，不经过 FFmpeg 解复用与解码；
+        同一块中的标签共用一次单调时钟读数，包计数每块（以及关键帧前）发布一次
+        """
+        first_packet = True
+        source = self.container
+        parser = FlvTagParser(keyframe_peek=KEYFRAME_PEEK if self.encoder_clock else 0)
+        read = source.read
+        if self.timers is not None:
+            read = self.timers.wrap(PHASE_DEMUX, read)
+        try:
+            while self.running:
+                chunk = read()
+                if not chunk:
+                    break  # 流结束
+                now = time.monotonic()
+                received = video = audio = 0
+                for tag in parser.feed(chunk):
+                    if tag.packet_type != PACKET_CODED_FRAMES:
+                        if tag.body is not None:
+                            self._on_stream_config(tag)
+                        continue  # 音频配置、序列结束等非媒体数据
+                    elif tag.kind == TAG_VIDEO:
+                        received += 1
+                        video += 1
+                        if tag.keyframe:
+                            # 关键帧先发布本块已累计的计数，快照中的关键帧数不会超前于视频包数
+                            self._add_packets(video + audio, video, audio, now)
+                            video = audio = 0
+                        self._on_video_tag(tag, now)
+                    elif tag.kind == TAG_AUDIO:
+                        received += 1
+                        audio += 1
+                        self.timeline.on_audio_time(tag.timestamp / 1000, 0.0, tag.size, now)
+
+                # 每块发布一次计数与最后收包时间
+                if received:
+                    if first_packet:
+                        first_packet = False
+                        self.startup['first_packet'] = now - self._connect_started
+                    self._add_packets(video + audio, video, audio, now)
+                # 顺延卡顿截止时间
+                self._stall_deadline.feed(now)
+        except Exception as e:
+            if self.running:
+                logger.error(f"解复用错误: {self.stream_id} {self.stream_name} {self.stream_url}")
+                logger.error(f"解复用错误: {e}")
+        finally:
+            self.container = None
+            source.close()
+            if self.running:
+                self.stop()
 
-            # 设置心跳时间
-            self.heart_beat_time = time.time()
+    def playlist_loop(self):
+        """
+        hls 引擎主循环：条件轮询播放列表，按媒体序列号推进判断存活；采样到期时下载最新分片并完整解复用
+        """
+        first_packet = True
+        session = self.container
+        stopped = self._stopped
+        poll = session.poll
+        if self.timers is not None:
+            poll = self.timers.wrap(PHASE_DEMUX, poll)
+        try:
+            while self.running:
+                now = time.monotonic()
+                try:
+                    new = poll(now)
+                except Exception as e:
+                    # 单次轮询失败不结束会话，持续失败由看门狗判定卡顿
+                    self.hls_stats.playlist_errors += 1
+                    logger.warning(f"播放列表轮询失败: {self.stream_id} {self.stream_name} {self.stream_url}")
+                    logger.warning(f"播放列表轮询失败: {e}")
+                    new = None
+                if new is not None and session.alive(now):
+                    if first_packet:
+                        first_packet = False
+                        self.startup['first_packet'] = now - self._connect_started
+                    self.stats.last_packet_time = now + self._clock_offset
+                    self._publish_stats()
+                    self._stall_deadline.feed(now)
+                if new:
+                    if session.playlist.independent or self._keyframe_segments:
+                        # 分片独立可解码（以关键帧开始），新分片即意味着新的关键帧
+                        self.stats.last_keyframe_time = now + self._clock_offset
+                        self._publish_stats()
+                    last = self._last_segment_sample
+                    if last is None or now - last >= self.hls_sample_interval:
+                        self._last_segment_sample = now
+                        self._sample_segment(session, new[-1])
+                if session.playlist.ended:
+                    break  # 点播列表或直播结束
+                if stopped.wait(session.next_delay()):
+                    break
+        except Exception as e:
+            if self.running:
+                logger.error(f"解复用错误: {self.stream_id} {self.stream_name} {self.stream_url}")
+                logger.error(f"解复用错误: {e}")
+        finally:
+            self.container = None
+            self._decoder = None
+            self._decoder_key = None
+            session.close()
+            if self.running:
+                self.stop()
 
-    def health_check_loop(self):
+    def _sample_segment(self, session, segment):
+        """
+        下载并完整解复用一个分片：更新下载吞吐、按分片大小计算码率，视频包走与 av 引擎相同的分析（关键帧、GOP、
+        帧质量、静止/黑屏检测）；包的到达时间按媒体时间平移到下载完成时刻，分片内不计算到达抖动
+        """
+        hls_stats = self.hls_stats
+        try:
+            data, seconds = session.download(segment)
+        except Exception as e:
+            logger.warning(f"分片下载失败: {self.stream_id} {segment.uri}")
+            logger.warning(f"分片下载失败: {e}")
+            return
+        hls_stats.sampled_segments += 1
+        hls_stats.segment_bytes = len(data)
+        hls_stats.download_seconds = seconds
+        hls_stats.throughput = len(data) * 8 / seconds if seconds > 0 else 0.0
+        hls_stats.download_ratio = seconds / segment.duration if segment.duration > 0 else 0.0
+
+        deep_stats = self.deep_stats
+        if segment.duration > 0:
+            deep_stats.current_bitrate = len(data) * 8 / segment.duration
+            deep_stats.bitrate_history.append(deep_stats.current_bitrate)
+            deep_stats.average_bitrate = deep_stats.bitrate_history.mean()
+
+        timeline = self.timeline = PacketTimeline()
+        arrival = time.monotonic() - segment.duration
+        container = av.open(io.BytesIO(data))
+        total = video = audio = 0
+        try:
+            if deep_stats.codec == 'unknown' or deep_stats.resolution[0] == 0:
+                self._analyze_stream_info(container)
+            first_media = None
+            first_video = True
+            for packet in container.demux():
+                if packet.size == 0:
+                    continue
+                stream = packet.stream
+                timestamp = packet.dts if packet.dts is not None else packet.pts
+                media = float(timestamp * packet.time_base) if timestamp is not None else None
+                if first_media is None and media is not None:
+                    first_media = media
+                now = arrival + (media - first_media if media is not None else 0.0)
+                total += 1
+                if stream.type == 'video':
+                    if first_video:
+                        first_video = False
+                        self._keyframe_segments = packet.is_keyframe
+                    video += 1
+                    if packet.is_keyframe:
+                        self._add_packets(total, video, audio)
+                        total = video = audio = 0
+                    self._analyze_video_packet(packet, stream, now)
+                elif stream.type == 'audio':
+                    audio += 1
+                    if self.audio_analyzer is not None:
+                        self._analyze_audio_packet(packet, now + self._clock_offset)
+        except Exception as e:
+            logger.warning(f"分片解复用失败: {self.stream_id} {segment.uri}")
+            logger.warning(f"分片解复用失败: {e}")
+        finally:
+            container.close()
+            # 最后收包时间由播放列表推进决定，这里只发布计数
+            self._add_packets(total, video, audio)
+        deep_stats.frame_rate = timeline.frame_rate
+        deep_stats.packet_loss = timeline.packet_loss
+        deep_stats.jitter = 0.0
+
+    def health_check_loop(self, stopped=None):
         """
         健康检查循环
+        :param stopped: 本次会话的停止事件
         """
-        check_count = 0
+        stopped = stopped or self._stopped
+        while not stopped.is_set():
+            self.run_health_check()
+            stopped.wait(self.check_interval)
 
-        while self.running:
-            try:
-                health = self.assess_stream_health()
-                check_count += 1
+    def run_health_check(self):
+        """
+        执行一次健康检查
+        """
+        try:
+            self.report_health(self.assess_stream_health())
+        except Exception as e:
+            logger.error(f"健康检查错误: {self.stream_id} {self.stream_name} {self.stream_url}")
+            logger.error(f"健康检查错误: {e}")
 
-                # 打印状态
-                self.print_status(health, check_count)
+    def metrics_snapshot(self):
+        """
+        stats 与 deep_stats 的扁平快照，供状态上报与指标导出；包计数为一致快照，全程不加锁
+        """
+        snapshot = self.packet_snapshot()
+        start_time = snapshot['start_time']
+        snapshot['start_time'] = start_time.timestamp() if start_time else None
+        deep_stats = self.deep_stats
+        for key in SNAPSHOT_DEEP_STATS:
+            snapshot[key] = deep_stats[key]
+        snapshot['width'], snapshot['height'] = deep_stats.resolution
+        startup = self.startup
+        snapshot['open_profile'] = startup['profile']
+        snapshot['open_seconds'] = startup['open']
+        snapshot['first_packet_seconds'] = startup['first_packet']
+        snapshot['first_keyframe_seconds'] = startup['first_keyframe']
+        latency = self.latency_status()
+        snapshot['live_delay'], snapshot['delay_growth'], snapshot['end_to_end_delay'], _ = latency or (None,) * 4
+        analyzer = self.audio_analyzer
+        if analyzer is not None:
+            snapshot['audio_rms_dbfs'] = analyzer.rms_dbfs
+            snapshot['audio_peak_dbfs'] = analyzer.peak_dbfs
+            snapshot['audio_clip_ratio'] = analyzer.clipped if analyzer.windows else None
+            snapshot['audio_windows'] = analyzer.windows
+        hls_stats = self.hls_stats
+        if hls_stats is not None:
+            for key in HlsStats.__slots__:
+                snapshot['hls_' + key] = hls_stats[key]
+        return snapshot
+
+    def report_health(self, health):
+        """
+        输出一次健康检查结果（逐流检查或 MonitorManager 批量评估）
+        """
+        self.check_count += 1
 
-                # 记录质量历史
-                self.quality_history.append(health['quality'])
-            except Exception as e:
-                logger.error(f"健康检查错误: {self.stream_id} {self.stream_name} {self.stream_url}")
-                logger.error(f"健康检查错误: {e}")
+        # 打印状态
+        self.print_status(health, self.check_count)
 
-            time.sleep(self.check_interval)
+        # 记录质量历史
+        self.quality_history.append(health['quality'])
 
     def print_status(self, health, check_count):
         """
         打印增强版监控信息
         """
         timestamp = datetime.now().strftime('%m/%d/%y %H:%M:%S')
+        stats = self.packet_snapshot()
         delay_display = f"{health['estimated_delay']}" if health['estimated_delay'] else "N/A"
 
         # 格式化码率显示
@@ -439,8 +1129,8 @@ class StreamMonitor:
             "playable": health['playable'],
             "quality": health['quality'],
             "delay": delay_display,
-            "videoPackets": self.stats['video_packets'],
-            "keyframes": self.stats['keyframes'],
+            "videoPackets": stats['video_packets'],
+            "keyframes": stats['keyframes'],
             "count": check_count,
             "timestamp": timestamp,
             # 深度分析数据
@@ -450,50 +1140,62 @@ class StreamMonitor:
             "resolution": resolution_display,
             "codec": self.deep_stats['codec'],
             "gopSize": self.deep_stats['gop_size'],
-            "bitrateStability": health['bitrate_stability']
+            "jitter": round(self.deep_stats['jitter'], 1),
+            "packetLoss": round(self.deep_stats['packet_loss'], 2),
+            "bitrateStability": health['bitrate_stability'],
+            "blackSeconds": health['black_seconds'],
+            "frozenSeconds": health['frozen_seconds'],
+            "silentSeconds": health['silent_seconds'],
+            "clipping": health['clipping']
         }
 
-        logger.info(monitor_data)
-
-        # 增强的状态显示
-        logger.info(f"\n 检查 #{check_count:03d} {self.stream_id} {self.stream_name} ({self.stream_url})"
-                    f"\n 可播放: {health['playable']} | 质量: {health['quality']:6}"
-                    f"\n 视频包: {self.stats['video_packets']} | 关键帧: {self.stats['keyframes']}"
-                    f"\n 码率: {current_bitrate_kbps:.1f}kbps (平均: {avg_bitrate_kbps:.1f}kbps) | 稳定性: {health['bitrate_stability']}"
-                    f"\n 帧率: {self.deep_stats['frame_rate']:.1f}fps | 分辨率: {resolution_display}"
-                    f"\n 编码: {self.deep_stats['codec']} | GOP: {self.deep_stats['gop_size']}帧")
+        # 指标日志：每次检查一行 JSON（未配置 metrics_file 时不输出）
+        if metrics_logger.isEnabledFor(logging.INFO):
+            metrics_logger.info(monitor_data)
+
+        # 告警级别与消息由健康规则决定
+        alert_level, message = self.health_rules.alert(self.stream_id, health)
+
+        # 增强的状态显示：按流采样，状态变化时立即输出；格式化在日志后台线程完成
+        if logger.isEnabledFor(logging.INFO) and status_sampler.allow(self.stream_id,
+                                                                      (health['playable'], alert_level)):
+            logger.info("\n 检查 #%03d %s %s (%s)"
+                        "\n 可播放: %s | 质量: %-6s"
+                        "\n 视频包: %s | 关键帧: %s"
+                        "\n 码率: %.1fkbps (平均: %.1fkbps) | 稳定性: %s"
+                        "\n 帧率: %.1ffps | 分辨率: %s"
+                        "\n 编码: %s | GOP: %s帧%s",
+                        check_count, self.stream_id, self.stream_name, self.stream_url,
+                        health['playable'], health['quality'],
+                        stats['video_packets'], stats['keyframes'],
+                        current_bitrate_kbps, avg_bitrate_kbps, health['bitrate_stability'],
+                        self.deep_stats['frame_rate'], resolution_display,
+                        self.deep_stats['codec'], self.deep_stats['gop_size'],
+                        ''.join(f"\n {issue}" for issue in health['issues']))
 
         # 发送 Webhook 警报
-        if not monitor_data['playable']:  # 流不可播放时发送
-            message = f"stream {self.stream_id} can not be played."
-            alert_level = "error"
-        elif monitor_data['quality'] == 'poor':  # 质量差时发送
-            message = f"stream {self.stream_id} quality is poor."
-            alert_level = "warning"
-        elif monitor_data['bitrateStability'] == 'unstable':  # 码率不稳定
-            message = f"stream {self.stream_id} bitrate is unstable."
-            alert_level = "warning"
-        else:
-            message = f"stream {self.stream_id} running OK."
-            alert_level = "info"
-
-        self.webhook_sender.send_alert({
+        self._send_alert({
             **monitor_data,
             "message": message,
             "alertLevel": alert_level
         })
 
-        # 显示问题
-        for issue in health['issues']:
-            logger.info(f" {issue}")
+    def _send_alert(self, data):
+        """
+        发送 Webhook 警报（异步模式下只入队）
+        """
+        self.webhook_sender.send_alert(data)
 
     def stop(self):
         """
         停止监控
         """
+        # 只发出停止信号：解复用线程在下一个包或读取超时时退出并关闭容器
+        self._stopped.set()
+        if not self.running:
+            return
         self.running = False
-        if self.container:
-            self.container.close()
+        status_sampler.forget(self.stream_id)
 
         # 打印详细总结
         total_time = (datetime.now() - self.stats['start_time']).seconds if self.stats['start_time'] else 0
@@ -507,4 +1209,5 @@ class StreamMonitor:
                     f"\n平均帧率: {self.deep_stats['frame_rate']:.1f} fps"
                     f"\n分辨率: {self.deep_stats['resolution'][0]}x{self.deep_stats['resolution'][1]}"
                     f"\n编码: {self.deep_stats['codec']} ({self.deep_stats['profile']})"
+                    f"\n解码: {self.deep_stats['decode_count']} 次, CPU {self.deep_stats['decode_cpu'] * 1000:.1f} ms"
                     f"\n🛑 流监控已停止")
\ No newline at end of file
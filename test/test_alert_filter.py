@@ -0,0 +1,46 @@
+from config.AlertFilter import AlertFilter
+
+
+def record(level, stream_id="s1"):
+    return {'streamId': stream_id, 'alertLevel': level, 'playable': level != 'error', 'bitrate': 500.0,
+            'frameRate': 25.0}
+
+
+def test_steady_state_is_suppressed():
+    alert_filter = AlertFilter(hysteresis=1, min_hold=0)
+    assert all(alert_filter.observe(record('info'), now=t) is None for t in range(100))
+    assert alert_filter.stats == {'observed': 100, 'emitted': 0}
+
+
+def test_hysteresis_and_recovery():
+    alert_filter = AlertFilter(hysteresis=2, min_hold=0)
+    assert alert_filter.observe(record('error'), now=0) is None
+    # 单次抖动不切换
+    assert alert_filter.observe(record('info'), now=1) is None
+    assert alert_filter.observe(record('error'), now=2) is None
+    alert = alert_filter.observe(record('error'), now=3)
+    assert alert['transition'] == 'ok->error' and alert['previousLevel'] == 'info'
+    assert alert_filter.observe(record('error'), now=4) is None
+    alert_filter.observe(record('info'), now=5)
+    assert alert_filter.observe(record('info'), now=6)['transition'] == 'error->ok'
+
+
+def test_min_hold_delays_transition():
+    alert_filter = AlertFilter(hysteresis=1, min_hold=30)
+    assert alert_filter.observe(record('warning'), now=0)['transition'] == 'ok->warning'
+    assert alert_filter.observe(record('error'), now=10) is None
+    assert alert_filter.observe(record('error'), now=31)['transition'] == 'warning->error'
+
+
+def test_digest():
+    alert_filter = AlertFilter(digest_interval=60)
+    start = alert_filter._last_digest
+    alert_filter.observe(record('info', 'a'), now=start)
+    alert_filter.observe(record('error', 'b'), now=start)
+    assert alert_filter.take_digest(now=start + 1) is None
+    digest = alert_filter.take_digest(now=start + 60)
+    assert digest['type'] == 'stream_monitor_digest'
+    assert digest['data']['total'] == 2
+    assert digest['data']['levels'] == {'info': 1, 'warning': 0, 'error': 1}
+    assert ['b', 'error', False, 500.0, 25.0] in digest['data']['streams']
+    assert alert_filter.take_digest(now=start + 61) is None
@@ -0,0 +1,100 @@
+import av
+import numpy as np
+
+from benchmark.synthetic import Event, generate_stream
+from monitor.AudioAnalyzer import AudioAnalyzer, planar_float
+from monitor.StreamMonitor import StreamMonitor
+
+
+class RecordingSender:
+    def __init__(self):
+        self.alerts = []
+
+    def send_alert(self, data):
+        self.alerts.append(data)
+
+
+def test_planar_float_and_windows():
+    packed = av.AudioFrame.from_ndarray(np.array([[16384, -32768, 0, 32767]], dtype=np.int16), format='s16',
+                                        layout='stereo')
+    samples = planar_float(packed)
+    assert samples.shape == (2, 2) and samples.dtype == np.float32
+    assert samples.tolist() == [[0.5, 0.0], [-1.0, 32767 / 32768]]
+    planar = av.AudioFrame.from_ndarray(np.full((2, 8), 0.25, dtype=np.float32), format='fltp', layout='stereo')
+    assert np.array_equal(planar_float(planar), np.full((2, 8), 0.25, dtype=np.float32))
+
+    analyzer = AudioAnalyzer(window=0.1, interval=1, silence_seconds=2)
+    tone = np.sin(np.linspace(0, 200, 2 * 400, dtype=np.float32)).reshape(2, 400) * 0.5
+    quiet = np.zeros((2, 400), dtype=np.float32)
+
+    def window(samples, now):
+        # 第一帧只预热解码器，其后 1000 个采样（0.1 秒）组成窗口
+        assert analyzer.wants(now)
+        for _ in range(4):
+            analyzer.feed(samples, 10000, now)
+        assert not analyzer.wants(now + 0.5)
+
+    window(tone, 100.0)
+    assert analyzer.windows == 1 and -10 < analyzer.rms_dbfs < -8 and not analyzer.clipping
+    window(quiet, 101.0)
+    window(quiet, 102.0)
+    assert analyzer.status(102.5) == {'silent_seconds': 1.5, 'silent': False, 'clipping': False, 'clip_ratio': 0.0}
+    assert analyzer.status(103.0)['silent']
+    window(np.clip(tone * 4, -1, 1), 103.0)
+    status = analyzer.status(103.5)
+    assert not status['silent'] and status['clipping'] and status['clip_ratio'] > 0.3
+
+    # 重连后的新会话：削波判定不保持，静音从新的窗口重新计时
+    window(quiet, 104.0)
+    analyzer.reset()
+    assert analyzer.status(110.0) == {'silent_seconds': 0, 'silent': False, 'clipping': False, 'clip_ratio': 0.0}
+    assert analyzer.wants(110.0)
+
+
+def test_sampled_audio_raises_silence_and_clipping_alerts():
+    events = [Event('silence', 1, 3), Event('clip', 5, 1)]
+    media = generate_stream(seconds=7, fps=10, gop=10, width=160, height=96, events=events)
+    sender = RecordingSender()
+    monitor = StreamMonitor('a1', 'demo', media.path, webhook_sender=sender, picture_detection={'enabled': False},
+                            audio_analysis={'interval': 0.5, 'window_seconds': 0.25, 'silence_seconds': 2,
+                                            'cpu_budget': 1.0})
+    offset = monitor._clock_offset
+    checks = {3.9: None, 5.9: None, 6.9: None}
+    container = av.open(media.path)
+    try:
+        for packet in container.demux(container.streams.audio[0]):
+            if packet.dts is None:
+                continue
+            # 按媒体时间到达
+            media_time = float(packet.dts * packet.time_base)
+            monitor._on_audio_packet(packet, packet.stream, media_time)
+            for at in checks:
+                if checks[at] is None and media_time >= at:
+                    checks[at] = monitor.assess_stream_health(at + offset)
+    finally:
+        container.close()
+
+    silent, clipping, recovered = checks.values()
+    assert silent['silent'] and silent['silent_seconds'] >= 2 and silent['quality'] == 'poor'
+    assert '静音' in silent['issues'][-1]
+    assert not clipping['silent'] and clipping['clipping'] and clipping['quality'] == 'fair'
+    assert not recovered['silent'] and not recovered['clipping']
+    assert monitor.audio_analyzer.windows >= 10 and monitor.metrics_snapshot()['audio_rms_dbfs'] > -20
+
+    # 告警经 WebhookSender 发出
+    monitor.report_health(silent)
+    monitor.report_health(clipping)
+    assert [(alert['alertLevel'], alert['message'], alert['silentSeconds']) for alert in sender.alerts] == [
+        ('error', f"stream a1 audio is silent for {silent['silent_seconds']}s.", silent['silent_seconds']),
+        ('warning', 'stream a1 audio is clipping.', 0)]
+
+    # 预算耗尽时跳过音频包，不解码
+    monitor.audio_budget.tokens = monitor.audio_budget.fraction = -1.0
+    windows = monitor.audio_analyzer.windows
+    container = av.open(media.path)
+    try:
+        for packet in container.demux(container.streams.audio[0]):
+            monitor._on_audio_packet(packet, packet.stream, 100.0)
+    finally:
+        container.close()
+    assert monitor.audio_analyzer.windows == windows and monitor.audio_budget.skipped > 0
@@ -1,7 +1,13 @@
+import sys
+
 import av
 
+from benchmark.synthetic import generate_stream
+
 if __name__ == '__main__':
-    c = av.open("https://bt-01-pull.g33-video.com/nw35/8-351.flv")
+    # 默认打开本地合成流，可传入地址检查外部流
+    url = sys.argv[1] if len(sys.argv) > 1 else generate_stream(seconds=5, width=320, height=180).path
+    c = av.open(url)
     print("Open OK")
     c.close()
     print("Close OK")
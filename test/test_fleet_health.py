@@ -0,0 +1,48 @@
+import random
+
+from monitor.FleetHealth import FleetHealthEvaluator
+from monitor.StreamMonitor import StreamMonitor
+
+
+def random_monitor(rng, index, now):
+    monitor = StreamMonitor(f"s{index}", f"s{index}", f"http://127.0.0.1/live/s{index}.flv",
+                            picture_detection={'enabled': rng.random() < 0.8},
+                            audio_analysis={'enabled': rng.random() < 0.8})
+    monitor.stats.last_packet_time = rng.choice([None, now - rng.uniform(0, 20)])
+    monitor.stats.last_keyframe_time = rng.choice([None, now - rng.uniform(0, 60)])
+    monitor._publish_stats()
+    monitor.deep_stats.frame_rate = rng.choice([0, 10, 15, 20, 24, 25, rng.uniform(0, 60)])
+    monitor.deep_stats.gop_size = rng.choice([0, 5, 10, 50, 300, 301])
+    base = rng.uniform(1e5, 5e6)
+    spread = rng.choice([0, 0.1, 0.3, 0.8])
+    for _ in range(rng.randint(0, 70)):
+        monitor.deep_stats.bitrate_history.append(base * (1 + rng.uniform(-spread, spread)))
+    detector = monitor.picture_detector
+    if detector is not None:
+        detector.black_since = rng.choice([None, now - rng.uniform(0, 10)])
+        detector.frozen_since = rng.choice([None, now - rng.uniform(0, 20)])
+    analyzer = monitor.audio_analyzer
+    if analyzer is not None:
+        analyzer.silent_since = rng.choice([None, now - rng.uniform(0, 20)])
+        analyzer.clipped = rng.choice([0.0, 0.05])
+        analyzer.clipping = analyzer.clipped > analyzer.clip_ratio
+    if rng.random() < 0.7:
+        latency = monitor.timeline.latency
+        latency.base = latency.first_relative = 0.0
+        latency.media_end = now - monitor._clock_offset - rng.choice([0.2, 3, 6, rng.uniform(0, 10)])
+        latency.growth = rng.choice([0.0, 0.05, 0.2, rng.uniform(-0.1, 0.3)])
+        latency.encoder_base = rng.choice([None, -1.5])
+    return monitor
+
+
+def test_fleet_evaluation_matches_scalar():
+    rng = random.Random(7)
+    now = 1_700_000_000.0
+    monitors = [random_monitor(rng, i, now) for i in range(400)]
+    expected = [monitor.assess_stream_health(now) for monitor in monitors]
+    assert FleetHealthEvaluator().evaluate(monitors, now) == expected
+    assert {h['quality'] for h in expected} == {'good', 'fair', 'poor'}
+    assert {h['bitrate_stability'] for h in expected} == {'stable', 'moderate', 'unstable'}
+    assert {h['buffer_bloat'] for h in expected} == {True, False}
+    assert {(h['silent'], h['clipping']) for h in expected} == {(True, True), (True, False), (False, True),
+                                                                (False, False)}
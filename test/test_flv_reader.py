@@ -0,0 +1,105 @@
+import random
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import av
+
+from benchmark.synthetic import SyntheticHttpServer, generate_stream
+from monitor.FlvReader import (PACKET_CODED_FRAMES, PACKET_SEQUENCE_HEADER, TAG_SCRIPT, TAG_VIDEO, FlvTagParser,
+                               parse_metadata)
+from monitor.StreamMonitor import ENGINE_AV, ENGINE_LIGHT, StreamMonitor
+
+
+class NullSender:
+    def send_alert(self, data):
+        pass
+
+
+def flv_tag(kind, timestamp, body):
+    header = struct.pack('>B', kind) + len(body).to_bytes(3, 'big') + (timestamp & 0xffffff).to_bytes(3, 'big')
+    header += bytes([timestamp >> 24]) + b'\x00\x00\x00'
+    return header + body + struct.pack('>I', len(body) + 11)
+
+
+def test_parser_matches_demuxer_across_chunk_boundaries():
+    media = generate_stream(seconds=4, fps=10, gop=10, width=160, height=96)
+    container = av.open(media.path)
+    expected = [(int(packet.dts * packet.time_base * 1000), packet.size, packet.is_keyframe)
+                for packet in container.demux() if packet.size]
+    container.close()
+
+    rng = random.Random(1)
+    for _ in range(20):
+        parser = FlvTagParser()
+        tags = []
+        pos = 0
+        while pos < len(media.data):
+            size = rng.choice((1, 2, 5, 11, 19, 300, 65536))
+            tags += parser.feed(bytearray(media.data[pos:pos + size]))
+            pos += size
+        frames = [(tag.timestamp, tag.size, tag.keyframe) for tag in tags
+                  if tag.kind == TAG_VIDEO and tag.packet_type == PACKET_CODED_FRAMES]
+        assert frames == expected
+    metadata = parse_metadata(next(tag.body for tag in tags if tag.kind == TAG_SCRIPT))
+    assert (metadata['width'], metadata['height'], metadata['framerate']) == (160, 96, 10)
+    assert [tag for tag in tags if tag.packet_type == PACKET_SEQUENCE_HEADER][0].codec == 'h264'
+
+    # 增强型 FLV 的 HEVC 关键帧、CodedFramesX、命令帧与扩展时间戳
+    parser = FlvTagParser()
+    data = b'FLV\x01\x01\x00\x00\x00\x09\x00\x00\x00\x00'
+    data += flv_tag(TAG_VIDEO, 0x01000010, bytes([0x91]) + b'hvc1' + b'\x00\x00\x28' + b'\x00' * 100)
+    data += flv_tag(TAG_VIDEO, 40, bytes([0xa3]) + b'hvc1' + b'\x00' * 50)
+    data += flv_tag(TAG_VIDEO, 80, bytes([0x50, 0x00]))
+    tags = parser.feed(data)
+    assert [(tag.timestamp, tag.keyframe, tag.codec, tag.cts, tag.size, tag.packet_type) for tag in tags] == [
+        (0x01000010, True, 'hevc', 40, 100, PACKET_CODED_FRAMES), (40, False, 'hevc', 0, 50, PACKET_CODED_FRAMES)]
+
+
+class ChunkedFlvHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    data = b''
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'video/x-flv')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+        rng = random.Random(2)
+        pos = 0
+        while pos < len(self.data):
+            chunk = self.data[pos:pos + rng.randint(1, 9000)]
+            self.wfile.write(b'%x;ext=1\r\n%s\r\n' % (len(chunk), chunk))
+            pos += len(chunk)
+        self.wfile.write(b'0\r\n\r\n')
+        self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+def test_light_engine_feeds_stats_from_chunked_http():
+    media = generate_stream(seconds=4, fps=10, gop=10, width=160, height=96)
+    ChunkedFlvHandler.data = media.data
+    server = ThreadingHTTPServer(('127.0.0.1', 0), ChunkedFlvHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/live/a.flv"
+        light = StreamMonitor('l1', 'demo', url, webhook_sender=NullSender(), engine=ENGINE_LIGHT)
+        assert light.start_monitoring() and light.engine == ENGINE_LIGHT
+    finally:
+        server.shutdown()
+        server.server_close()
+    stats = light.stats
+    assert (stats.total_packets, stats.video_packets, stats.keyframes) == (40, 40, 4)
+    assert light.deep_stats.codec == 'h264' and light.deep_stats.resolution == (160, 96)
+    assert light.deep_stats.gop_size == 10 and light.startup['first_keyframe'] is not None
+    assert light.timeline.media_end > 3.8 and light.deep_stats.decode_count == 0
+
+    # 非 HTTP 地址与非 FLV 响应都使用 av 引擎
+    assert StreamMonitor('l2', 'demo', media.path, webhook_sender=NullSender(), engine=ENGINE_LIGHT).engine == ENGINE_AV
+    ts = generate_stream(seconds=2, fps=10, gop=10, width=160, height=96, fmt='mpegts')
+    with SyntheticHttpServer(ts, burst_seconds=10) as ts_server:
+        monitor = StreamMonitor('l3', 'demo', ts_server.url('a'), webhook_sender=NullSender(), engine=ENGINE_LIGHT)
+        assert monitor.start_monitoring()
+    assert monitor.engine == ENGINE_AV and monitor.stats.video_packets > 0
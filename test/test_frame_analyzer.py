@@ -0,0 +1,55 @@
+import av
+import numpy as np
+
+from monitor.FrameAnalyzer import FrameAnalyzer, luma_plane
+
+
+def _frame(luma_value, width=320, height=240):
+    yuv = np.full((height * 3 // 2, width), 128, dtype=np.uint8)
+    yuv[:height] = luma_value
+    return av.VideoFrame.from_ndarray(yuv, format='yuv420p')
+
+
+def test_luma_plane_is_a_view_of_the_frame_buffer():
+    frame = _frame(100)
+    luma = luma_plane(frame)
+    assert luma.shape == (240, 320)
+    assert not luma.flags.owndata
+    assert luma.mean() == 100
+
+
+def test_black_and_frozen_detection():
+    analyzer = FrameAnalyzer(stride=2)
+
+    first = analyzer.analyze(_frame(16))
+    assert first['black_frame']
+    assert first['frame_diff'] is None
+    assert not first['frozen_frame']
+
+    second = analyzer.analyze(_frame(16))
+    assert second['frozen_frame']
+
+    third = analyzer.analyze(_frame(120))
+    assert not third['black_frame']
+    assert not third['frozen_frame']
+    assert abs(third['brightness'] - 120) < 1e-6
+    assert third['contrast'] == 0
+
+    # 重连后的新会话不与上一次会话的画面比较
+    analyzer.reset()
+    after = analyzer.analyze(_frame(120))
+    assert after['frame_diff'] is None and not after['frozen_frame']
+
+
+def test_blockiness_detects_8x8_edges():
+    width, height = 256, 64
+    blocky = np.repeat(np.repeat(np.arange(32, dtype=np.uint8)[None, :] * 7, height, axis=0), 8, axis=1)
+    yuv = np.full((height * 3 // 2, width), 128, dtype=np.uint8)
+    yuv[:height] = blocky
+    frame = av.VideoFrame.from_ndarray(yuv, format='yuv420p')
+    assert FrameAnalyzer(stride=1).analyze(frame)['blockiness'] > 4
+
+    smooth = np.tile(np.arange(width, dtype=np.uint8)[None, :], (height, 1))
+    yuv[:height] = smooth
+    frame = av.VideoFrame.from_ndarray(yuv, format='yuv420p')
+    assert FrameAnalyzer(stride=1).analyze(frame)['blockiness'] < 1.5
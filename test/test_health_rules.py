@@ -0,0 +1,70 @@
+import random
+
+from monitor.FleetHealth import FleetHealthEvaluator
+from monitor.HealthRules import HealthRuleBook
+from test.test_fleet_health import random_monitor
+
+CONFIG = {
+    'thresholds': {'no_packet_seconds': 8, 'unknown_threshold': 1},
+    'issues': {'fps_poor': 'fps {fps:.0f} < limit', 'gop_large': '{missing}'},
+    'groups': {
+        'surveillance': {'thresholds': {'fps_poor': 0.5, 'fps_fair': 1, 'gop_max': 3000,
+                                        'no_keyframe_seconds': 120},
+                         'severity': {'poor_quality': 'ignore'}},
+        'sports': {'thresholds': {'no_packet_seconds': 3, 'fps_poor': 25, 'fps_fair': 50},
+                   'severity': {'bitrate_unstable': 'error'},
+                   'messages': {'bitrate_unstable': '{stream_id}: bitrate {bitrate_stability}'}},
+    }
+}
+
+
+def health(**values):
+    base = {'playable': True, 'quality': 'good', 'issues': [], 'estimated_delay': 0, 'bitrate_stability': 'stable',
+            'resolution_stability': 'stable', 'black': False, 'black_seconds': 0, 'frozen': False,
+            'frozen_seconds': 0}
+    base.update(values)
+    return base
+
+
+def test_defaults_keep_alert_levels():
+    rules = HealthRuleBook().resolve()
+    assert rules.alert('s1', health()) == ('info', 'stream s1 running OK.')
+    assert rules.alert('s1', health(playable=False, quality='poor')) == ('error', 'stream s1 can not be played.')
+    assert rules.alert('s1', health(frozen=True, frozen_seconds=12, quality='poor')) == \
+           ('error', 'stream s1 is frozen for 12s.')
+    assert rules.alert('s1', health(bitrate_stability='unstable', quality='poor')) == \
+           ('warning', 'stream s1 quality is poor.')
+    assert rules.issue['no_packets'](limit=rules.no_packet_seconds) == '10秒内无数据包'
+
+
+def test_groups_overrides_and_templates():
+    book = HealthRuleBook(CONFIG)
+    default = book.resolve()
+    assert default.no_packet_seconds == 8 and not hasattr(default, 'unknown_threshold')
+    assert default.issue['fps_poor'](fps=9.6) == 'fps 10 < limit'
+    # 无效模板回退为默认模板
+    assert default.issue['gop_large'](gop=400) == 'GOP过大: 400帧'
+
+    surveillance = book.resolve('surveillance')
+    assert (surveillance.fps_poor, surveillance.no_packet_seconds) == (0.5, 8)
+    assert surveillance.alert('cam', health(quality='poor'))[0] == 'info'
+
+    sports = book.resolve('sports', {'thresholds': {'no_packet_seconds': 2}})
+    assert sports.no_packet_seconds == 2 and sports.fps_fair == 50
+    assert sports.alert('s', health(quality='poor', bitrate_stability='unstable')) == ('error', 's: bitrate unstable')
+    # 相同规则共享编译结果
+    assert book.resolve('surveillance') is surveillance
+    assert book.resolve('unknown').index == default.index
+
+
+def test_fleet_evaluation_matches_scalar_with_groups():
+    book = HealthRuleBook(CONFIG)
+    rng = random.Random(11)
+    now = 1_700_000_000.0
+    monitors = []
+    for i in range(300):
+        monitor = random_monitor(rng, i, now)
+        monitor.health_rules = book.resolve(rng.choice([None, 'surveillance', 'sports']))
+        monitors.append(monitor)
+    expected = [monitor.assess_stream_health(now) for monitor in monitors]
+    assert FleetHealthEvaluator(book).evaluate(monitors, now) == expected
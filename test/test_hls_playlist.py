@@ -0,0 +1,79 @@
+from benchmark.synthetic import SyntheticHlsServer, generate_stream
+from monitor.HlsPlaylist import HlsSession, HlsStats, HttpResult, parse_playlist
+from monitor.StreamMonitor import ENGINE_HLS, ENGINE_LIGHT, StreamMonitor
+
+
+class NullSender:
+    def send_alert(self, data):
+        pass
+
+
+def media_playlist(first, count, target=2, durations=None, ended=False):
+    lines = ['#EXTM3U', f'#EXT-X-TARGETDURATION:{target}', f'#EXT-X-MEDIA-SEQUENCE:{first}']
+    for i in range(count):
+        lines += [f'#EXTINF:{(durations or {}).get(first + i, 2.0)},', f'seg{first + i}.ts']
+    if ended:
+        lines.append('#EXT-X-ENDLIST')
+    return '\n'.join(lines).encode()
+
+
+class ScriptedPool:
+    """按顺序返回预设响应，记录请求头"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.requests.append((url, dict(headers or {})))
+        status, body, etag = self.responses.pop(0)
+        return HttpResult(status, {'etag': etag} if etag else {}, body, 0.01)
+
+
+def test_session_tracks_sequence_and_conditional_polls():
+    variants, playlist = parse_playlist('#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=800000,RESOLUTION=640x360\n'
+                                        'low/index.m3u8\n', 'http://cdn/live/master.m3u8')
+    assert variants == [(800000, 'http://cdn/live/low/index.m3u8')] and playlist is None
+
+    pool = ScriptedPool([
+        (200, b'#EXTM3U\n#EXT-X-STREAM-INF:BANDWIDTH=1\nmedia.m3u8\n', None),
+        (200, media_playlist(10, 3), '"a"'),
+        (304, b'', '"a"'),
+        (200, media_playlist(12, 3), '"b"'),  # 13、14 为新分片
+        (200, media_playlist(17, 3, durations={19: 2.6}), '"c"'),  # 15、16 未观察到；19 超过目标时长
+        (200, media_playlist(0, 2), '"d"'),  # 源站重启
+    ])
+    stats = HlsStats()
+    session = HlsSession('http://cdn/live/master.m3u8', stats, pool=pool)
+    assert session.url == 'http://cdn/live/media.m3u8' and stats.media_sequence == 12
+
+    assert session.poll(1.0) == [] and stats.playlist_not_modified == 1
+    assert pool.requests[-1][1] == {'If-None-Match': '"a"'}
+    assert session.next_delay() == 1.0
+    assert [segment.sequence for segment in session.poll(2.0)] == [13, 14]
+    assert session.next_delay() == 2.0 and session.alive(4.9) and not session.alive(5.1)
+    assert [segment.sequence for segment in session.poll(4.0)] == [17, 18, 19]
+    assert stats.sequence_gaps == 2 and stats.target_duration_violations == 1
+    assert [segment.sequence for segment in session.poll(6.0)] == [1]
+    assert stats.sequence_resets == 1 and stats.segments == 6 and stats.playlist_polls == 4
+
+
+def test_hls_engine_polls_playlist_and_samples_segments():
+    media = generate_stream(seconds=4, fps=10, gop=5, width=160, height=96, fmt='mpegts')
+    with SyntheticHlsServer(media, segment_seconds=0.5, end_after=8) as server:
+        monitor = StreamMonitor('h1', 'demo', server.url('master'), webhook_sender=NullSender(), engine=ENGINE_LIGHT,
+                                hls_sample_interval=1.2)
+        assert monitor.engine == ENGINE_HLS
+        assert monitor.start_monitoring()
+    hls = monitor.hls_stats
+    assert monitor.engine == ENGINE_HLS
+    assert hls.media_sequence == 107 and hls.segments == 7 and hls.sequence_gaps == 0
+    assert hls.playlist_not_modified > 0 and hls.playlist_errors == 0
+    # 只下载采样分片，所有请求复用同一个 keep-alive 连接
+    assert server.segment_requests == hls.sampled_segments and 2 <= hls.sampled_segments <= 4
+    assert server.connections == 1
+    assert monitor.stats.video_packets == 5 * hls.sampled_segments and monitor.stats.keyframes > 0
+    assert monitor.deep_stats.codec == 'h264' and monitor.deep_stats.resolution == (160, 96)
+    assert monitor.deep_stats.current_bitrate > 0 and hls.throughput > 0
+    snapshot = monitor.metrics_snapshot()
+    assert snapshot['hls_media_sequence'] == 107 and snapshot['hls_target_duration'] == 1
@@ -0,0 +1,132 @@
+import os
+import struct
+import tempfile
+import time
+
+from benchmark.fake_stream import FakePacket, FakeStream
+from benchmark.synthetic import SyntheticHttpServer, SyntheticMedia, generate_stream
+from monitor.FlvReader import TAG_SCRIPT, TAG_VIDEO
+from monitor.LatencyEstimator import (SOURCE_PTS, SOURCE_SEI, UUID_SIZE, parse_wallclock, script_wallclock,
+                                     sei_wallclock)
+from monitor.PacketTimeline import PacketTimeline
+from monitor.StreamMonitor import ENGINE_AV, ENGINE_LIGHT, StreamMonitor
+
+UUID = bytes(range(1, 17))
+
+
+class NullSender:
+    def send_alert(self, data):
+        pass
+
+
+def feed(timeline, stream, start, count, arrival, fps=25, gop=50):
+    duration = 1000 // fps
+    for index in range(start, start + count):
+        packet = FakePacket(stream, 1000, index % gop == 0, index * duration, duration)
+        timeline.on_video(packet, stream, arrival(index))
+
+
+def sei_nal(wall_ms):
+    text = str(wall_ms).encode()
+    return bytes([0x06, 5, UUID_SIZE + len(text)]) + UUID + text + b'\x80'
+
+
+def test_live_edge_delay_and_growth():
+    stream = FakeStream('video', 0)
+    timeline = PacketTimeline()
+    latency = timeline.latency
+    # 连接时 3 秒积压在 0.3 秒内突发到达，之后按实时到达，直播边缘由最快到达的包确定
+    feed(timeline, stream, 0, 75, arrival=lambda i: 10 + i * 0.004)
+    feed(timeline, stream, 75, 250, arrival=lambda i: 10.3 + (i - 75) * 0.04 + 0.02 * (i % 2))
+    live_delay, growth, end_to_end, backlog = timeline.latency.status(10.3 + 250 * 0.04)
+    assert live_delay < 0.1 and abs(growth) < 0.01 and end_to_end is None
+    assert abs(backlog - 2.7) < 0.05 and latency.source == SOURCE_PTS
+
+    # 源站积压：每秒媒体到达 1.1 秒，延迟增长约 100ms/s
+    start = 20.3
+    feed(timeline, stream, 325, 250, arrival=lambda i: start + (i - 325) * 0.044)
+    now = start + 250 * 0.044
+    live_delay, growth, _, _ = latency.status(now)
+    assert 0.8 < live_delay < 1.2 and 0.07 < growth < 0.11
+
+    # 无新包时延迟按墙上时间继续增长；时间戳不连续时重新锚定
+    assert abs(latency.status(now + 5)[0] - live_delay - 5) < 1e-6
+    feed(timeline, stream, 0, 10, arrival=lambda i: now + 6 + i * 0.04)
+    assert latency.status(now + 6.4)[0] < 0.05 and latency.growth == 0
+
+    assert parse_wallclock(1_700_000_000_123) == 1_700_000_000.123
+    assert parse_wallclock('2023-11-14T22:13:20.5Z') == 1_700_000_000.5
+    assert parse_wallclock(b'ts=1700000000.25;') == 1_700_000_000.25
+    assert parse_wallclock((1_700_000_000_000_000).to_bytes(8, 'big')) == 1_700_000_000
+    assert parse_wallclock(42) is None and parse_wallclock(True) is None
+    assert script_wallclock({'text': 'hi', 'wallclock': 1_700_000_000_000}) == 1_700_000_000
+    # Annex B 与 AVCC 两种格式；遇到图像 NAL 后不再查找
+    nal = sei_nal(1_700_000_000_123)
+    idr = b'\x65' + b'\x00\x00\x03\x01' * 10
+    assert sei_wallclock(b'\x00\x00\x00\x01' + nal + b'\x00\x00\x01' + idr, 'h264') == 1_700_000_000.123
+    assert sei_wallclock(struct.pack('>I', len(nal)) + nal + struct.pack('>I', len(idr)) + idr,
+                         'h264') == 1_700_000_000.123
+    assert sei_wallclock(struct.pack('>I', len(idr)) + idr + struct.pack('>I', len(nal)) + nal, 'h264') is None
+    assert sei_wallclock(b'\x00\x00\x00\x01' + nal, 'vp9') is None
+
+
+def with_encoder_clock(data, wall):
+    """
+    在每个 AVC 关键帧前插入携带编码器墙上时间（毫秒）的 SEI，并在首个视频标签前插入 onTextData
+    """
+    out = bytearray(data[:13])
+    pos = 13
+    text = b'\x02\x00\x0aonTextData\x08\x00\x00\x00\x01\x00\x04text\x02\x00\x02hi\x00\x00\x09'
+    while pos + 11 <= len(data):
+        kind = data[pos]
+        size = int.from_bytes(data[pos + 1:pos + 4], 'big')
+        timestamp = int.from_bytes(data[pos + 4:pos + 7], 'big') | data[pos + 7] << 24
+        body = data[pos + 11:pos + 11 + size]
+        pos += 11 + size + 4
+        if kind == TAG_VIDEO and text:
+            out += tag(TAG_SCRIPT, timestamp, text)
+            text = None
+        if kind == TAG_VIDEO and body[0] >> 4 == 1 and body[1] == 1:
+            nal = sei_nal(int((wall + timestamp / 1000) * 1000))
+            body = body[:5] + struct.pack('>I', len(nal)) + nal + body[5:]
+        out += tag(kind, timestamp, body)
+    return bytes(out)
+
+
+def tag(kind, timestamp, body):
+    header = struct.pack('>B', kind) + len(body).to_bytes(3, 'big') + (timestamp & 0xffffff).to_bytes(3, 'big')
+    header += bytes([timestamp >> 24]) + b'\x00\x00\x00'
+    return header + body + struct.pack('>I', len(body) + 11)
+
+
+def test_encoder_clock_from_keyframe_sei():
+    media = generate_stream(seconds=4, fps=10, gop=10, width=160, height=96)
+    # 编码器墙上时间比本机慢 10 秒（整段 4 秒突发到达）
+    wall = time.time() - 10
+    fd, path = tempfile.mkstemp(suffix='.flv')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(with_encoder_clock(media.data, wall))
+    try:
+        crafted = SyntheticMedia(path, 'flv', media.seconds, [])
+        with SyntheticHttpServer(crafted, burst_seconds=10) as server:
+            light = StreamMonitor('e1', 'demo', server.url('e1'), webhook_sender=NullSender(), engine=ENGINE_LIGHT)
+            assert light.start_monitoring() and light.engine == ENGINE_LIGHT
+        av_monitor = StreamMonitor('e2', 'demo', path, webhook_sender=NullSender(), engine=ENGINE_AV)
+        assert av_monitor.start_monitoring()
+    finally:
+        os.remove(path)
+
+    for monitor in (light, av_monitor):
+        latency = monitor.timeline.latency
+        assert monitor.stats.keyframes == 4 and latency.source == SOURCE_SEI
+        # encoder_base = 编码器时间(单调时钟) - 媒体时间
+        assert abs(latency.encoder_base - (wall - monitor._clock_offset)) < 0.002
+        health = monitor.assess_stream_health()
+        assert health['end_to_end_delay'] is not None and health['live_delay'] >= 0
+        assert health['delay_growth'] is not None
+        assert monitor.metrics_snapshot()['end_to_end_delay'] > 0
+
+    # 关闭后不读取编码器时间，只有 pts 延迟
+    off = StreamMonitor('e3', 'demo', media.path, webhook_sender=NullSender(), encoder_clock=False)
+    assert off.start_monitoring()
+    assert off.timeline.latency.source == SOURCE_PTS and off.assess_stream_health()['end_to_end_delay'] is None
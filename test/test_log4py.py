@@ -0,0 +1,50 @@
+import json
+import logging
+import pickle
+import queue
+import sys
+
+from config.log4py import DropQueueHandler, ForwardQueueHandler, JsonLinesFormatter, LogSampler
+
+
+def test_sampler_limits_per_key_and_passes_changes():
+    sampler = LogSampler(interval=60)
+    assert sampler.allow('a', 'ok', now=0)
+    assert sampler.allow('b', 'ok', now=0)
+    assert not sampler.allow('a', 'ok', now=30)
+    # 状态变化立即放行
+    assert sampler.allow('a', 'error', now=31)
+    assert not sampler.allow('a', 'error', now=60)
+    assert sampler.allow('a', 'error', now=91)
+    assert LogSampler(0).allow('a', 'ok', now=0) and LogSampler(0).allow('a', 'ok', now=0)
+
+
+def test_queue_handler_is_lazy_and_drops_when_full():
+    handler = DropQueueHandler(queue.Queue(1))
+    record = logging.LogRecord('x', logging.INFO, __file__, 1, "码率 %.1f", (1.25,), None)
+    handler.handle(record)
+    handler.handle(record)
+    queued = handler.queue.get_nowait()
+    assert queued.args == (1.25,) and queued.getMessage() == '码率 1.2'
+    assert handler.dropped == 1
+
+
+def test_json_lines_formatter():
+    formatter = JsonLinesFormatter()
+    record = logging.LogRecord('metrics', logging.INFO, __file__, 1, {'streamId': 's1', 'bitrate': 1.5}, None, None)
+    line = formatter.format(record)
+    assert '\n' not in line and json.loads(line) == {'streamId': 's1', 'bitrate': 1.5}
+
+
+def test_forward_handler_pickles_formatted_records():
+    handler = ForwardQueueHandler(queue.Queue())
+    try:
+        raise ValueError("坏数据")
+    except ValueError:
+        error = logging.LogRecord('root', logging.ERROR, __file__, 1, "解码失败 %s", ('s1',), sys.exc_info())
+    handler.handle(error)
+    handler.handle(logging.LogRecord('metrics', logging.INFO, __file__, 1, {'streamId': 's1'}, None, None))
+    # 跨进程传递需要可序列化：参数与异常已格式化进消息，指标 dict 保持原样
+    error, metrics = (pickle.loads(pickle.dumps(handler.queue.get_nowait())) for _ in range(2))
+    assert error.getMessage().startswith('解码失败 s1\nTraceback') and error.exc_info is None
+    assert metrics.name == 'metrics' and metrics.msg == {'streamId': 's1'}
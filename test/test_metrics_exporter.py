@@ -0,0 +1,53 @@
+import urllib.request
+
+from config.MetricsExporter import CONTENT_TYPE, MetricsExporter
+from job.monitor_manager import MonitorManager
+from monitor.StreamMonitor import StreamMonitor
+
+
+def test_renders_manager_status_as_openmetrics():
+    manager = MonitorManager()
+    manager.add_stream('s"1', 'demo', 'http://127.0.0.1/live/s1.flv', 10)
+    job = manager.monitor_jobs['s"1']
+    monitor = job.monitor = StreamMonitor(job.stream_id, job.stream_name, job.stream_url, webhook_sender=object())
+    monitor.stats.total_packets = 42
+    monitor._publish_stats()
+    monitor.deep_stats.current_bitrate = 1500000.0
+    monitor.deep_stats.jitter = 2.0
+    monitor.deep_stats.codec = 'h264'
+
+    body = MetricsExporter(manager.get_status).refresh().decode()
+    labels = 'stream_id="s\\"1",stream_name="demo"'
+    assert '# TYPE stream_monitor_packets counter\n' in body
+    assert f'stream_monitor_packets_total{{{labels}}} 42\n' in body
+    assert f'stream_monitor_bitrate_bps{{{labels}}} 1500000.0\n' in body
+    assert f'stream_monitor_jitter_seconds{{{labels}}} 0.002\n' in body
+    assert f'stream_monitor_up{{{labels}}} 0\n' in body
+    info = 'codec="h264",profile="unknown",color_space="unknown",open_profile="http"'
+    assert f'stream_monitor_stream_info{{{labels},{info}}} 1\n' in body
+    # 未分析的帧指标不输出
+    assert 'stream_monitor_brightness{' not in body
+    assert body.endswith('# EOF\n')
+
+
+def test_incremental_refresh_and_http():
+    status = {'a': {'running': True, 'stream_name': 'a', 'metrics': {'total_packets': 1, 'frame_rate': 25.0}},
+              'b': {'running': True, 'stream_name': 'b', 'metrics': {'total_packets': 1}}}
+    exporter = MetricsExporter(lambda: status, refresh_interval=3600)
+    exporter.refresh()
+    line = exporter._entries['a'].lines[10]
+    status['a']['metrics']['total_packets'] = 2
+    del status['b']
+    body = exporter.refresh().decode()
+    # 未变化的样本行复用，变化的重新渲染，已移除的流不再输出
+    assert exporter._entries['a'].lines[10] is line
+    assert 'stream_monitor_packets_total{stream_id="a",stream_name="a"} 2\n' in body
+    assert 'stream_id="b"' not in body
+
+    exporter.start('127.0.0.1', 0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{exporter.server.server_address[1]}/metrics") as response:
+            assert response.headers['Content-Type'] == CONTENT_TYPE
+            assert response.read() == exporter.body
+    finally:
+        exporter.stop()
@@ -0,0 +1,54 @@
+import gc
+
+import numpy as np
+
+from monitor.MetricsStore import DeepStats, MetricsStore, PacketStats
+
+
+def test_rolling_stats_match_numpy():
+    store = MetricsStore(capacity=2)
+    history = store.bitrate_history(store.allocate())
+    rng = np.random.default_rng(1)
+    samples = rng.uniform(1e5, 5e6, size=250)
+    for count, value in enumerate(samples, 1):
+        history.append(value)
+        recent = samples[max(0, count - 10):count]
+        mean, std = history.window_stats()
+        assert np.isclose(mean, np.mean(recent)) and np.isclose(std, np.std(recent))
+        assert np.isclose(history.mean(), np.mean(samples[max(0, count - 60):count]))
+    assert len(history) == 60
+    assert np.allclose(list(history), samples[-60:])
+
+
+def test_rows_grow_and_are_released_with_owner():
+    class Owner:
+        pass
+
+    store = MetricsStore(capacity=2)
+    owners = [Owner() for _ in range(5)]
+    rows = [store.allocate(owner=owner) for owner in owners]
+    assert len(set(rows)) == 5 and store.capacity == 8
+    store.bitrate_history(rows[0]).append(1.0)
+    del owners[0]
+    gc.collect()
+    assert not store.active[rows[0]]
+    # 复用的行已清空
+    assert store.allocate() == rows[0] and len(store.bitrate_history(rows[0])) == 0
+
+
+def test_quality_history_labels():
+    store = MetricsStore(capacity=1)
+    quality = store.quality_history(store.allocate())
+    for level in ['good', 'poor', 'fair']:
+        quality.append(level)
+    assert list(quality) == ['good', 'poor', 'fair']
+
+
+def test_slot_records_keep_dict_access():
+    stats = PacketStats()
+    stats['total_packets'] += 2
+    assert stats.total_packets == 2 and stats.get('missing', 1) == 1
+    deep_stats = DeepStats(bitrate_history=None)
+    deep_stats.update({'brightness': 40.0, 'resolution': (1280, 720)})
+    assert deep_stats['resolution'] == (1280, 720)
+    assert 'current_bitrate' in deep_stats and deep_stats.as_dict()['brightness'] == 40.0
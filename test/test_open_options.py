@@ -0,0 +1,29 @@
+from monitor.OpenOptions import OpenProfiles, protocol_profile
+
+
+def test_protocol_profile():
+    assert protocol_profile('https://demo.com/nw35/8-351.flv') == 'http'
+    assert protocol_profile('http://demo.com/live/index.M3U8?token=1') == 'hls'
+    assert protocol_profile('rtmp://demo.com/live/a') == 'rtmp'
+    assert protocol_profile('rtsp://10.0.0.1/stream1') == 'rtsp'
+    assert protocol_profile('/data/sample.flv') == 'file'
+
+
+def test_resolve_merges_profiles_timeouts_and_overrides():
+    profiles = OpenProfiles({'read_timeout': 5, 'open_timeout': 8,
+                             'profiles': {'rtmp': {'rtmp_buffer': 500}, 'low_latency': {'fflags': 'nobuffer'}}})
+    spec = profiles.resolve('rtmp://demo.com/live/a')
+    assert spec.profile == 'rtmp' and spec.timeout == (8.0, 5.0)
+    assert spec.options == {'rtmp_live': 'live', 'rtmp_buffer': '500', 'rw_timeout': '5000000'}
+    assert spec.select() is spec.options
+    # 快速起播叠加在协议 profile 之上
+    assert spec.select(fast=True)['probesize'] == '65536' and spec.select(fast=True)['rtmp_live'] == 'live'
+
+    rtsp = profiles.resolve('rtsp://10.0.0.1/s', fast_start=True, overrides={'rtsp_transport': 'udp'})
+    assert rtsp.options['timeout'] == '5000000' and rtsp.options['rtsp_transport'] == 'udp'
+    assert rtsp.select() is rtsp.fast_options and rtsp.fast_options['rtsp_transport'] == 'udp'
+
+    custom = profiles.resolve('http://demo.com/a.flv', profile='low_latency')
+    assert custom.profile == 'low_latency' and custom.options == {'fflags': 'nobuffer', 'rw_timeout': '5000000'}
+    assert profiles.resolve('/data/a.flv', profile='missing').profile == 'file'
+    assert profiles.resolve('/data/a.flv').options == {}
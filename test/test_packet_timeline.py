@@ -0,0 +1,43 @@
+from benchmark.fake_stream import FakePacket, FakeStream
+from monitor.PacketTimeline import PacketTimeline
+
+
+def feed(timeline, stream, count, arrival, start=0, fps=25, gop=50, size=1000, skip=()):
+    duration = 1000 // fps
+    for index in range(start, start + count):
+        if index in skip:
+            continue
+        packet = FakePacket(stream, size, index % gop == 0, index * duration, duration)
+        timeline.on_video(packet, stream, arrival(index))
+
+
+def test_burst_arrival_does_not_distort_measurements():
+    stream = FakeStream('video', 0)
+    timeline = PacketTimeline()
+    timeline.take_bitrate(0.0)
+    # 4 秒的媒体数据在 0.1 秒内突发到达
+    feed(timeline, stream, 101, arrival=lambda i: i * 0.001)
+    assert abs(timeline.frame_rate - 25) < 1e-6
+    assert timeline.gop_size == 50
+    assert abs(timeline.gop_duration - 2.0) < 1e-6
+    assert abs(timeline.take_bitrate(0.2) - 101 * 1000 * 8 / 4.04) < 1e-6
+    assert timeline.jitter > 0.01
+    assert timeline.lost == 0
+
+
+def test_steady_arrival_jitter_and_loss():
+    stream = FakeStream('video', 0)
+    timeline = PacketTimeline()
+    feed(timeline, stream, 100, arrival=lambda i: i * 0.04, skip={20, 21, 22})
+    assert timeline.jitter < 1e-6
+    assert timeline.lost == 3
+    assert abs(timeline.packet_loss - 3.0) < 1e-6
+
+
+def test_timestamp_reset_is_not_loss():
+    stream = FakeStream('video', 0)
+    timeline = PacketTimeline()
+    feed(timeline, stream, 60, arrival=lambda i: i * 0.04, start=1000)
+    feed(timeline, stream, 60, arrival=lambda i: 100 + i * 0.04)
+    assert timeline.lost == 0
+    assert abs(timeline.frame_rate - 25) < 1e-6
@@ -0,0 +1,54 @@
+import numpy as np
+
+from monitor.PictureDetector import CpuBudget, PictureDetector, dhash64, _grid
+
+
+def _scene(seed, height=360, width=640):
+    return np.random.default_rng(seed).integers(30, 220, size=(height, width), dtype=np.uint8)
+
+
+def test_dhash_is_stable_and_discriminative():
+    a, b = _scene(1), _scene(2)
+    assert dhash64(_grid(a)) == dhash64(_grid(a.copy()))
+    assert bin(dhash64(_grid(a)) ^ dhash64(_grid(b))).count('1') > 10
+
+
+def test_frozen_after_threshold_and_reset_on_change():
+    detector = PictureDetector(frozen_seconds=10)
+    still = _scene(3)
+    for t in range(0, 12, 2):
+        detector.feed(still, now=100 + t)
+
+    status = detector.status(now=111)
+    assert status['frozen']
+    assert status['frozen_seconds'] == 11
+    assert not status['black']
+
+    detector.feed(_scene(4), now=112)
+    assert detector.status(now=112)['frozen_seconds'] == 0
+
+
+def test_black_takes_precedence_over_frozen():
+    detector = PictureDetector(black_seconds=5, frozen_seconds=5)
+    black = np.full((360, 640), 16, dtype=np.uint8)
+    for t in range(0, 8, 2):
+        detector.feed(black, now=t)
+
+    status = detector.status(now=7)
+    assert status['black']
+    assert status['black_seconds'] == 7
+    assert not status['frozen']
+
+    # 重连后的新会话不继承断开前的黑屏/静止起点
+    detector.reset()
+    detector.feed(black, now=100)
+    status = detector.status(now=101)
+    assert status['black_seconds'] == 1 and not status['black'] and not status['frozen']
+
+
+def test_cpu_budget_skips_when_exhausted():
+    budget = CpuBudget(fraction=0.001, burst=0.01)
+    assert budget.available()
+    budget.charge(0.02)
+    assert not budget.available()
+    assert budget.skipped == 1
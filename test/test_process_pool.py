@@ -0,0 +1,71 @@
+import time
+from collections import Counter
+
+from benchmark.synthetic import SyntheticHttpServer, generate_stream
+from job.process_pool import HashRing, ShardedMonitorManager
+
+
+def test_hash_ring_is_stable_and_balanced():
+    stream_ids = [f"video{i}" for i in range(2000)]
+    ring = HashRing(4)
+
+    assignment = {stream_id: ring.worker_for(stream_id) for stream_id in stream_ids}
+    assert assignment == {stream_id: HashRing(4).worker_for(stream_id) for stream_id in stream_ids}
+
+    counts = Counter(assignment.values())
+    assert set(counts) == {0, 1, 2, 3}
+    assert min(counts.values()) > len(stream_ids) / 4 * 0.6
+
+
+def test_hash_ring_moves_few_streams_when_workers_change():
+    stream_ids = [f"video{i}" for i in range(2000)]
+    before = HashRing(4)
+    after = HashRing(5)
+
+    moved = [s for s in stream_ids if before.worker_for(s) != after.worker_for(s)]
+    # 理想情况迁移 1/5，且只迁往新增的工作进程
+    assert len(moved) < len(stream_ids) * 0.35
+    assert all(after.worker_for(s) == 4 for s in moved)
+
+
+def wait_for(condition, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        value = condition()
+        if value:
+            return value
+        time.sleep(0.1)
+    raise AssertionError("等待超时")
+
+
+def test_worker_reports_status_and_restarts_with_its_shard():
+    media = generate_stream(seconds=60, fps=10, gop=10, width=160, height=96)
+    with SyntheticHttpServer(media, burst_seconds=1) as server:
+        manager = ShardedMonitorManager(workers=2, report_interval=0.2)
+        stream_ids = [f"p{i}" for i in range(4)]
+        for stream_id in stream_ids:
+            manager.add_stream(stream_id, stream_id, server.url(stream_id), check_interval=1,
+                               picture_detection={'enabled': False})
+        worker = manager.workers[manager.ring.worker_for(stream_ids[0])]
+        shard = sorted(worker.stream_ids)
+        manager.start_all()
+        try:
+            def reported(since):
+                # 工作进程经管道上报的状态：该进程负责的流都已收到数据包
+                status = manager.get_status()
+                return all(status[s]['running'] and status[s].get('reported_at', 0) > since
+                           and status[s]['total_packets'] > 0 for s in shard) and status
+
+            status = wait_for(lambda: reported(worker.started_at))
+            assert {s for s in stream_ids if status[s]['worker'] == worker.index} == set(shard)
+
+            pid = worker.process.pid
+            worker.process.kill()
+            wait_for(lambda: not manager.get_status()[shard[0]]['running'])
+            # 主循环发现流停止后调用 start_stream，整体重启该进程及其负责的全部流
+            assert manager.start_stream(shard[0])
+            assert worker.process.pid != pid and sorted(worker.stream_ids) == shard
+            wait_for(lambda: reported(worker.started_at))
+        finally:
+            manager.stop_all()
+    assert not any(w.is_alive() for w in manager.workers)
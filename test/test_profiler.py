@@ -0,0 +1,56 @@
+import threading
+
+from benchmark.synthetic import generate_stream
+from job.monitor_manager import MonitorManager
+from monitor.Profiler import PhaseTimers, sample_stacks, write_folded
+from monitor.StreamMonitor import StreamMonitor
+
+
+class NullSender:
+    def send_alert(self, data):
+        pass
+
+
+def test_phase_timers_only_wrap_when_enabled():
+    path = generate_stream(seconds=4, fps=10, gop=10, width=160, height=96).path
+    plain = StreamMonitor('p0', 'demo', path, webhook_sender=NullSender())
+    assert plain.timers is None and '_analyze_video_packet' not in vars(plain)
+
+    monitor = StreamMonitor('p1', 'demo', path, webhook_sender=NullSender(), profiling=True)
+    assert monitor.start_monitoring()
+    phases = monitor.timers.snapshot()
+    assert phases['demux']['calls'] == monitor.stats.total_packets > 0
+    assert phases['packet']['calls'] == monitor.stats.video_packets
+    assert phases['decode']['calls'] == monitor.deep_stats.decode_count > 0
+    assert phases['decode']['wall_ns'] > 0 and phases['decode']['cpu_ns'] > 0
+    assert phases['demux']['cpu_ns'] is None
+
+    timers = PhaseTimers()
+    report = timers.wrap('report', lambda value: value * 2)
+    assert report(21) == 42
+    assert timers.snapshot()['report']['calls'] == 1
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sample_stacks_writes_folded_profile(tmp_path):
+    stop = threading.Event()
+    thread = threading.Thread(target=busy_loop, args=(stop,), name='demux-s1', daemon=True)
+    thread.start()
+    try:
+        stacks = sample_stacks(lambda: [thread], seconds=0.3, interval=0.005)
+    finally:
+        stop.set()
+        thread.join()
+    assert sum(stacks.values()) > 10
+    path = tmp_path / 'profile.folded'
+    write_folded(stacks, str(path))
+    lines = path.read_text(encoding='utf-8').splitlines()
+    stack, count = lines[0].rsplit(' ', 1)
+    assert stack.startswith('demux;') and 'busy_loop (test_profiler.py:' in stack and int(count) > 0
+
+    manager = MonitorManager()
+    assert manager.profile_stream('missing') is None
@@ -0,0 +1,42 @@
+import random
+
+from monitor.ReconnectPolicy import CLOSED, HALF_OPEN, OPEN, OpenLimiter, ReconnectPolicy
+
+
+def test_backoff_grows_with_jitter_and_resets():
+    policy = ReconnectPolicy(base_delay=1, max_delay=8, failure_threshold=100, rng=random.Random(1))
+    assert policy.next_delay() == 0
+    delays = []
+    for _ in range(6):
+        policy.record(False)
+        delays.append(policy.next_delay())
+    for delay, cap in zip(delays, (1, 2, 4, 8, 8, 8)):
+        assert cap / 2 <= delay <= cap
+    # 连接成功但很快断开仍按失败退避
+    policy.record(True, duration=5)
+    assert policy.failures == 7
+    policy.record(True, duration=30)
+    assert policy.failures == 0 and policy.next_delay() == 0
+
+
+def test_circuit_breaker():
+    policy = ReconnectPolicy(failure_threshold=3, open_seconds=60, rng=random.Random(2))
+    for _ in range(3):
+        policy.next_delay()
+        policy.record(False)
+    assert policy.state == OPEN
+    assert 30 <= policy.next_delay() <= 60 and policy.state == HALF_OPEN
+    # 试探失败立即再次熔断
+    policy.record(False)
+    assert policy.state == OPEN and policy.stats['opened'] == 2
+    policy.next_delay()
+    policy.record(True, duration=60)
+    assert policy.state == CLOSED and policy.failures == 0
+
+
+def test_open_limiter():
+    limiter = OpenLimiter(2)
+    assert limiter.acquire(0) and limiter.acquire(0)
+    assert not limiter.acquire(0.01)
+    limiter.release()
+    assert limiter.acquire(0)
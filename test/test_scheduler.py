@@ -0,0 +1,66 @@
+import threading
+import time
+
+from job.scheduler import MonitorScheduler
+
+
+def test_tasks_run_in_due_order_and_repeat():
+    scheduler = MonitorScheduler("test-order")
+    runs = []
+    scheduler.schedule(0.2, lambda: runs.append('slow'), "slow", delay=0.1)
+    scheduler.schedule(0.2, lambda: runs.append('fast'), "fast", delay=0.05)
+    scheduler.start()
+    try:
+        time.sleep(0.55)
+    finally:
+        scheduler.stop()
+
+    # 首次按延迟先后执行，之后按间隔周期重新入堆
+    assert runs[:2] == ['fast', 'slow']
+    assert 2 <= runs.count('fast') <= 3 and 2 <= runs.count('slow') <= 3
+
+
+def test_cancel_and_failing_task_do_not_stop_the_loop():
+    scheduler = MonitorScheduler("test-cancel")
+    cancelled, failures, healthy = [], [], threading.Event()
+    task = scheduler.schedule(0.05, lambda: cancelled.append(1), "cancelled")
+
+    def fail():
+        failures.append(1)
+        raise RuntimeError("任务失败")
+
+    scheduler.schedule(0.05, fail, "failing", delay=0)
+    scheduler.schedule(0.05, healthy.set, "healthy", delay=0.1)
+    scheduler.cancel(task)
+    assert scheduler.pending() == 2
+    scheduler.start()
+    try:
+        # 出错的任务记录日志后继续周期执行，其他任务不受影响
+        assert healthy.wait(2.0)
+        assert len(failures) >= 2
+    finally:
+        scheduler.stop()
+    assert cancelled == []
+
+
+def test_missed_runs_are_skipped_not_caught_up():
+    scheduler = MonitorScheduler("test-skip")
+    runs = []
+
+    def slow():
+        runs.append(time.monotonic())
+        if len(runs) == 1:
+            # 一次执行耗时 5 个周期
+            time.sleep(0.25)
+
+    scheduler.schedule(0.05, slow, "slow", delay=0)
+    scheduler.start()
+    try:
+        time.sleep(0.45)
+    finally:
+        scheduler.stop()
+
+    # 落后后不连续补跑错过的周期：第二次在第一次结束后一个间隔才执行
+    assert len(runs) >= 3
+    assert runs[1] - runs[0] >= 0.25 + 0.05 - 0.01
+    assert runs[2] - runs[1] >= 0.05 - 0.01
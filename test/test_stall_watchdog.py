@@ -0,0 +1,52 @@
+import threading
+import time
+
+from monitor.StallWatchdog import StallWatchdog
+
+
+def test_watchdog_idle_while_packets_flow():
+    watchdog = StallWatchdog()
+    stalled = threading.Event()
+    entry = watchdog.register("flowing", 0.3, stalled.set)
+
+    # 模拟 packet_loop：1 秒内每 5ms 一个数据包
+    end = time.monotonic() + 1.0
+    packets = 0
+    while time.monotonic() < end:
+        entry.feed()
+        packets += 1
+        time.sleep(0.005)
+    watchdog.unregister(entry)
+
+    assert not stalled.is_set()
+    assert watchdog.fired == 0
+    # 每个超时周期最多唤醒一次，与数据包数量无关
+    assert packets > 100
+    assert watchdog.wakeups <= 1.0 / 0.3 + 2
+
+
+def test_watchdog_fires_when_deadline_missed():
+    watchdog = StallWatchdog()
+    stalled = threading.Event()
+    start = time.monotonic()
+    watchdog.register("stalled", 0.2, stalled.set)
+
+    assert stalled.wait(2.0)
+    elapsed = time.monotonic() - start
+    assert 0.2 <= elapsed < 1.0
+    assert watchdog.fired == 1
+
+
+def test_watchdog_per_stream_timeouts_and_unregister():
+    watchdog = StallWatchdog()
+    fast, slow, removed = threading.Event(), threading.Event(), threading.Event()
+    watchdog.register("fast", 0.1, fast.set)
+    watchdog.register("slow", 5.0, slow.set)
+    entry = watchdog.register("removed", 0.1, removed.set)
+    watchdog.unregister(entry)
+
+    assert fast.wait(2.0)
+    time.sleep(0.2)
+    assert not slow.is_set()
+    assert not removed.is_set()
+    assert watchdog.watching() == 1
@@ -0,0 +1,127 @@
+import bisect
+import sys
+import threading
+import time
+
+import av
+
+from benchmark.media import generate_h264
+from benchmark.synthetic import generate_stream
+from benchmark.stub_http import PacedMediaServer
+from monitor.OpenOptions import OpenProfiles
+from monitor.StreamMonitor import StreamMonitor
+
+
+class NullSender:
+    def send_alert(self, data):
+        pass
+
+
+def session_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith(('demux-', 'health-', 'bitrate-'))]
+
+
+def run_session(monitor, wait_for):
+    thread = threading.Thread(target=monitor.start_monitoring, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 10
+    while not wait_for() and thread.is_alive() and time.monotonic() < deadline:
+        time.sleep(0.002)
+    return thread
+
+
+def test_restarts_release_session_threads():
+    path = generate_h264(seconds=4, gop=25, width=160, height=96, fmt='flv')
+    with PacedMediaServer(path, media_seconds=4, burst_seconds=4) as server:
+        monitor = StreamMonitor('s1', 'demo', server.url, check_interval=0.01, webhook_sender=NullSender(),
+                                fast_start=True)
+        for _ in range(100):
+            thread = run_session(monitor, lambda: monitor.startup['first_keyframe'] is not None)
+            monitor.stop()
+            thread.join(timeout=5)
+            assert not thread.is_alive()
+            assert monitor.container is None and monitor._decoder is None
+        assert not session_threads()
+
+
+def test_stop_releases_blocked_demux_within_read_timeout():
+    path = generate_h264(seconds=4, gop=25, width=160, height=96, fmt='flv')
+    # 发送 1 秒后保持连接但不再发送数据
+    with PacedMediaServer(path, media_seconds=4, burst_seconds=1, silent_after=1) as server:
+        monitor = StreamMonitor('s2', 'demo', server.url, stall_timeout=60, webhook_sender=NullSender(),
+                                health_check=False, fast_start=True)
+        monitor.open_spec = OpenProfiles({'read_timeout': 1}).resolve(server.url, fast_start=True)
+        packets = [-1]
+
+        def drained():
+            # 包计数不再增长：解复用线程阻塞在读取上
+            total, packets[0] = packets[0], monitor.stats.total_packets
+            time.sleep(0.2)
+            return total == packets[0] > 0
+
+        thread = run_session(monitor, drained)
+        started = time.monotonic()
+        monitor.stop()
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+        assert time.monotonic() - started < 1 + 1.5
+        assert monitor.container is None and not session_threads()
+
+
+def test_batched_counts_publish_consistent_snapshots():
+    media = generate_stream(seconds=8, fps=25, gop=10, width=160, height=96)
+    container = av.open(media.path)
+    keyframes = [i + 1 for i, packet in enumerate(container.demux()) if packet.is_keyframe]
+    container.close()
+
+    monitor = StreamMonitor('b1', 'demo', media.path, webhook_sender=NullSender(), picture_detection={'enabled': False},
+                            health_check=False, batch_packets=16, batch_seconds=60)
+    publishes = []
+    add_packets = monitor._add_packets
+    monitor._add_packets = lambda *args: publishes.append(args) or add_packets(*args)
+    snapshots = []
+    done = threading.Event()
+
+    def read():
+        while not done.is_set():
+            snapshots.append(monitor.packet_snapshot())
+
+    reader = threading.Thread(target=read, daemon=True)
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-5)
+    try:
+        reader.start()
+        assert monitor.start_monitoring()
+    finally:
+        done.set()
+        reader.join()
+        sys.setswitchinterval(interval)
+
+    stats = monitor.stats
+    assert stats.total_packets == stats.video_packets == 200 + 1 and stats.keyframes == len(keyframes)
+    # 每 16 个包或每个关键帧前发布一次
+    assert len(publishes) <= 201 // 16 + len(keyframes) + 2
+    assert len(snapshots) > 10
+    for snapshot in snapshots:
+        # 计数总是同一时刻的前缀：关键帧数等于前 video_packets 个包中的关键帧（发布后、关键帧计数前可少一个）
+        video = snapshot['video_packets']
+        assert snapshot['total_packets'] == video
+        assert bisect.bisect_right(keyframes, video - 1) <= snapshot['keyframes'] <= bisect.bisect_right(keyframes, video)
+
+
+def test_any_sampling_keeps_picture_detection_on_quality_keyframes():
+    media = generate_stream(seconds=4, fps=10, gop=10, width=160, height=96)
+    monitor = StreamMonitor('q1', 'demo', media.path, webhook_sender=NullSender(), quality_sampling='any',
+                            picture_detection={'cpu_budget': 1.0})
+    container = av.open(media.path)
+    try:
+        keyframes = 0
+        for packet in container.demux(container.streams.video[0]):
+            if packet.dts is None:
+                continue
+            # 每个关键帧都到了帧质量分析时间，走 any 采样分支
+            keyframes += packet.is_keyframe
+            monitor._analyze_video_packet(packet, packet.stream, keyframes * 6.0)
+    finally:
+        container.close()
+    assert keyframes == 4 and len(monitor.picture_detector.ring) == keyframes
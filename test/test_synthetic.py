@@ -0,0 +1,44 @@
+import io
+import os
+import time
+
+import av
+
+from benchmark.synthetic import Event, PipeSource, generate_stream, parse_event
+
+
+def test_generate_injects_freeze_and_spike():
+    events = [Event('freeze', 1, 1), Event('spike', 3, 1)]
+    media = generate_stream(seconds=5, fps=10, gop=10, width=160, height=96, fmt='mpegts', events=events)
+    seconds = [seconds for seconds, _ in media.index]
+    assert seconds == sorted(seconds) and media.index[-1][1] == len(media.data)
+    normal = media.bytes_between(0, 1)
+    assert media.bytes_between(3, 4) > 3 * normal
+    assert media.bytes_between(1, 2) < normal
+    assert parse_event('stall:10:5') == Event('stall', 10.0, 5.0)
+
+
+def test_pipe_source_paces_and_stalls():
+    media = generate_stream(seconds=3, fps=10, gop=10, width=160, height=96,
+                            events=[Event('stall', 1, 1)])
+    with PipeSource(media, burst_seconds=0) as source:
+        fd = int(source.url.split(':')[1])
+        arrivals = []
+        received = 0
+        while True:
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                break
+            received += len(chunk)
+            arrivals.append(time.monotonic())
+        stall_started = source.event_times[media.events[0]]
+    assert received == len(media.data)
+    gaps = [later - earlier for earlier, later in zip(arrivals, arrivals[1:])]
+    assert 0.9 < max(gaps) < 1.5
+    # 按媒体时间发送：总耗时约为 媒体时长 + 暂停时长
+    assert 3.5 < arrivals[-1] - arrivals[0] < 4.5
+    assert arrivals[0] < stall_started < arrivals[-1]
+    # 发送的数据可以正常解复用
+    container = av.open(io.BytesIO(media.data))
+    assert sum(1 for packet in container.demux() if packet.size) == 30
+    container.close()
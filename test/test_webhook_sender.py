@@ -0,0 +1,54 @@
+import time
+from types import SimpleNamespace
+
+from config.AlertFilter import MODE_CHANGE, AlertFilter
+from config.WebhookSender import WebhookDispatcher, WebhookSender, get_webhook_sender
+from job.monitor_manager import MonitorManager
+
+
+def test_webhook_config_snapshot_skips_file(tmp_path):
+    sender = WebhookSender(config_path=str(tmp_path / "missing.yaml"),
+                           webhook_config={'enabled': True, 'url': 'http://127.0.0.1:1/alert', 'async': False,
+                                           'timeout': 3})
+    assert sender.enabled and sender.url == 'http://127.0.0.1:1/alert'
+    assert sender.dispatcher is None
+
+    # 同步发送使用配置的超时
+    timeouts = []
+    sender.session.post = lambda url, data, timeout: timeouts.append(timeout) or SimpleNamespace(status_code=204)
+    assert sender.send_alert({'streamId': 's1', 'alertLevel': 'info'}) and timeouts == [3]
+
+
+def test_manager_shares_one_sender():
+    manager = MonitorManager()
+    assert manager.webhook_sender is get_webhook_sender()
+    for i in range(3):
+        manager.add_stream(f"s{i}", f"s{i}", f"http://127.0.0.1/live/s{i}.flv", 5)
+    assert {id(job.webhook_sender) for job in manager.monitor_jobs.values()} == {id(manager.webhook_sender)}
+
+
+def test_change_mode_keeps_every_transition():
+    dispatcher = WebhookDispatcher('http://127.0.0.1:1/alert', linger_ms=60000)
+    for level in ('info', 'error', 'info'):
+        dispatcher.submit({'type': 'stream_monitor', 'data': {'streamId': 's1', 'alertLevel': level}})
+    assert dispatcher.pending() == 1 and dispatcher.stats['coalesced'] == 2
+    for transition in ('ok->error', 'error->ok'):
+        dispatcher.submit({'type': 'stream_monitor', 'data': {'streamId': 's2', 'transition': transition}},
+                          coalesce=False)
+    assert dispatcher.pending() == 3 and dispatcher.stats['coalesced'] == 2
+
+
+def test_digest_is_sent_on_a_timer():
+    sender = WebhookSender(webhook_config={'enabled': True, 'url': 'http://127.0.0.1:1/alert', 'async': False,
+                                           'mode': MODE_CHANGE})
+    sender.alert_filter = AlertFilter(hysteresis=1, min_hold=0, digest_interval=0.05)
+    delivered = []
+    sender._deliver = lambda alert_data, coalesce=True: delivered.append(alert_data) or True
+    assert sender.send_alert({'streamId': 's1', 'alertLevel': 'info'}) is False
+    # 之后不再有告警，汇总心跳仍按时发出
+    deadline = time.monotonic() + 5
+    while not delivered and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert delivered[0]['type'] == 'stream_monitor_digest' and delivered[0]['data']['total'] == 1
+    sender.forget_stream('s1')
+    assert sender.alert_filter.take_digest(now=time.monotonic() + 1)['data']['total'] == 0